@@ -5,9 +5,13 @@
 #
 # """ Formatting for orderbook output """
 
+from typing import Dict, List, Optional
+
 import abc
 import itertools
 
+import sortedcontainers
+
 from pymatch._typing import Order
 from pymatch import order as order_lib
 
@@ -27,6 +31,23 @@ _BOOK_FORMAT_FOOTER = (
 )
 
 
+def _make_empty(format_: str) -> str:
+    return format_.format(0, 0, 0).replace('0', ' ')  # noqa: E231
+
+
+_BOOK_FORMAT_EMPTY_BID = _make_empty(BOOK_FORMAT_BODY_BID)
+_BOOK_FORMAT_EMPTY_ASK = _make_empty(BOOK_FORMAT_BODY_ASK)
+
+# The actions of a delta message, see `DeltaFormat`
+DELTA_NEW = 'N'
+DELTA_UPDATE = 'U'
+DELTA_DELETE = 'D'
+
+# Note: keyed by the values of `OrderSide`, which is not yet defined
+# whilst `pymatch.order` imports this module
+_DELTA_SIDES = {1: 'B', -1: 'A'}
+
+
 class _Format(abc.ABC):
 
     _message: str = ''
@@ -45,29 +66,45 @@ class _Format(abc.ABC):
 
 
 class BookFormat(_Format):
-    def __init__(self, bids: type, asks: type):
-        def make_empty(format_: str) -> str:
-            return format_.format(0, 0, 0).replace('0', ' ')  # noqa: E231
-
-        messages = []
-        for bid_message, ask_message in itertools.zip_longest(
-            bids.to_display(), asks.to_display(),
-        ):
-            if bid_message is None:
-                bid_message = make_empty(BOOK_FORMAT_BODY_BID)
-
-            if ask_message is None:
-                ask_message = make_empty(BOOK_FORMAT_BODY_ASK)
-
-            messages.append(bid_message + ask_message)
-
-        if not messages:
-            messages.append(
-                make_empty(BOOK_FORMAT_BODY_BID)
-                + make_empty(BOOK_FORMAT_BODY_ASK)
-            )
+    r""" The book as a table of bids and asks, side by side.
+
+    Parameters:
+        bids: the bids price-level container
+        asks: the asks price-level container
+        levels: the optional maximum number of price levels per side
+        orders: the optional maximum number of orders per side
+        buffer: an optional list that is cleared and reused to hold the
+            lines of both sides, e.g. across consecutive quotes
+    """
+
+    def __init__(
+        self,
+        bids: type,
+        asks: type,
+        levels: Optional[int] = None,
+        orders: Optional[int] = None,
+        buffer: Optional[List] = None,
+    ):
+        if buffer is None:
+            buffer = []
+        else:
+            buffer.clear()
 
-        self._message = '\n'.join(messages)
+        # Note: the bids fill the front of the buffer and the asks the back
+        bids.to_display(levels, orders, buffer)
+        num_bids = len(buffer)
+        asks.to_display(levels, orders, buffer)
+        num_asks = len(buffer) - num_bids
+
+        self._message = '\n'.join(
+            (buffer[row] if row < num_bids else _BOOK_FORMAT_EMPTY_BID)
+            + (
+                buffer[num_bids + row]
+                if row < num_asks
+                else _BOOK_FORMAT_EMPTY_ASK
+            )
+            for row in range(max(num_bids, num_asks, 1))
+        )
 
     @property
     def header(self) -> str:
@@ -122,4 +159,123 @@ class TradeFormat(_Format):
         return ''
 
 
+class DeltaFormat(_Format):
+    r""" A change to a single resting order of the book, formatted as
+    `action,identity,side,price,volume` where the action is one of:
+
+        N: a new order rests at the back of its price level
+        U: the displayed volume of a resting order changed, e.g. a fill or
+            the refresh of an iceberg peak; it keeps its time-priority
+        D: the order left the book, e.g. fully filled or cancelled; the
+            volume is zero
+
+    Replaying the messages in order rebuilds the displayed book, see
+    `DeltaBook`.
+    """
+
+    def __init__(
+        self,
+        action: str,
+        identity: int,
+        side: 'order_lib.OrderSide',
+        price: int,
+        volume: int,
+        delimiter: str = ',',
+    ):
+        self._message = f'{delimiter}'.join(
+            [
+                action,
+                str(identity),
+                _DELTA_SIDES[side],
+                str(price),
+                str(volume),
+            ]
+        )
+
+    @property
+    def header(self) -> str:
+        return '\n'
+
+    @property
+    def footer(self) -> str:
+        return ''
+
+
+class _DeltaBookSide(sortedcontainers.SortedDict):
+    def __init__(self, side: 'order_lib.OrderSide'):
+        self._side = side
+        super().__init__()
+
+    def to_display(
+        self,
+        levels: Optional[int] = None,
+        orders: Optional[int] = None,
+        lines: Optional[List] = None,
+    ) -> List:
+        prices = self.keys()
+        if self._side is order_lib.OrderSide.BID:
+            prices = reversed(prices)
+
+        if lines is None:
+            lines = []
+
+        end = len(lines) + orders if orders is not None else None
+        for price in itertools.islice(prices, levels):
+            for identity, volume in self[price].items():
+                if len(lines) == end:
+                    return lines
+                args = [identity, volume, price]
+                if self._side is order_lib.OrderSide.ASK:
+                    args = args[::-1]
+                lines.append(self._side.to_display.format(*args))
+        return lines
+
+
+class DeltaBook:
+    r""" Rebuilds the displayed book of an orderbook from its delta feed.
+    Each price level keeps its orders in time-priority.
+    """
+
+    def __init__(self):
+        self._sides: Dict = {
+            side: _DeltaBookSide(side) for side in order_lib.OrderSide
+        }
+        self._codes = {
+            code: order_lib.OrderSide(side)
+            for side, code in _DELTA_SIDES.items()
+        }
+
+    @property
+    def bids(self) -> _DeltaBookSide:
+        return self._sides[order_lib.OrderSide.BID]
+
+    @property
+    def asks(self) -> _DeltaBookSide:
+        return self._sides[order_lib.OrderSide.ASK]
+
+    def apply(self, message: str, delimiter: str = ',') -> None:
+        r""" Applies one delta message, as formatted by `DeltaFormat` """
+
+        action, identity, side, price, volume = message.split(delimiter)
+        book = self._sides[self._codes[side]]
+        identity, price = int(identity), int(price)
+
+        if action == DELTA_DELETE:
+            level = book[price]
+            del level[identity]
+            if not level:
+                del book[price]
+        elif action == DELTA_NEW:
+            book.setdefault(price, {})[identity] = int(volume)
+        elif action == DELTA_UPDATE:
+            book[price][identity] = int(volume)
+        else:
+            raise ValueError(f'Received an invalid delta action({action}). ')
+
+    @property
+    def body(self) -> str:
+        r""" The book as it would be displayed by `BookFormat` """
+        return BookFormat(self.bids, self.asks).body
+
+
 # EOF
@@ -30,4 +30,20 @@ class TickTapeIsNotMonotonicError(OrderbookError):
     pass
 
 
+class PriceOutOfRangeError(OrderbookError):
+    pass
+
+
+class OrderNotFoundError(OrderbookError):
+    pass
+
+
+class InvalidModificationError(OrderbookError):
+    pass
+
+
+class InvalidAuctionOrderError(OrderbookError):
+    pass
+
+
 # EOF
@@ -0,0 +1,83 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+#
+# "Author: Nathan Matare <nathan.matare@gmail.com>"
+#
+# """ Fenwick (binary indexed) tree """
+
+
+class FenwickTree:
+    r""" A Fenwick (binary indexed) tree of integers over the positions
+    `[0, size)`. Point updates and prefix sums are both O(log(n)).
+
+    Parameters:
+        size: the number of positions
+    """
+
+    __slots__ = ('_tree', '_size')
+
+    def __init__(self, size: int):
+        if size < 0:
+            raise ValueError(f'Invalid size({size}). ')
+
+        self._size = size
+        self._tree = [0] * (size + 1)  # 1-based
+
+    def __len__(self) -> int:
+        return self._size
+
+    def add(self, position: int, delta: int) -> None:
+        r""" Adds `delta` to the value at `position` """
+        if not 0 <= position < self._size:
+            raise IndexError(f'Invalid position({position}). ')
+
+        tree = self._tree
+        size = self._size
+        position += 1
+        while position <= size:
+            tree[position] += delta
+            position += position & -position
+
+    def prefix_sum(self, end: int) -> int:
+        r""" The sum of the values at the positions `[0, end)` """
+        end = max(min(end, self._size), 0)
+
+        tree = self._tree
+        total = 0
+        while end:
+            total += tree[end]
+            end &= end - 1
+        return total
+
+    def total(self) -> int:
+        r""" The sum of all values """
+        return self.prefix_sum(self._size)
+
+    def search(self, value: int) -> int:
+        r""" The inverse of `prefix_sum` for non-negative values: the first
+        position at which the running sum reaches `value`, in O(log(n)).
+
+        Parameters:
+            value: the running sum to reach
+
+        Returns:
+            The smallest position such that `prefix_sum(position + 1)` is at
+            least `value`, or `len(self)` if the total is less than `value`
+        """
+        tree = self._tree
+        size = self._size
+
+        # Note: descend the implicit tree from its largest power of two,
+        # skipping every node whose sum still falls short of the value
+        position = 0
+        step = 1 << (size.bit_length() - 1) if size else 0
+        while step:
+            end = position + step
+            if end <= size and tree[end] < value:
+                position = end
+                value -= tree[end]
+            step >>= 1
+        return position
+
+
+# EOF
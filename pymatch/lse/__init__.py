@@ -4,7 +4,26 @@
 from pymatch.lse.lse_order import (
     LSELimitOrder,
     LSEIcebergOrder,
+    LSEMarketOrder,
+    SETSmm_DTYPE,
     build_order_from_ascii_string,
+    build_orders_from_array,
+    iter_setsmm_buffer,
+    iter_setsmm_stream,
+    parse_setsmm_buffer,
+    parse_setsmm_file,
+)
+
+from pymatch.lse.lse_binary import (
+    BINARY_DTYPE,
+    BINARY_RECORD,
+    decode_array,
+    decode_orders,
+    encode_array,
+    encode_order,
+    encode_orders,
+    iter_decode_array,
+    iter_decode_stream,
 )
 
 from pymatch.lse.lse_orderbook import LSEOrderbook
@@ -0,0 +1,249 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+#
+# "Author: Nathan Matare <nathan.matare@gmail.com>"
+#
+# """ London Stock Exchange binary wire format """
+
+import struct
+from typing import BinaryIO, Iterable, Iterator, Optional, Tuple
+
+import numpy as np
+
+from pymatch._typing import Order
+from pymatch import order as order_lib, errors
+from pymatch.lse import lse_order as lse_order_lib
+
+# A SETSmm message as a fixed-width, packed little-endian record:
+#
+#   offset  size  field
+#   0       1     side       int8, 1 (bid) or -1 (ask)
+#   1       8     identity   int64
+#   9       8     price      int64, `MARKET_ORDER_PRICE` for markets
+#   17      8     quantity   int64
+#   25      8     peak_size  int64, `LIMIT_ORDER_PEAK_SIZE` for limits
+#
+BINARY_RECORD = struct.Struct('<bqqqq')
+
+BINARY_DTYPE = np.dtype(
+    [
+        ('side', '<i1'),
+        ('identity', '<i8'),
+        ('price', '<i8'),
+        ('quantity', '<i8'),
+        ('peak_size', '<i8'),
+    ]
+)
+
+_UNENCODABLE_TYPES = frozenset(
+    [order_lib.OrderType.STOP, order_lib.OrderType.STOP_LIMIT]
+)
+
+
+def encode_order(order: Order) -> bytes:
+    r""" Encodes an order into a binary record.
+
+    Parameters:
+        order: a `pymatch.order.Order` order
+
+    Returns:
+        The record as `bytes`
+    """
+
+    if order.type in _UNENCODABLE_TYPES:
+        # Note: a record has no field for the stop price, so a stop would
+        # decode as a live order
+        raise errors.InvalidOrderFormatError(
+            f'Can not encode an order of type `{order.type.name}`. '
+        )
+
+    if order.type is order_lib.OrderType.ICEBERG:
+        peak_size = order.peak_size
+    else:
+        peak_size = order_lib.LIMIT_ORDER_PEAK_SIZE
+
+    return BINARY_RECORD.pack(
+        order.side, order.identity, order.price, order.quantity, peak_size
+    )
+
+
+def encode_orders(orders: Iterable[Order]) -> bytes:
+    r""" Encodes orders into a buffer of consecutive binary records """
+    return b''.join(encode_order(order) for order in orders)
+
+
+def encode_array(orders: np.ndarray) -> bytes:
+    r""" Encodes a structured array of parsed SETSmm messages, as returned by
+    `pymatch.lse.parse_setsmm_buffer`, into a buffer of binary records.
+    """
+    return orders.astype(BINARY_DTYPE).tobytes()
+
+
+def _validate_buffer_size(buffer: memoryview) -> None:
+    if buffer.nbytes % BINARY_RECORD.size:
+        raise errors.InvalidOrderFormatError(
+            f'The buffer of {buffer.nbytes} bytes does not hold a whole '
+            f'number of {BINARY_RECORD.size} byte records. '
+        )
+
+
+def decode_array(
+    buffer: bytes, stop_at_malformed: bool = False
+) -> Tuple[np.ndarray, np.ndarray]:
+    r""" Decodes a buffer of binary records as a structured NumPy array.
+
+    Parameters:
+        buffer: any bytes-like object, e.g. `bytes`, `memoryview` or `mmap`
+        stop_at_malformed: only decode the orders preceding the first
+            malformed record, and only report it
+
+    Returns:
+        A tuple of (orders, malformed), see
+        `pymatch.lse.parse_setsmm_buffer`. The orders are a zero-copy view
+        of the buffer unless some records are malformed; malformed holds
+        the zero-based record numbers of the invalid records.
+    """
+
+    buffer = memoryview(buffer).cast('B')
+    _validate_buffer_size(buffer)
+
+    orders = np.frombuffer(buffer, dtype=BINARY_DTYPE)
+
+    side, quantity = orders['side'], orders['quantity']
+    peak_size = orders['peak_size']
+
+    is_valid = (side == order_lib.OrderSide.BID) | (
+        side == order_lib.OrderSide.ASK
+    )
+    price = orders['price']
+    is_market = price == order_lib.MARKET_ORDER_PRICE
+
+    is_valid &= (orders['identity'] >= 0) & ((price >= 0) | is_market)
+    is_valid &= quantity >= 0
+    is_valid &= (peak_size == order_lib.LIMIT_ORDER_PEAK_SIZE) | (
+        (peak_size > 0) & (peak_size < quantity) & ~is_market
+    )
+
+    if is_valid.all():
+        return orders, np.empty(0, dtype=np.int64)
+
+    malformed = np.flatnonzero(~is_valid)
+    if stop_at_malformed:
+        return orders[: malformed[0]], malformed[:1]
+
+    return orders[is_valid], malformed
+
+
+def iter_decode_array(
+    buffer: bytes, chunk_size: int = 1 << 20, stop_at_malformed: bool = False
+) -> Iterator[Tuple[np.ndarray, np.ndarray]]:
+    r""" Decodes a buffer of binary records in chunks of about `chunk_size`
+    bytes, split on record boundaries.
+
+    Parameters:
+        buffer: any bytes-like object, e.g. `bytes`, `memoryview` or `mmap`
+        chunk_size: the approximate number of bytes decoded at once
+        stop_at_malformed: stop at the first malformed record, see
+            `decode_array`
+
+    Returns:
+        An iterator of (orders, malformed) tuples as per `decode_array`;
+        record numbers count from the start of the buffer
+    """
+
+    if chunk_size <= 0:
+        raise ValueError(f'Invalid chunk_size({chunk_size}). ')
+
+    buffer = memoryview(buffer).cast('B')
+    _validate_buffer_size(buffer)
+
+    num_records = max(chunk_size // BINARY_RECORD.size, 1)
+    step = num_records * BINARY_RECORD.size
+    for start in range(0, buffer.nbytes, step):
+        orders, malformed = decode_array(
+            buffer[start : start + step], stop_at_malformed
+        )
+        yield orders, malformed + start // BINARY_RECORD.size
+
+        if stop_at_malformed and len(malformed):
+            return
+
+
+def iter_decode_stream(
+    stream: BinaryIO,
+    chunk_size: int = 1 << 20,
+    stop_at_malformed: bool = False,
+) -> Iterator[Tuple[np.ndarray, np.ndarray]]:
+    r""" Decodes a binary stream of records, e.g. `sys.stdin.buffer`, in
+    chunks of about `chunk_size` bytes, split on record boundaries.
+
+    Parameters:
+        stream: a binary file object
+        chunk_size: the approximate number of bytes read from the stream at
+            once
+        stop_at_malformed: stop at the first malformed record, see
+            `decode_array`
+
+    Returns:
+        An iterator of (orders, malformed) tuples as per `decode_array`;
+        record numbers count from the start of the stream
+    """
+
+    if chunk_size <= 0:
+        raise ValueError(f'Invalid chunk_size({chunk_size}). ')
+
+    chunk_size = max(chunk_size // BINARY_RECORD.size, 1) * BINARY_RECORD.size
+
+    remainder, offset = b'', 0
+    while True:
+        chunk = stream.read(chunk_size)
+        if not chunk:
+            break
+
+        if remainder:
+            chunk = remainder + chunk
+
+        end = len(chunk) - len(chunk) % BINARY_RECORD.size
+        remainder = chunk[end:]
+        if not end:
+            continue
+
+        orders, malformed = decode_array(
+            memoryview(chunk)[:end], stop_at_malformed
+        )
+        yield orders, malformed + offset
+
+        if stop_at_malformed and len(malformed):
+            return
+
+        offset += end // BINARY_RECORD.size
+
+    _validate_buffer_size(memoryview(remainder))
+
+
+def decode_orders(
+    buffer: bytes, pool: Optional[order_lib.OrderPool] = None
+) -> Iterator[Order]:
+    r""" Decodes a buffer of binary records into orders. The records are
+    validated as per `decode_array` and built as per
+    `pymatch.lse.build_orders_from_array`.
+
+    Parameters:
+        buffer: any bytes-like object, e.g. `bytes`, `memoryview` or `mmap`
+        pool: an optional `pymatch.order.OrderPool` to recycle orders from
+
+    Returns:
+        An iterator of `LimitOrder`, `IcebergOrder` or `MarketOrder` in
+        record order
+    """
+
+    orders, malformed = decode_array(buffer)
+    if len(malformed):
+        raise errors.InvalidOrderFormatError(
+            f'Received malformed records: {malformed.tolist()}. '
+        )
+
+    return lse_order_lib.build_orders_from_array(orders, pool)
+
+
+# EOF
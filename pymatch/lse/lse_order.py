@@ -5,8 +5,9 @@
 #
 # """ London Stock Exchange """
 
-from typing import Dict
-import dataclasses
+from typing import BinaryIO, Dict, Iterator, Optional, Tuple
+
+import numpy as np
 
 from pymatch._typing import Order
 from pymatch import order as order_lib, errors
@@ -23,6 +24,37 @@ def _setsmm_string_to_side(x: str) -> type:
         )
 
 
+def _setsmm_string_to_integer(x: str) -> int:
+    # Note: the same grammar as the bulk parser, unsigned decimal digits
+    # without any whitespace that fit into an int64
+    if (
+        not x.isascii()
+        or not x.isdigit()
+        or len(x) > _MAX_INTEGER_DIGITS
+        or int(x) > _MAX_INTEGER_VALUE
+    ):
+        raise errors.InvalidOrderFormatError(
+            f'Expected an unsigned integer. Received `{x}`'
+        )
+    return int(x)
+
+
+def _setsmm_string_to_price(x: str) -> int:
+    # Note: market orders are sent without a price, e.g. `B,1,,100`
+    if not x:
+        return order_lib.MARKET_ORDER_PRICE
+    return _setsmm_string_to_integer(x)
+
+
+def _setsmm_string_to_peak_size(x: str) -> int:
+    peak_size = _setsmm_string_to_integer(x)
+    if peak_size == order_lib.LIMIT_ORDER_PEAK_SIZE:
+        raise errors.InvalidOrderFormatError(
+            f'Received an invalid peak size({peak_size}). '
+        )
+    return peak_size
+
+
 MESSAGE_FORMAT_INDEX_TO_PARAMS = {
     0: 'side',
     1: 'identity',
@@ -39,41 +71,457 @@ MESSAGE_FORMAT_SETSmm = {
     # A tuple of size two containing the type and any validation
     #
     0: _setsmm_string_to_side,  # char orderside
-    1: int,  # id bigint
-    2: int,  # price int
-    3: int,  # quantity bigint
-    4: int,  # peak size bigint
+    1: _setsmm_string_to_integer,  # id bigint
+    2: _setsmm_string_to_price,  # price int, empty for market orders
+    3: _setsmm_string_to_integer,  # quantity bigint
+    4: _setsmm_string_to_peak_size,  # peak size bigint
+}
+
+# The minimum number of fields of a message, a limit or market order
+_MIN_MESSAGE_FIELDS = 4
+
+
+# The columnar layout of a parsed SETSmm message; limit orders carry a peak
+# size of `pymatch.order.LIMIT_ORDER_PEAK_SIZE` and market orders a price of
+# `pymatch.order.MARKET_ORDER_PRICE`
+SETSmm_DTYPE = np.dtype(
+    [
+        ('side', np.int8),
+        ('identity', np.int64),
+        ('price', np.int64),
+        ('quantity', np.int64),
+        ('peak_size', np.int64),
+    ]
+)
+
+_NEWLINE = ord('\n')
+_CARRIAGE_RETURN = ord('\r')
+_ZERO = ord('0')
+
+# Note: the longest run of decimal digits of an int64; a run of that many
+# digits only fits if it is at most `_MAX_INTEGER`, compared lexically
+_MAX_INTEGER = np.frombuffer(
+    str(np.iinfo(np.int64).max).encode(), dtype=np.uint8
+)
+_MAX_INTEGER_DIGITS = len(_MAX_INTEGER)
+_MAX_INTEGER_VALUE = int(np.iinfo(np.int64).max)
+
+_SIDE_CHAR_TO_VALUE = {
+    ord('A'): order_lib.OrderSide.ASK.value,
+    ord('B'): order_lib.OrderSide.BID.value,
 }
 
+_SIDES = {side.value: side for side in order_lib.OrderSide}
+
+
+def _parse_setsmm_array(
+    data: np.ndarray,
+    delimiter: str = ',',
+    row_offset: int = 0,
+    stop_at_malformed: bool = False,
+) -> Tuple[np.ndarray, np.ndarray, int]:
+
+    num_bytes = len(data)
+    if not num_bytes:
+        return np.empty(0, dtype=SETSmm_DTYPE), np.empty(0, np.int64), 0
+
+    # Every line is terminated by a newline, except perhaps the last
+    line_ends = np.flatnonzero(data == _NEWLINE)
+    if not len(line_ends) or line_ends[-1] != num_bytes - 1:
+        line_ends = np.append(line_ends, num_bytes)
+
+    line_starts = np.empty_like(line_ends)
+    line_starts[0] = 0
+    line_starts[1:] = line_ends[:-1] + 1
+    num_rows = len(line_ends)
+
+    # Tolerate CRLF line endings
+    padded = np.append(data, np.uint8(_NEWLINE))
+    line_ends -= (line_ends > line_starts) & (
+        padded[line_ends - 1] == _CARRIAGE_RETURN
+    )
+
+    # Count the delimiters of each line: 3 for a limit, 4 for an iceberg
+    delimiters = np.flatnonzero(data == ord(delimiter))
+    first_delimiter = np.searchsorted(delimiters, line_starts)
+    num_delimiters = np.diff(first_delimiter, append=len(delimiters))
+    delimiters = np.append(delimiters, num_bytes)  # a safe sentinel
+
+    # Blank lines are skipped, they are not malformed
+    rows = np.flatnonzero(line_ends > line_starts)
+    line_starts, line_ends = line_starts[rows], line_ends[rows]
+    first_delimiter = first_delimiter[rows]
+    num_delimiters = num_delimiters[rows]
+
+    is_valid = (num_delimiters == 3) | (num_delimiters == 4)
+
+    # Field 0: a single character orderside
+    side = np.zeros(len(rows), dtype=np.int8)
+    for char, value in _SIDE_CHAR_TO_VALUE.items():
+        side[padded[line_starts] == char] = value
+
+    is_valid &= (side != 0) & (delimiters[first_delimiter] == line_starts + 1)
+
+    # Past the orderside, a line may only hold digits and delimiters
+    is_unexpected = (padded - np.uint8(_ZERO)) > 9
+    is_unexpected &= padded != ord(delimiter)
+    bounds = np.empty(2 * len(rows), dtype=np.int64)
+    bounds[0::2], bounds[1::2] = line_starts + 1, line_ends
+    is_valid &= ~np.logical_or.reduceat(is_unexpected, bounds)[0::2]
+
+    # Fields 1-4: unsigned decimal integers, a field is only read where the
+    # line has it
+    fields = []
+    for index in range(1, 5):
+        has_field = num_delimiters >= index
+        starts = np.where(
+            has_field,
+            delimiters.take(first_delimiter + index - 1, mode='clip') + 1,
+            0,
+        )
+        ends = np.where(
+            num_delimiters > index,
+            delimiters.take(first_delimiter + index, mode='clip'),
+            line_ends,
+        )
+        ends = np.where(has_field, ends, 0)
+        lengths = ends - starts
+
+        is_present = lengths > 0
+        if index == 2:
+            is_market = has_field & ~is_present  # an empty price
+            is_present |= is_market
+
+        is_valid &= ~has_field | (
+            is_present & (lengths <= _MAX_INTEGER_DIGITS)
+        )
+
+        longest = np.flatnonzero(
+            is_valid & has_field & (lengths == _MAX_INTEGER_DIGITS)
+        )
+        if len(longest):
+            # The first digit that differs from the maximum decides
+            digits = padded.take(
+                starts[longest, None] + np.arange(_MAX_INTEGER_DIGITS)
+            )
+            differs = digits != _MAX_INTEGER
+            first = differs.argmax(axis=1)
+            is_overflow = differs.any(axis=1) & (
+                digits[np.arange(len(first)), first] > _MAX_INTEGER[first]
+            )
+            is_valid[longest[is_overflow]] = False
+
+        # Horner's method, vectorized over all rows one digit at a time.
+        # Fields are aligned on their last digit so that every row reads
+        # the same digit position and no row needs to be masked out
+        values = np.zeros(len(rows), dtype=np.int64)
+        width = min(lengths.max(initial=0), _MAX_INTEGER_DIGITS)
+        for digit in range(width, 0, -1):
+            positions = ends - digit
+            digits = padded.take(positions, mode='clip') - np.uint8(_ZERO)
+            values *= 10
+            values += np.where(positions >= starts, digits, 0)
+
+        fields.append(values)
+
+    identity, price, quantity, peak_size = fields
+
+    # An iceberg must show less than its total quantity, and never rests
+    # at the market
+    is_iceberg = num_delimiters == 4
+    is_valid &= ~is_iceberg | (
+        (peak_size != order_lib.LIMIT_ORDER_PEAK_SIZE)
+        & (peak_size < quantity)
+        & ~is_market
+    )
+    peak_size[~is_iceberg] = order_lib.LIMIT_ORDER_PEAK_SIZE
+    price[is_market] = order_lib.MARKET_ORDER_PRICE
+
+    if stop_at_malformed and not is_valid.all():
+        # Only the orders preceding the first malformed row, which is the
+        # only one reported
+        first = np.argmin(is_valid)
+        is_valid[first:] = False
+        malformed = rows[first : first + 1] + row_offset
+    else:
+        malformed = rows[~is_valid] + row_offset
+
+    orders = np.empty(np.count_nonzero(is_valid), dtype=SETSmm_DTYPE)
+    orders['side'] = side[is_valid]
+    orders['identity'] = identity[is_valid]
+    orders['price'] = price[is_valid]
+    orders['quantity'] = quantity[is_valid]
+    orders['peak_size'] = peak_size[is_valid]
+
+    return orders, malformed, num_rows
+
+
+def parse_setsmm_buffer(
+    buffer: bytes, delimiter: str = ','
+) -> Tuple[np.ndarray, np.ndarray]:
+    r""" Parses a buffer of newline separated SETSmm messages in a single
+    vectorized pass.
+
+    Parameters:
+        buffer: any bytes-like object, e.g. `bytes`, `memoryview` or `mmap`
+        delimiter: the field delimiter
+
+    Returns:
+        A tuple of (orders, malformed). The orders are a structured array of
+        `SETSmm_DTYPE` in message order; malformed holds the zero-based line
+        numbers of the messages that could not be parsed. Blank lines are
+        skipped.
+    """
+    orders, malformed, _ = _parse_setsmm_array(
+        np.frombuffer(buffer, dtype=np.uint8), delimiter
+    )
+    return orders, malformed
+
+
+def iter_setsmm_buffer(
+    buffer: bytes,
+    chunk_size: int = 1 << 20,
+    delimiter: str = ',',
+    stop_at_malformed: bool = False,
+) -> Iterator[Tuple[np.ndarray, np.ndarray]]:
+    r""" Parses a buffer of SETSmm messages in chunks of about `chunk_size`
+    bytes, split on line boundaries, to bound the memory of the parse.
+
+    Parameters:
+        buffer: any bytes-like object, e.g. `bytes`, `memoryview` or `mmap`
+        chunk_size: the approximate number of bytes parsed at once
+        delimiter: the field delimiter
+        stop_at_malformed: stop at the first malformed line; its chunk
+            only holds the orders preceding it, and only it is reported
+
+    Returns:
+        An iterator of (orders, malformed) tuples as per
+        `parse_setsmm_buffer`; line numbers count from the start of the
+        buffer
+    """
+
+    if chunk_size <= 0:
+        raise ValueError(f'Invalid chunk_size({chunk_size}). ')
 
-def build_order_from_ascii_string(string: str) -> Order:
+    data = np.frombuffer(buffer, dtype=np.uint8)
+    start, row_offset = 0, 0
+    while start < len(data):
+        end = min(start + chunk_size, len(data))
+
+        # Extend the chunk up to the end of its last line
+        while end < len(data) and data[end - 1] != _NEWLINE:
+            newlines = np.flatnonzero(data[end : end + chunk_size] == _NEWLINE)
+            end = end + newlines[0] + 1 if len(newlines) else end + chunk_size
+            end = min(end, len(data))
+
+        orders, malformed, num_rows = _parse_setsmm_array(
+            data[start:end], delimiter, row_offset, stop_at_malformed
+        )
+        yield orders, malformed
+
+        if stop_at_malformed and len(malformed):
+            return
+
+        start, row_offset = end, row_offset + num_rows
+
+
+def iter_setsmm_stream(
+    stream: BinaryIO,
+    chunk_size: int = 1 << 20,
+    delimiter: str = ',',
+    stop_at_malformed: bool = False,
+) -> Iterator[Tuple[np.ndarray, np.ndarray]]:
+    r""" Parses a binary stream of SETSmm messages, e.g. `sys.stdin.buffer`,
+    in chunks of about `chunk_size` bytes, split on line boundaries. Only
+    the chunk being parsed, and the partial line carried over to the next,
+    is held in memory.
+
+    Parameters:
+        stream: a binary file object
+        chunk_size: the number of bytes read from the stream at once
+        delimiter: the field delimiter
+        stop_at_malformed: see `iter_setsmm_buffer`
+
+    Returns:
+        An iterator of (orders, malformed) tuples as per
+        `parse_setsmm_buffer`; line numbers count from the start of the
+        stream
+    """
+
+    if chunk_size <= 0:
+        raise ValueError(f'Invalid chunk_size({chunk_size}). ')
+
+    remainder, row_offset = b'', 0
+    while True:
+        chunk = stream.read(chunk_size)
+        if not chunk:
+            break
+
+        end = chunk.rfind(b'\n') + 1
+        if not end:  # the chunk holds part of a single line
+            remainder += chunk
+            continue
+
+        if remainder:
+            buffer = remainder + chunk[:end]
+        else:
+            buffer = memoryview(chunk)[:end]
+        remainder = chunk[end:]
+
+        orders, malformed, num_rows = _parse_setsmm_array(
+            np.frombuffer(buffer, dtype=np.uint8),
+            delimiter,
+            row_offset,
+            stop_at_malformed,
+        )
+        yield orders, malformed
+
+        if stop_at_malformed and len(malformed):
+            return
+
+        row_offset += num_rows
+
+    if remainder:  # the last line is not terminated by a newline
+        orders, malformed, _ = _parse_setsmm_array(
+            np.frombuffer(remainder, dtype=np.uint8),
+            delimiter,
+            row_offset,
+            stop_at_malformed,
+        )
+        yield orders, malformed
+
+
+def parse_setsmm_file(
+    path: str, delimiter: str = ','
+) -> Tuple[np.ndarray, np.ndarray]:
+    r""" Parses a file of SETSmm messages, see `parse_setsmm_buffer` """
+    return parse_setsmm_buffer(np.fromfile(path, dtype=np.uint8), delimiter)
+
+
+def build_orders_from_array(
+    orders: np.ndarray, pool: Optional[order_lib.OrderPool] = None
+) -> Iterator[Order]:
+    r""" Creates orders from a structured array of parsed SETSmm messages.
+
+    Parameters:
+        orders: a structured array of `SETSmm_DTYPE`
+        pool: an optional `pymatch.order.OrderPool` to recycle orders from
+
+    Returns:
+        An iterator of `LimitOrder`, `IcebergOrder` or `MarketOrder` in
+        array order
+    """
+
+    # Note: `tolist` converts the whole array to python integers at once,
+    # which is much faster than indexing the array per field
+    for side, identity, price, quantity, peak_size in orders.tolist():
+        side = _SIDES[side]
+
+        if price == order_lib.MARKET_ORDER_PRICE:
+            if pool is None:
+                yield LSEMarketOrder(
+                    side, identity, quantity, _private_call=False
+                )
+            else:
+                yield pool.acquire(
+                    LSEMarketOrder,
+                    side=side,
+                    identity=identity,
+                    quantity=quantity,
+                )
+
+        elif peak_size == order_lib.LIMIT_ORDER_PEAK_SIZE:
+            if pool is None:
+                yield LSELimitOrder(
+                    side, identity, price, quantity, _private_call=False
+                )
+            else:
+                yield pool.acquire(
+                    LSELimitOrder,
+                    side=side,
+                    identity=identity,
+                    price=price,
+                    quantity=quantity,
+                )
+
+        elif pool is None:
+            yield LSEIcebergOrder(
+                peak_size, side, identity, price, quantity, _private_call=False
+            )
+        else:
+            yield pool.acquire(
+                LSEIcebergOrder,
+                peak_size=peak_size,
+                side=side,
+                identity=identity,
+                price=price,
+                quantity=quantity,
+            )
+
+
+def build_order_from_ascii_string(
+    string: str, pool: Optional[order_lib.OrderPool] = None
+) -> Order:
     r""" Creates an order based on the "SETSmm specification.
 
     Parameters:
         string: an ascii encoded string representing the message
+        pool: an optional `pymatch.order.OrderPool` to recycle orders from
 
     Returns:
-        Either a `LimitOrder` or `IcebergOrder`
+        Either a `LimitOrder`, `IcebergOrder` or `MarketOrder`
     """
 
     fields = _validate_order_string(string)
 
-    if MESSAGE_FORMAT_INDEX_TO_PARAMS[4] in fields:
-        return LSEIcebergOrder(**fields, _private_call=False)
+    if fields.get('price') == order_lib.MARKET_ORDER_PRICE:
+        order_type = LSEMarketOrder
+        del fields['price']
+
+        if MESSAGE_FORMAT_INDEX_TO_PARAMS[4] in fields:
+            raise errors.InvalidOrderFormatError(
+                'Received a market order with a peak size. '
+            )
+
+    elif MESSAGE_FORMAT_INDEX_TO_PARAMS[4] in fields:
+        order_type = LSEIcebergOrder
     else:
-        return LSELimitOrder(**fields, _private_call=False)
+        order_type = LSELimitOrder
+
+    if pool is None:
+        return order_type(**fields, _private_call=False)
+
+    return pool.acquire(order_type, **fields)
 
 
-@dataclasses.dataclass(init=False, repr=False)
 class LSELimitOrder(order_lib.LimitOrder):
+
+    __slots__ = ()
+
     @classmethod
     def from_ascii_string(cls, string: str) -> Order:
         fields = _validate_order_string(string)
         return cls(**fields, _private_call=False)
 
 
-@dataclasses.dataclass(init=False, repr=False)
+class LSEMarketOrder(order_lib.MarketOrder):
+
+    __slots__ = ()
+
+    @classmethod
+    def from_ascii_string(cls, string: str) -> Order:
+        fields = _validate_order_string(string)
+        if fields.pop('price') != order_lib.MARKET_ORDER_PRICE:
+            raise errors.InvalidOrderFormatError(
+                'Expected a market order without a price. '
+            )
+        return cls(**fields, _private_call=False)
+
+
 class LSEIcebergOrder(order_lib.IcebergOrder):
+
+    __slots__ = ()
+
     @classmethod
     def from_ascii_string(cls, string: str) -> Order:
         fields = _validate_order_string(string)
@@ -81,7 +529,9 @@ class LSEIcebergOrder(order_lib.IcebergOrder):
 
 
 def _validate_order_string(
-    x: str, delimiter: str = ',', should_validate: bool = True,
+    x: str,
+    delimiter: str = ',',
+    should_validate: bool = True,
 ) -> Dict:
 
     if not isinstance(x, str):
@@ -90,8 +540,21 @@ def _validate_order_string(
     if delimiter not in x:
         raise ValueError('Could not find the "%s" delimiter. ' % delimiter)
 
+    # Tolerate a trailing LF or CRLF line ending, as the bulk parser does
+    if x.endswith('\n'):
+        x = x[:-1]
+    if x.endswith('\r'):
+        x = x[:-1]
+
+    split = x.split(delimiter)
+    if len(split) < _MIN_MESSAGE_FIELDS:
+        raise errors.InvalidOrderFormatError(
+            'Expected at least %s fields. Received `%s`'
+            % (_MIN_MESSAGE_FIELDS, x)
+        )
+
     fields = {}
-    for index, field in enumerate(x.split(delimiter)):
+    for index, field in enumerate(split):
 
         try:
             validator = MESSAGE_FORMAT_SETSmm[index]
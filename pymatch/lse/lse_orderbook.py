@@ -5,8 +5,182 @@
 #
 # """ LSE Orderbook """
 
+from typing import List, Optional, Tuple
+
+import numpy as np
+
 from pymatch import orderbook as orderbook_lib, order as order_lib, errors
+from pymatch import display as display_lib
 from pymatch._typing import Order
+from pymatch.lse import lse_order as lse_order_lib
+
+# Note: an enum member is looked up through its module and class on every
+# access, so `add` reads them once from here
+_BUY = order_lib.OrderSide.BUY
+_SELL = order_lib.OrderSide.SELL
+_MARKET = order_lib.OrderType.MARKET
+_ICEBERG = order_lib.OrderType.ICEBERG
+_STOP = order_lib.OrderType.STOP
+_STOP_LIMIT = order_lib.OrderType.STOP_LIMIT
+_DAY = order_lib.TimeInForce.DAY
+_FOK = order_lib.TimeInForce.FOK
+
+
+def _allocate_iceberg_peaks(
+    queue: orderbook_lib._PriceLevel, quantity: int
+) -> List[Tuple[orderbook_lib._QueueNode, int]]:
+    r""" Allocates an aggressive quantity across the orders of a price level
+    as the iceberg round robin would: each pass through the queue fills
+    every order up to its displayed peak, in time-priority, until the
+    aggressive quantity is consumed or the level is exhausted.
+
+    Rather than stepping through the queue one peak at a time, the number
+    of full rounds after the first is computed arithmetically across all
+    icebergs; only the first and the final partial round are walked.
+
+    Parameters:
+        queue: the price level to allocate against
+        quantity: the quantity of the aggressive order
+
+    Returns:
+        A list of (node, allocated quantity) pairs in time-priority
+    """
+
+    # First round: fill the currently displayed peaks in time-priority
+    allocations = []
+    for node in queue.nodes():
+        if quantity <= 0:
+            return allocations
+
+        allocated = min(quantity, node.order.display_quantity)
+        allocations.append([node, allocated])
+        quantity -= allocated
+
+    if quantity <= 0:
+        return allocations
+
+    # Later rounds: only icebergs with hidden volume take part and each
+    # shows a fresh peak per round
+    hidden = []
+    for allocation in allocations:
+        node, allocated = allocation
+        hidden_quantity = node.order.quantity - allocated
+        if hidden_quantity > 0:
+            hidden.append((allocation, hidden_quantity, node.order.peak_size))
+
+    if not hidden:
+        return allocations
+
+    def consumed(rounds: int) -> int:
+        return sum(
+            min(rounds * peak_size, hidden_quantity)
+            for _, hidden_quantity, peak_size in hidden
+        )
+
+    # Find the number of full rounds that the remaining quantity can fill
+    low, high = 0, max(
+        -(-hidden_quantity // peak_size)
+        for _, hidden_quantity, peak_size in hidden
+    )
+    while low < high:  # O(k log(rounds))
+        rounds = (low + high + 1) // 2
+        if consumed(rounds) <= quantity:
+            low = rounds
+        else:
+            high = rounds - 1
+
+    for allocation, hidden_quantity, peak_size in hidden:
+        allocated = min(low * peak_size, hidden_quantity)
+        allocation[1] += allocated
+        quantity -= allocated
+
+    # Final partial round
+    for allocation, hidden_quantity, peak_size in hidden:
+        if quantity <= 0:
+            break
+
+        allocated = min(quantity, peak_size, hidden_quantity - low * peak_size)
+        if allocated > 0:
+            allocation[1] += allocated
+            quantity -= allocated
+
+    return allocations
+
+
+def _uncrossing_price(
+    bids: Tuple[np.ndarray, np.ndarray],
+    asks: Tuple[np.ndarray, np.ndarray],
+    market_bid_quantity: int = 0,
+    market_ask_quantity: int = 0,
+    reference_price: int = orderbook_lib.INTEGER_NAN,
+) -> Tuple[int, int]:
+    r""" Computes the price of an auction by the LSE rules, over the price
+    levels of both sides at once; each level price is a candidate. Amongst
+    the candidates, the auction price:
+
+        1. maximizes the executable volume, the lesser of the cumulative
+           bid volume at or above and the ask volume at or below the price
+        2. minimizes the surplus, the volume left unexecuted at the price
+        3. follows the market pressure: the highest price if the surplus is
+           on the bid side at every remaining candidate, the lowest if it
+           is on the ask side
+        4. is otherwise the reference price, or the remaining candidate
+           closest to it; the median remaining candidate if there is no
+           reference price
+
+    Parameters:
+        bids: the (prices, quantities) of the bid levels, from the touch
+            outward, see `depth`
+        asks: the (prices, quantities) of the ask levels, from the touch
+            outward
+        market_bid_quantity: the quantity of the market buy orders, which
+            execute at any price
+        market_ask_quantity: the quantity of the market sell orders
+        reference_price: e.g. the last trade price or `INTEGER_NAN`
+
+    Returns:
+        A tuple of (price, volume); (`INTEGER_NAN`, 0) if nothing executes
+    """
+    bid_prices, bid_quantities = bids[0][::-1], bids[1][::-1]  # ascending
+    ask_prices, ask_quantities = asks
+
+    prices = np.union1d(bid_prices, ask_prices)  # O(n log(n))
+
+    # The cumulative volume on either side of every candidate price
+    bid_volume = np.concatenate(([0], np.cumsum(bid_quantities)))
+    ask_volume = np.concatenate(([0], np.cumsum(ask_quantities)))
+    demand = market_bid_quantity + (
+        bid_volume[-1]
+        - bid_volume[np.searchsorted(bid_prices, prices, side='left')]
+    )
+    supply = market_ask_quantity + (
+        ask_volume[np.searchsorted(ask_prices, prices, side='right')]
+    )
+
+    volume = np.minimum(demand, supply)
+    if not len(volume) or volume.max() <= 0:
+        return orderbook_lib.INTEGER_NAN, 0
+
+    # [1] maximum executable volume
+    is_candidate = volume == volume.max()
+
+    # [2] minimum surplus
+    surplus = demand - supply  # positive on the bid side
+    is_candidate &= np.abs(surplus) == np.abs(surplus[is_candidate]).min()
+
+    prices, surplus = prices[is_candidate], surplus[is_candidate]
+    max_volume = int(volume[is_candidate][0])
+
+    # [3] market pressure
+    if (surplus > 0).all():
+        return int(prices[-1]), max_volume
+    if (surplus < 0).all():
+        return int(prices[0]), max_volume
+
+    # [4] reference price
+    if reference_price == orderbook_lib.INTEGER_NAN:
+        return int(prices[(len(prices) - 1) // 2]), max_volume
+    return int(np.clip(reference_price, prices[0], prices[-1])), max_volume
 
 
 class LSEOrderbook(orderbook_lib._BaseOrderbook):
@@ -14,37 +188,509 @@ class LSEOrderbook(orderbook_lib._BaseOrderbook):
     to the orderbook in price-time priority.
     """
 
-    def cancel(self, order: Order) -> None:
-        raise errors.OrderbookMethodNotSupportedError(
-            'Canceling orders is not yet supported! '
-        )
+    def cancel(self, identity: int) -> Order:
+
+        if identity in self._stops:
+            return self._cancel_stop(identity)  # held off the book
+
+        if identity in self._auction_orders:
+            return self._auction_orders.pop(identity)  # held for the auction
+
+        node = self._get_order_handle(identity)  # O(1)
+        order = node.order
+
+        if self._order_store is not None:
+            order = order.to_order()  # the slot is recycled on removal
+
+        if order.side is order_lib.OrderSide.BUY:
+            self._bids.remove(node)
+        else:
+            self._asks.remove(node)
+
+        if self._is_delta:
+            self._output_delta_message(
+                display_lib.DELTA_DELETE,
+                order.identity,
+                order.side,
+                order.price,
+                0,
+            )
+        elif self._is_display:
+            self._output_quote_message()
+
+        return order
 
     def modify(self, order: Order) -> None:
-        raise errors.OrderbookMethodNotSupportedError(
-            'Modifying orders it not yet supported! '
+        r""" Amends a resting order given an order with the same identity.
+        The `quantity` of the given order is the new remaining quantity.
+
+        A quantity reduction at the same price is amended in place and keeps
+        its time-priority. A price change, a quantity increase or a change
+        of the iceberg peak loses time-priority: the resting order is
+        removed and the given order re-enters through `add`, so it may
+        trade if it now crosses the book.
+        """
+
+        node = self._get_order_handle(order.identity)  # O(1)
+        resting_order = node.order
+
+        if order.side is not resting_order.side:
+            raise errors.InvalidModificationError(
+                'The side of a resting order can not be modified. '
+            )
+
+        if order.side is order_lib.OrderSide.BUY:
+            making_orderbook = self._bids
+        else:
+            making_orderbook = self._asks
+
+        if order.type is not order_lib.OrderType.MARKET:
+            # Note: before the resting order is removed, so that a price the
+            # book can not hold leaves it untouched
+            making_orderbook._validate_price(order.price)
+
+        if order.quantity <= 0:
+            self.cancel(order.identity)
+            return
+
+        is_priority_preserved = (
+            order.price == resting_order.price
+            and order.quantity <= resting_order.quantity
+            and order.type is resting_order.type
+        )
+
+        if (
+            is_priority_preserved
+            and order.type is order_lib.OrderType.ICEBERG
+            and order.peak_size != resting_order.peak_size
+        ):
+            is_priority_preserved = False
+
+        if is_priority_preserved:
+            # Amend in place, the order keeps its position in the queue
+            queue = node.level
+            displayed_quantity = resting_order.display_quantity
+            reduction = resting_order.quantity - order.quantity
+
+            queue.quantity -= reduction
+            resting_order.quantity = order.quantity
+
+            if making_orderbook._depth_index is not None and reduction:
+                making_orderbook._update_depth_index(order.price, -reduction)
+
+            if order.type is order_lib.OrderType.ICEBERG:
+                resting_order.peak_quantity = min(
+                    resting_order.peak_quantity, resting_order.quantity
+                )
+
+            queue.display_quantity += (
+                resting_order.display_quantity - displayed_quantity
+            )
+
+            if self._is_delta:
+                self._output_delta_message(
+                    display_lib.DELTA_UPDATE,
+                    resting_order.identity,
+                    resting_order.side,
+                    resting_order.price,
+                    resting_order.display_quantity,
+                )
+            elif self._is_display:
+                self._output_quote_message()
+            return
+
+        if self._is_delta:
+            # Note: the order re-enters the book at the back of its level
+            self._output_delta_message(
+                display_lib.DELTA_DELETE,
+                resting_order.identity,
+                resting_order.side,
+                resting_order.price,
+                0,
+            )
+
+        making_orderbook.remove(node)  # O(1) or O(log(n)) if level depleted
+        return self.add(order)
+
+    def _output_fill_delta_message(
+        self, resting_order: Order, side: order_lib.OrderSide, price: int
+    ) -> None:
+        # Note: the side and price are passed in, a filled order may have
+        # already been removed from the order store
+        if resting_order.quantity == 0:
+            self._output_delta_message(
+                display_lib.DELTA_DELETE,
+                resting_order.identity,
+                side,
+                price,
+                0,
+            )
+        else:
+            self._output_delta_message(
+                display_lib.DELTA_UPDATE,
+                resting_order.identity,
+                side,
+                price,
+                resting_order.display_quantity,
+            )
+
+    def _sweep(
+        self,
+        order: Order,
+        taking_orderbook: orderbook_lib._BasePriceLevelContainer,
+    ) -> Optional[int]:
+        r""" Fills a market order against every price level that it can
+        consume whole, from the touch outward. A whole level fills each of
+        its orders, icebergs included, in time-priority, so that neither the
+        price nor the peaks need to be checked per order.
+
+        Note: the remaining quantity is less than the next level, which is
+        left for the matching loop of `add`.
+
+        Returns:
+            The price of the last level consumed, or `None`
+        """
+        side = taking_orderbook._side
+        price = None
+        while 1:
+            queue = taking_orderbook.best_level  # O(1)
+            if queue is None or order.quantity < queue.quantity:
+                return price
+
+            price = queue.price
+            order.quantity -= queue.quantity
+
+            if self._is_display:
+                for node in queue.nodes():
+                    resting_order = node.order
+                    matched_quantity = resting_order.quantity
+                    resting_order.quantity = 0
+
+                    self._output_trade_message(
+                        order, resting_order, price, matched_quantity
+                    )
+
+                    if self._is_delta:
+                        self._output_fill_delta_message(
+                            resting_order, side, price
+                        )
+
+            taking_orderbook._remove_level(price)  # O(orders in the level)
+
+    def start_auction(self) -> None:
+        r""" Enters a call auction, e.g. the opening or the closing auction.
+        Until `uncross` is called, orders accumulate on the book without
+        matching, so that the book may cross, and market orders are held
+        to execute first at the uncrossing. Only day orders are accepted.
+        """
+        self._is_auction = True
+
+    def uncross(
+        self, reference_price: Optional[int] = None
+    ) -> Tuple[int, int]:
+        r""" Ends the call auction: executes all of the crossed volume at a
+        single price, see `_uncrossing_price`, and resumes continuous
+        matching. Orders execute in price-time priority, market orders
+        first; the residual of the market orders is cancelled.
+
+        Note: the price is found from the running aggregates of the price
+        levels, in O(levels); only the executed orders are visited.
+
+        Parameters:
+            reference_price: the price used when the other rules leave a
+                choice, defaults to the last trade price
+
+        Returns:
+            A tuple of (price, volume) of the auction; (`INTEGER_NAN`, 0) if
+            nothing executed
+        """
+        if reference_price is None:
+            reference_price = self._last_trade_price
+
+        market_orders = {
+            order_lib.OrderSide.BUY: [],
+            order_lib.OrderSide.SELL: [],
+        }
+        for order in self._auction_orders.values():
+            market_orders[order.side].append(order)
+
+        bids, asks = self.depth()
+        price, volume = _uncrossing_price(
+            bids[:2],
+            asks[:2],
+            sum(
+                order.quantity
+                for order in market_orders[order_lib.OrderSide.BUY]
+            ),
+            sum(
+                order.quantity
+                for order in market_orders[order_lib.OrderSide.SELL]
+            ),
+            reference_price,
         )
 
+        self._is_auction = False
+        self._auction_orders = {}
+
+        if volume:
+            fills = [
+                self._execute_auction_side(
+                    self._bids,
+                    market_orders[order_lib.OrderSide.BUY],
+                    price,
+                    volume,
+                ),
+                self._execute_auction_side(
+                    self._asks,
+                    market_orders[order_lib.OrderSide.SELL],
+                    price,
+                    volume,
+                ),
+            ]
+
+            if self._is_display:
+                self._output_auction_trade_messages(*fills, price)
+
+        if self._order_pool is not None:
+            # The market orders are filled, or their residual is cancelled
+            for orders in market_orders.values():
+                for order in orders:
+                    self._order_pool.release(order)
+
+        if self._is_display and not self._is_delta:
+            self._output_quote_message()
+
+        if volume:
+            self._trigger_stops(price, price)
+
+        return price, volume
+
+    def _add_to_auction(
+        self,
+        order: Order,
+        making_orderbook: orderbook_lib._BasePriceLevelContainer,
+    ) -> None:
+
+        if order.time_in_force is not order_lib.TimeInForce.DAY:
+            raise errors.InvalidAuctionOrderError(
+                f'Received a {order.time_in_force.name} order during an '
+                'auction; only day orders are accepted. '
+            )
+
+        if order.type is order_lib.OrderType.MARKET:
+            self._auction_orders[order.identity] = order
+            return
+
+        resting_node = making_orderbook.add(order)  # without matching
+
+        if self._order_pool is not None and self._order_store is not None:
+            self._order_pool.release(order)  # copied into the order store
+
+        if self._is_delta:
+            resting_order = resting_node.order
+            self._output_delta_message(
+                display_lib.DELTA_NEW,
+                resting_order.identity,
+                resting_order.side,
+                resting_order.price,
+                resting_order.display_quantity,
+            )
+        elif self._is_display:
+            self._output_quote_message()
+
+    def _execute_auction_side(
+        self,
+        making_orderbook: orderbook_lib._BasePriceLevelContainer,
+        market_orders: List[Order],
+        price: int,
+        volume: int,
+    ) -> List[Tuple[int, int]]:
+        r""" Fills `volume` from one side of the book at the auction price:
+        the market orders in arrival order, then every price level that is
+        consumed whole, and finally the last level as the matching loop of
+        `add` would fill it, see `_allocate_iceberg_peaks`.
+
+        Returns:
+            The (identity, quantity) of the fills in priority order; those
+            of the levels consumed whole only if the book is displayed
+        """
+        side = making_orderbook._side
+        fills = []
+
+        for order in market_orders:
+            if not volume:
+                break
+
+            matched_quantity = min(order.quantity, volume)
+            order.quantity -= matched_quantity
+            volume -= matched_quantity
+            fills.append((order.identity, matched_quantity))
+
+        while volume:
+            queue = making_orderbook.best_level  # O(1)
+            level_price = queue.price
+
+            if queue.quantity <= volume:
+                # Consume the whole level, see `_sweep`
+                volume -= queue.quantity
+
+                if self._is_display:
+                    for node in queue.nodes():
+                        resting_order = node.order
+                        fills.append(
+                            (resting_order.identity, resting_order.quantity)
+                        )
+                        resting_order.quantity = 0
+
+                        if self._is_delta:
+                            self._output_fill_delta_message(
+                                resting_order, side, level_price
+                            )
+
+                making_orderbook._remove_level(level_price)
+                continue
+
+            level_quantity = queue.quantity
+            for node, matched_quantity in _allocate_iceberg_peaks(
+                queue, volume
+            ):
+                resting_order = node.order
+                displayed_quantity = resting_order.display_quantity
+                fills.append((resting_order.identity, matched_quantity))
+
+                resting_order.quantity -= matched_quantity
+                queue.quantity -= matched_quantity
+
+                resting_order._update_display_quantity(matched_quantity)
+                queue.display_quantity += (
+                    resting_order.display_quantity - displayed_quantity
+                )
+
+                if self._is_delta:
+                    self._output_fill_delta_message(
+                        resting_order, side, level_price
+                    )
+
+                if resting_order.quantity == 0:
+                    making_orderbook.remove(node, prune=False)
+
+            if making_orderbook._depth_index is not None:
+                making_orderbook._update_depth_index(
+                    level_price, queue.quantity - level_quantity
+                )
+            break  # the level holds more than the remaining volume
+
+        return fills
+
+    def _output_auction_trade_messages(
+        self,
+        bid_fills: List[Tuple[int, int]],
+        ask_fills: List[Tuple[int, int]],
+        price: int,
+    ) -> None:
+        # Note: pair the fills of both sides in priority order, both sum to
+        # the auction volume
+        bid_fills, ask_fills = iter(bid_fills), iter(ask_fills)
+        bid_identity, bid_quantity = next(bid_fills)
+        ask_identity, ask_quantity = next(ask_fills)
+        while 1:
+            matched_quantity = min(bid_quantity, ask_quantity)
+            message = display_lib.TradeFormat(
+                bid_identity, ask_identity, price, matched_quantity
+            )
+            self._output_sink.write(message.body)
+
+            bid_quantity -= matched_quantity
+            ask_quantity -= matched_quantity
+            try:
+                if not bid_quantity:
+                    bid_identity, bid_quantity = next(bid_fills)
+                if not ask_quantity:
+                    ask_identity, ask_quantity = next(ask_fills)
+            except StopIteration:
+                return
+
+    def add_array(self, orders: np.ndarray) -> None:
+        r""" Adds a structured array of parsed SETSmm messages to the book in
+        array order, see `pymatch.lse.parse_setsmm_buffer`.
+
+        Orders are built straight from the columns, recycled through the
+        order pool of the book if it has one.
+        """
+        for order in lse_order_lib.build_orders_from_array(
+            orders, self._order_pool
+        ):
+            self.add(order)
+
     def add(self, order: Order) -> None:  # noqa: C901
 
-        if order.side is order_lib.OrderSide.BUY:  # Aggressive buy order
+        order_type = order.type
+        if order_type is _STOP or order_type is _STOP_LIMIT:
+            return self._add_stop(order)  # held off the book
+
+        if order.side is _BUY:  # Aggressive buy order
             taking_orderbook = self._asks
             making_orderbook = self._bids
             index = 0
 
-        elif order.side is order_lib.OrderSide.SELL:  # Aggressive sell order
+        elif order.side is _SELL:  # Aggressive sell order
             taking_orderbook = self._bids
             making_orderbook = self._asks
             index = -1
 
-        while 1:
+        # Only day orders rest; the residual of an immediate-or-cancel or a
+        # fill-or-kill order is cancelled, as is that of a market order
+        is_market = order_type is _MARKET
+        is_resting = not is_market and order.time_in_force is _DAY
+
+        if not is_market:
+            # Note: before any matching, an order that could not rest on a
+            # tick ladder must not execute in part either
+            making_orderbook._validate_price(order.price)
+
+        if self._is_auction:
+            return self._add_to_auction(order, making_orderbook)
+
+        # Note: read once per order, the default book uses none of them
+        is_display = self._is_display
+        is_delta = self._is_delta
+        depth_index = taking_orderbook._depth_index
+
+        # The trades of the order print from the touch outward, up to the
+        # last matched price level; the first is only needed to trigger
+        # stops, and none can be added whilst this order matches
+        has_stops = bool(self._stops or self._triggered)
+        if has_stops:
+            first_price = taking_orderbook.best_price
+        last_price = None
+
+        if not is_resting:
+            # A fill-or-kill, an immediate-or-cancel or a market order; a
+            # day limit order, by far the most common, skips these checks
+            if order.time_in_force is _FOK and (
+                not taking_orderbook._can_fill(
+                    None if is_market else order.price, order.quantity
+                )
+            ):
+                # Fill-or-kill: the order is rejected without touching the
+                # book
+                if self._order_pool is not None:
+                    self._order_pool.release(order)
+                return
+
+            if is_market:
+                # Consume whole price levels first, only the last level that
+                # is partially filled goes through the matching loop
+                last_price = self._sweep(order, taking_orderbook)
+
+        resting_node = None
+        while order.quantity > 0 or not is_market:
             # Start with the best available price level and work toward the
             # edges of the book
 
-            try:
-                # [1] O(log(n))
-                price, queue = taking_orderbook.peekitem(index)
-            except IndexError:
-                if order.quantity > 0:
+            queue = taking_orderbook.best_level  # [1] O(1)
+            if queue is None:
+                if order.quantity > 0 and is_resting:
                     # Case 1:
                     # The price-level does not yet exist so this becomes
                     # a passive order that sits on the book
@@ -53,10 +699,15 @@ class LSEOrderbook(orderbook_lib._BaseOrderbook):
                     # The order has eaten through all price-levels of the book
                     # There is not enough liquidity and the aggressive order
                     # becomes unfilled, sitting on the top of the book
-                    making_orderbook.add(order)
+                    #
+                    # Note: the unfilled residual of a market, an
+                    # immediate-or-cancel or a fill-or-kill order is
+                    # cancelled, it never rests on the book
+                    resting_node = making_orderbook.add(order)
                 break
 
-            if order.type is not order_lib.OrderType.MARKET:
+            price = queue.price
+            if not is_market:
                 # Only market orders can eat through all available levels.
                 # All other orders are limits, and can only execute at
                 # better prices:
@@ -65,30 +716,36 @@ class LSEOrderbook(orderbook_lib._BaseOrderbook):
                 elif index < 0 and price - order.price >= 0:  # sell-order
                     pass
                 else:
-                    making_orderbook.add(order)  # [3]
+                    if is_resting:
+                        resting_node = making_orderbook.add(order)  # [3]
                     break
 
-            queue_position = 0
-            peaked_matches = {}
-            while queue_position < len(queue):  # [2] O(log(n))
+            last_price = price
+            node = queue.head
+            level_quantity = queue.quantity
+            while node is not None:  # [2] O(1) per resting order
 
-                resting_order = queue[queue_position]
+                resting_order = node.order
                 matched_price = resting_order.price
+                next_node = node.next
+                is_iceberg = resting_order.type is _ICEBERG
+                displayed_quantity = resting_order.display_quantity
 
-                if resting_order.display_quantity >= order.quantity:
+                if displayed_quantity >= order.quantity:
                     # Case 0: resting order (or ice berg peak)
                     # has enough volume to totally fill order + reserve
 
                     matched_quantity = order.quantity
                     resting_order.quantity -= matched_quantity
+                    queue.quantity -= matched_quantity
                     order.quantity = 0
 
                     should_break = True
 
                     if resting_order.quantity == 0:
-                        del queue[queue_position]  # [2]
+                        taking_orderbook.remove(node, prune=False)  # [2]
 
-                elif resting_order.type is order_lib.OrderType.ICEBERG:
+                elif is_iceberg:
 
                     should_break = True
 
@@ -103,66 +760,50 @@ class LSEOrderbook(orderbook_lib._BaseOrderbook):
                         )
 
                         resting_order.quantity -= matched_quantity
+                        queue.quantity -= matched_quantity
                         order.quantity -= matched_quantity
 
                         if resting_order.quantity == 0:
-                            del queue[queue_position]  # [2]
+                            taking_orderbook.remove(node, prune=False)  # [2]
 
                     else:
                         # Case 1B: special handing of iceberg orders
                         # i) order is greater than the peak
                         # ii) ice-berg peaks must maintain time-priority among
                         # each other
-                        del queue_position
                         del resting_order
 
-                        queue_position = 0
-                        while queue_position < len(queue):  # [2]
-                            # Recursively re-enter the queue and build up
-                            # peak executions
-                            resting_order = queue[queue_position]
-
-                            matched_quantity = min(
-                                order.quantity, resting_order.display_quantity
-                            )
+                        peaked_matches = {}
+                        for node, matched_quantity in _allocate_iceberg_peaks(
+                            queue, order.quantity
+                        ):
+                            resting_order = node.order
+                            displayed_quantity = resting_order.display_quantity
 
                             order.quantity -= matched_quantity
                             resting_order.quantity -= matched_quantity
+                            queue.quantity -= matched_quantity
 
                             resting_order._update_display_quantity(
                                 matched_quantity
                             )
+                            queue.display_quantity += (
+                                resting_order.display_quantity
+                                - displayed_quantity
+                            )
 
-                            if (
-                                resting_order.identity not in peaked_matches
-                            ):  # noqa: E501
-                                new_execution = [
-                                    matched_quantity,
-                                    resting_order,
-                                ]  # noqa: E501
-                                peaked_matches[
-                                    resting_order.identity
-                                ] = new_execution  # noqa: E501
-                            else:
-                                last_execution = peaked_matches[
-                                    resting_order.identity
-                                ]  # noqa: E501
-                                last_execution[0] += matched_quantity
+                            # Print as an aggregated match
+                            peaked_matches[resting_order.identity] = [
+                                matched_quantity,
+                                resting_order,
+                            ]
 
                             if resting_order.quantity == 0:
-                                del queue[queue_position]  # [2]
-
-                            # Exit only if we fill the order or we have
-                            # consumed all the orders in the queue
-                            if order.quantity <= 0:
-                                break
-
-                            queue_position += 1
-                            if len(queue) <= queue_position:
-                                queue_position = 0  # new cycle
+                                taking_orderbook.remove(  # [2]
+                                    node, prune=False
+                                )
 
-                        if self._is_display:
-                            # Print as an aggregated match
+                        if is_display:
                             for (
                                 matched_quantity,
                                 resting_order,
@@ -174,38 +815,64 @@ class LSEOrderbook(orderbook_lib._BaseOrderbook):
                                     matched_quantity,
                                 )
 
+                                if is_delta:
+                                    self._output_fill_delta_message(
+                                        resting_order,
+                                        taking_orderbook._side,
+                                        matched_price,
+                                    )
+
+                        break  # the peaks have been matched as a whole
+
                 else:
                     # Case 2: resting order does not have enough volume to
                     # fill order. Use the entire order and move to the next
                     matched_quantity = resting_order.quantity
                     order.quantity -= resting_order.quantity
+                    queue.quantity -= matched_quantity
                     resting_order.quantity = 0
 
                     # => Remove and continue to next resting order or next
                     # price level
-                    del queue[queue_position]  # [2]
+                    taking_orderbook.remove(node, prune=False)  # [2]
 
                     should_break = False
-                    queue_position += 1
-
-                if not peaked_matches:
-                    # If the dict is not populated then we never iterated
-                    # through multiple peaks.
 
+                if is_iceberg:
                     # Update the display quantity of the order given the match
                     resting_order._update_display_quantity(matched_quantity)
-
-                    if self._is_display:
-                        self._output_trade_message(
-                            order,
+                    queue.display_quantity += (
+                        resting_order.display_quantity - displayed_quantity
+                    )
+                else:
+                    # A limit order displays all of its quantity
+                    queue.display_quantity -= matched_quantity
+
+                if is_display:
+                    self._output_trade_message(
+                        order,
+                        resting_order,
+                        matched_price,
+                        matched_quantity,
+                    )
+
+                    if is_delta:
+                        self._output_fill_delta_message(
                             resting_order,
+                            taking_orderbook._side,
                             matched_price,
-                            matched_quantity,
                         )
 
                 if should_break:
                     break
 
+                node = next_node
+
+            if depth_index is not None and queue.quantity != level_quantity:
+                taking_orderbook._update_depth_index(
+                    price, queue.quantity - level_quantity
+                )
+
             if not queue:
                 # queue is depleted remove the price-level
                 del taking_orderbook[price]  # [1] - approximate
@@ -213,13 +880,39 @@ class LSEOrderbook(orderbook_lib._BaseOrderbook):
             if order.quantity > 0:
                 # Move onto the next available price level:
                 # We may have deleted the best available price, so the next
-                # `index` will become the next best
+                # level will become the container's `best_level`
                 pass
             else:
                 break  # break top-level while loop
 
-        if self._is_display:
-            return self._output_quote_message()
+        if self._order_pool is not None and (
+            resting_node is None or self._order_store is not None
+        ):
+            # The order is no longer referenced by the book; it was either
+            # fully filled, cancelled or copied into the order store
+            self._order_pool.release(order)
+
+        if is_delta:
+            if resting_node is not None:
+                resting_order = resting_node.order
+                self._output_delta_message(
+                    display_lib.DELTA_NEW,
+                    resting_order.identity,
+                    resting_order.side,
+                    resting_order.price,
+                    resting_order.display_quantity,
+                )
+        elif is_display:
+            self._output_quote_message()
+
+        if last_price is None:
+            pass  # the order did not trade
+        elif has_stops:
+            # Note: after the messages of the order itself, so that those of
+            # any triggered stop orders follow them
+            self._trigger_stops(first_price, last_price)
+        else:
+            self._last_trade_price = last_price
 
 
 # EOF
@@ -4,9 +4,15 @@
 #
 # """ Helper modules """
 
+from typing import Optional
+
+import os
 import sys
+import mmap
+import argparse
 
-from pymatch import lse as lse_order_lib, orderbook as orderbook_lib
+from pymatch import lse as lse_order_lib, orderbook as orderbook_lib, errors
+from pymatch import pipeline as pipeline_lib, sink as sink_lib
 
 PROGRAM_HEADER = """
 ██████╗ ██╗   ██╗███╗   ███╗ █████╗ ████████╗ ██████╗██╗  ██╗
@@ -18,32 +24,206 @@ PROGRAM_HEADER = """
 """
 
 
-def _run_lse_orderbook_from_stdin():
+INPUT_FORMAT_ASCII = 'ascii'
+INPUT_FORMAT_BINARY = 'binary'
+
+DEFAULT_CHUNK_SIZE = 1 << 20  # bytes
+# Note: matching holds the GIL, so a background parser mostly pays off when
+# the input itself is slow, e.g. a pipe from a remote gateway
+DEFAULT_PREFETCH = 0  # chunks
+
+
+def _parse_args(args=None) -> argparse.Namespace:
+
+    parser = argparse.ArgumentParser(
+        prog='pymatch.main',
+        description=(
+            'Submit SETSmm orders to the matching engine via stdin or a file'
+        ),
+    )
+    parser.add_argument(
+        '--input',
+        metavar='FILE',
+        default=None,
+        help='a file of orders to memory-map and replay instead of stdin',
+    )
+    parser.add_argument(
+        '--format',
+        choices=[INPUT_FORMAT_ASCII, INPUT_FORMAT_BINARY],
+        default=INPUT_FORMAT_ASCII,
+        help=(
+            'the message format: comma separated lines or fixed-width '
+            'binary records, see `pymatch.lse.lse_binary`'
+        ),
+    )
+    parser.add_argument(
+        '--output',
+        metavar='FILE',
+        default=None,
+        help='a file to write quote and trade messages to instead of stdout',
+    )
+    parser.add_argument(
+        '--feed',
+        choices=[orderbook_lib.FEED_BOOK, orderbook_lib.FEED_DELTA],
+        default=orderbook_lib.FEED_BOOK,
+        help=(
+            'the market data: the full book after every order, or one '
+            'message per change to a resting order'
+        ),
+    )
+    parser.add_argument(
+        '--display-levels',
+        metavar='LEVELS',
+        type=int,
+        default=None,
+        help='the number of price levels per side displayed by the book feed',
+    )
+    parser.add_argument(
+        '--quote-every',
+        metavar='UPDATES',
+        type=int,
+        default=1,
+        help='publish the book feed at most once every number of updates',
+    )
+    parser.add_argument(
+        '--quote-interval',
+        metavar='SECONDS',
+        type=float,
+        default=None,
+        help='publish the book feed at most once every number of seconds',
+    )
+    parser.add_argument(
+        '--quote-on-bbo',
+        action='store_true',
+        help='only publish the book feed when the best bid or ask changed',
+    )
+    parser.add_argument(
+        '--chunk-size',
+        metavar='BYTES',
+        type=int,
+        default=DEFAULT_CHUNK_SIZE,
+        help='the number of bytes of input parsed and matched per batch',
+    )
+    parser.add_argument(
+        '--prefetch',
+        metavar='CHUNKS',
+        type=int,
+        default=DEFAULT_PREFETCH,
+        help=(
+            'the number of batches parsed ahead of matching in a background '
+            'thread; 0 parses and matches in turn'
+        ),
+    )
+    return parser.parse_args(args)
+
+
+def _add_chunks(
+    orderbook: orderbook_lib._BaseOrderbook, chunks, prefetch: int
+) -> None:
+
+    # Parse the next batch whilst the current batch is matched. The chunks
+    # stop at the first malformed record, and the orders preceding it are
+    # matched first; as they would be line by line, whatever the chunk size
+    for orders, malformed in pipeline_lib.prefetch(chunks, prefetch):
+        orderbook.add_array(orders)
+
+        if len(malformed):
+            raise errors.InvalidOrderFormatError(
+                f'Received a malformed record: {malformed[0]}. '
+            )
+
+
+def _run_lse_orderbook_from_file(
+    path: str,
+    input_format: str = INPUT_FORMAT_ASCII,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    prefetch: int = DEFAULT_PREFETCH,
+    output_sink: Optional[sink_lib.OutputSink] = None,
+    **orderbook_kwargs,
+):
+
+    sys.stdout.write(f'[INFO] - Reading input from {path}...\n')
+
+    orderbook = lse_order_lib.LSEOrderbook(
+        output_sink=output_sink, **orderbook_kwargs
+    )
+
+    with open(path, 'rb') as stream:
+        if not os.fstat(stream.fileno()).st_size:
+            return  # an empty file can not be mapped
+
+        # Note: the mapped pages are read from the page cache on demand, and
+        # only the chunk being parsed is ever copied
+        buffer = mmap.mmap(stream.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            if hasattr(mmap, 'MADV_SEQUENTIAL'):  # python>=3.8
+                buffer.madvise(mmap.MADV_SEQUENTIAL)
+
+            if input_format == INPUT_FORMAT_BINARY:
+                chunks = lse_order_lib.iter_decode_array(
+                    buffer, chunk_size, stop_at_malformed=True
+                )
+            else:
+                chunks = lse_order_lib.iter_setsmm_buffer(
+                    buffer, chunk_size, stop_at_malformed=True
+                )
+
+            _add_chunks(orderbook, chunks, prefetch)
+            orderbook.publish()
+
+        finally:
+            try:
+                buffer.close()
+            except BufferError:
+                # An exception in flight still references views of the map,
+                # which is unmapped once they are collected
+                pass
+
+
+def _run_lse_orderbook_from_stdin(
+    input_format: str = INPUT_FORMAT_ASCII,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    prefetch: int = DEFAULT_PREFETCH,
+    output_sink: Optional[sink_lib.OutputSink] = None,
+    **orderbook_kwargs,
+):
 
     sys.stdout.write('[INFO] - Expecting input from stdin...\n')
 
-    orderbook = lse_order_lib.LSEOrderbook()
+    orderbook = lse_order_lib.LSEOrderbook(
+        output_sink=output_sink, **orderbook_kwargs
+    )
 
-    orders = []
-    if not sys.stdin.isatty():
+    if input_format == INPUT_FORMAT_ASCII and sys.stdin.isatty():
+        # Interactive input is matched line by line, as it is typed
         for line in sys.stdin:
-            order = lse_order_lib.build_order_from_ascii_string(line)
-            # make the orders first, for performance
-            orders.append(order)
+            if not line.rstrip('\r\n'):
+                continue  # blank lines are skipped, as in a batch
 
-    for order in orders:
-        orderbook.add(order)
-
-    for line in sys.stdin:
+            order = lse_order_lib.build_order_from_ascii_string(line)
+            orderbook.add(order)
+            orderbook.output_sink.flush()
+        orderbook.publish()
+        return
 
-        order = lse_order_lib.build_order_from_ascii_string(line)
+    # Otherwise, stream the input in batches of `chunk_size` bytes; memory
+    # is bounded by the batches in flight rather than the size of the input
+    if input_format == INPUT_FORMAT_BINARY:
+        chunks = lse_order_lib.iter_decode_stream(
+            sys.stdin.buffer, chunk_size, stop_at_malformed=True
+        )
+    else:
+        chunks = lse_order_lib.iter_setsmm_stream(
+            sys.stdin.buffer, chunk_size, stop_at_malformed=True
+        )
 
-        orderbook.add(order)
+    _add_chunks(orderbook, chunks, prefetch)
+    orderbook.publish()
 
 
 if __name__ == '__main__':
 
-    import os
+    args = _parse_args()
 
     sys.stdout.write(f'{PROGRAM_HEADER}\n')
 
@@ -55,7 +235,38 @@ if __name__ == '__main__':
             'Set the `ENABLE_PROFILING=1` flag to enable profiling...\n'
         )
 
-    _run_lse_orderbook_from_stdin()
+    if args.output is not None:
+        output_sink = sink_lib.FileSink(args.output)
+    else:
+        # Batch the messages into fewer, larger writes to stdout
+        output_sink = sink_lib.BufferedSink()
+
+    orderbook_kwargs = dict(
+        feed=args.feed,
+        display_levels=args.display_levels,
+        quote_every=args.quote_every,
+        quote_interval=args.quote_interval,
+        quote_on_bbo=args.quote_on_bbo,
+    )
+
+    with output_sink:
+        if args.input is not None:
+            _run_lse_orderbook_from_file(
+                args.input,
+                args.format,
+                args.chunk_size,
+                args.prefetch,
+                output_sink,
+                **orderbook_kwargs,
+            )
+        else:
+            _run_lse_orderbook_from_stdin(
+                args.format,
+                args.chunk_size,
+                args.prefetch,
+                output_sink,
+                **orderbook_kwargs,
+            )
 
     sys.stdout.write('\n[INFO] - Finished!\n')
 
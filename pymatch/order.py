@@ -8,7 +8,6 @@
 
 import abc
 import enum
-import dataclasses
 
 from pymatch import errors, display as display_lib
 
@@ -26,6 +25,15 @@ class OrderSide(enum.IntEnum):
             return display_lib.BOOK_FORMAT_BODY_ASK
 
 
+# Note: columnar representations (see `pymatch.store` and the bulk parsers)
+# store limit orders with a peak size of zero
+LIMIT_ORDER_PEAK_SIZE = 0
+
+# Note: market orders carry no limit price; they are represented with a
+# price of -1, which no limit order can have
+MARKET_ORDER_PRICE = -1
+
+
 @enum.unique
 class OrderType(enum.IntEnum):
 
@@ -33,26 +41,43 @@ class OrderType(enum.IntEnum):
     LIMIT = 0
     MARKET = 1
     ICEBERG = 2
+    STOP = 3
+    STOP_LIMIT = 4
 
     @property
     def to_display(self) -> str:
         return self.name.capitalize()
 
 
-@dataclasses.dataclass(repr=True, init=False)
+@enum.unique
+class TimeInForce(enum.IntEnum):
+
+    DAY = 0  # any unfilled quantity rests on the book
+    IOC = 1  # immediate-or-cancel: any unfilled quantity is cancelled
+    FOK = 2  # fill-or-kill: the order is filled in full or not at all
+
+
 class _BaseOrder(abc.ABC):
     r""" Base class for constructing `_BaseOrder` orders. All orders using
     the `pymatch` library should use this class when constructing derivative
     orders.
+
+    Note: orders are slotted and carry no per-instance `__dict__`; the order
+    type is a class attribute. Subclasses must declare their own `__slots__`
+    to keep the memory footprint of a resting order small.
     """
 
+    __slots__ = ('identity', 'side', 'price', 'quantity', 'time_in_force')
+
+    type = OrderType.UNKNOWN
+
     def __init__(
         self,
         side: OrderSide,
         identity: int,
         price: int,
         quantity: int,
-        type_: OrderType,
+        time_in_force: TimeInForce = TimeInForce.DAY,
         _private_call: bool = True,
     ):
         r""" Base constructor for building all order super classes.
@@ -62,19 +87,19 @@ class _BaseOrder(abc.ABC):
             identity: an bigint representing the order id
             price: the price of the order
             quantity: the size of the order
+            time_in_force: what happens to any quantity that can not be
+                filled on arrival, see `TimeInForce`
 
         """
 
         if _private_call:
             raise ValueError('Private call: use one of the factory methods! ')
 
-        self.type = type_
         self.identity = identity
         self.side = side
         self.price = price
         self.quantity = quantity
-
-        super().__init__()
+        self.time_in_force = time_in_force
 
     def __repr__(self):
         return (
@@ -99,34 +124,113 @@ class _BaseOrder(abc.ABC):
         return self.side.to_display.format(*args)
 
 
-@dataclasses.dataclass(init=False, repr=False)
 class LimitOrder(_BaseOrder):
     r""" Creates a limit order, a passive order that is placed onto the book
     at a specified level.
     """
 
-    def __init__(self, *args, **kwargs):
-        super().__init__(*args, type_=OrderType.LIMIT, **kwargs)
+    __slots__ = ()
+
+    type = OrderType.LIMIT
+
+    def __init__(
+        self,
+        side: OrderSide,
+        identity: int,
+        price: int,
+        quantity: int,
+        time_in_force: TimeInForce = TimeInForce.DAY,
+        _private_call: bool = True,
+    ):
+        # Note: the constructor chain is flattened on purpose, orders are
+        # built once per message so avoid the `super().__init__()` call
+
+        if _private_call:
+            raise ValueError('Private call: use one of the factory methods! ')
+
+        self.identity = identity
+        self.side = side
+        self.price = price
+        self.quantity = quantity
+        self.time_in_force = time_in_force
+
+    def _update_display_quantity(self, matched_quantity: int) -> None:
+        del matched_quantity  # unused method
+        pass
+
+
+class MarketOrder(_BaseOrder):
+    r""" Creates a market order, an aggressive order that executes against
+    the best available prices, regardless of price, until it is filled.
+
+    Note: a market order never rests on the book. Any quantity left
+    unfilled once the opposite side of the book is exhausted is cancelled.
+    """
+
+    __slots__ = ()
+
+    type = OrderType.MARKET
+
+    def __init__(
+        self,
+        side: OrderSide,
+        identity: int,
+        quantity: int,
+        time_in_force: TimeInForce = TimeInForce.DAY,
+        _private_call: bool = True,
+    ):
+
+        if _private_call:
+            raise ValueError('Private call: use one of the factory methods! ')
+
+        self.identity = identity
+        self.side = side
+        self.price = MARKET_ORDER_PRICE
+        self.quantity = quantity
+        self.time_in_force = time_in_force
 
     def _update_display_quantity(self, matched_quantity: int) -> None:
         del matched_quantity  # unused method
         pass
 
 
-@dataclasses.dataclass(init=False)
 class IcebergOrder(_BaseOrder):
     r""" Creates an iceberg order, a passive order that is placed onto
     the book wherein only the "peak_size" is displayed.
     """
 
-    def __init__(self, peak_size: int, *args, **kwargs):
-        super().__init__(*args, type_=OrderType.ICEBERG, **kwargs)
+    __slots__ = ('peak_size', 'peak_quantity')
+
+    type = OrderType.ICEBERG
+
+    def __init__(
+        self,
+        peak_size: int,
+        side: OrderSide,
+        identity: int,
+        price: int,
+        quantity: int,
+        time_in_force: TimeInForce = TimeInForce.DAY,
+        _private_call: bool = True,
+    ):
+
+        if _private_call:
+            raise ValueError('Private call: use one of the factory methods! ')
+
+        self.identity = identity
+        self.side = side
+        self.price = price
+        self.quantity = quantity
+        self.time_in_force = time_in_force
         self.peak_size = self._validate_peak_size(peak_size)
         self.peak_quantity = self.peak_size  # init peak size
 
     @property
     def display_quantity(self) -> int:
-        return self.peak_quantity
+        # Note: the displayed peak can never exceed the remaining quantity
+        peak_quantity = self.peak_quantity
+        quantity = self.quantity
+        return peak_quantity if peak_quantity < quantity else quantity
 
     def _update_display_quantity(self, matched_quantity: int) -> int:
 
@@ -136,17 +240,20 @@ class IcebergOrder(_BaseOrder):
 
             # The total order size is less than the peak, so display the
             # remaining quantity
-            return self.quantity
+            self.peak_quantity = self.quantity
+            return self.peak_quantity
 
         if matched_quantity >= self.peak_quantity:
             # If the matched quantity is greater than the current
-            # peak-quantity then we should the display the next peak size
-            remainder = matched_quantity % self.peak_size
+            # peak-quantity then we should the display the next peak size;
+            # less whatever the match consumed of the following peaks
+            excess = matched_quantity - self.peak_quantity
+            remainder = excess % self.peak_size
 
-            if not remainder or remainder == self.peak_quantity:
+            if not remainder:
                 self.peak_quantity = self.peak_size  # new peaksize
             else:
-                self.peak_quantity -= remainder
+                self.peak_quantity = self.peak_size - remainder
         else:
             self.peak_quantity -= matched_quantity
             # Otherwise the matched_quantity is less than the displayed peak
@@ -164,4 +271,175 @@ class IcebergOrder(_BaseOrder):
         return peak_size
 
 
+class StopOrder(_BaseOrder):
+    r""" Creates a stop order, a market order that is held off the book
+    until a trade prints at or through its `stop_price`: at or above it for
+    a buy, at or below it for a sell.
+    """
+
+    __slots__ = ('stop_price',)
+
+    type = OrderType.STOP
+
+    def __init__(
+        self,
+        stop_price: int,
+        side: OrderSide,
+        identity: int,
+        quantity: int,
+        time_in_force: TimeInForce = TimeInForce.DAY,
+        _private_call: bool = True,
+    ):
+
+        if _private_call:
+            raise ValueError('Private call: use one of the factory methods! ')
+
+        self.identity = identity
+        self.side = side
+        self.price = MARKET_ORDER_PRICE
+        self.quantity = quantity
+        self.time_in_force = time_in_force
+        self.stop_price = stop_price
+
+    def _update_display_quantity(self, matched_quantity: int) -> None:
+        del matched_quantity  # unused method
+        pass
+
+    def trigger(self, pool: 'OrderPool' = None) -> MarketOrder:
+        r""" Builds the market order that is submitted once the stop is
+        triggered.
+
+        Parameters:
+            pool: an optional `OrderPool` to recycle the order from
+
+        Returns:
+            A `MarketOrder`
+        """
+        fields = dict(
+            side=self.side,
+            identity=self.identity,
+            quantity=self.quantity,
+            time_in_force=self.time_in_force,
+        )
+        if pool is None:
+            return MarketOrder(**fields, _private_call=False)
+        return pool.acquire(MarketOrder, **fields)
+
+
+class StopLimitOrder(_BaseOrder):
+    r""" Creates a stop-limit order, a limit order that is held off the book
+    until a trade prints at or through its `stop_price`, see `StopOrder`.
+    """
+
+    __slots__ = ('stop_price',)
+
+    type = OrderType.STOP_LIMIT
+
+    def __init__(
+        self,
+        stop_price: int,
+        side: OrderSide,
+        identity: int,
+        price: int,
+        quantity: int,
+        time_in_force: TimeInForce = TimeInForce.DAY,
+        _private_call: bool = True,
+    ):
+
+        if _private_call:
+            raise ValueError('Private call: use one of the factory methods! ')
+
+        self.identity = identity
+        self.side = side
+        self.price = price
+        self.quantity = quantity
+        self.time_in_force = time_in_force
+        self.stop_price = stop_price
+
+    def _update_display_quantity(self, matched_quantity: int) -> None:
+        del matched_quantity  # unused method
+        pass
+
+    def trigger(self, pool: 'OrderPool' = None) -> LimitOrder:
+        r""" Builds the limit order that is submitted once the stop is
+        triggered.
+
+        Parameters:
+            pool: an optional `OrderPool` to recycle the order from
+
+        Returns:
+            A `LimitOrder`
+        """
+        fields = dict(
+            side=self.side,
+            identity=self.identity,
+            price=self.price,
+            quantity=self.quantity,
+            time_in_force=self.time_in_force,
+        )
+        if pool is None:
+            return LimitOrder(**fields, _private_call=False)
+        return pool.acquire(LimitOrder, **fields)
+
+
+class OrderPool:
+    r""" A free-list of order objects. Orders are handed out by `acquire` and
+    re-initialized in place, so that sustained throughput does not churn the
+    allocator (and the garbage collector) with short-lived orders.
+
+    Note: an orderbook given a pool takes back every order once it is fully
+    filled; do not hold references to orders after submitting them.
+    """
+
+    def __init__(self, maxsize: int = 65536):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._free = {}  # given {order_type: List[Order]}
+
+    def __len__(self) -> int:
+        return sum(len(free) for free in self._free.values())
+
+    def acquire(self, order_type: type, **fields) -> _BaseOrder:
+        r""" Returns a recycled order of the given type, or a new one if the
+        pool is empty.
+
+        Parameters:
+            order_type: the class of the order
+            fields: the constructor arguments of the order
+
+        Returns:
+            An order of `order_type`
+        """
+
+        free = self._free.get(order_type)
+
+        if not free:
+            self.misses += 1
+            return order_type(**fields, _private_call=False)
+
+        order = free.pop()
+        try:
+            order.__init__(**fields, _private_call=False)
+        except Exception:
+            free.append(order)  # still unused
+            raise
+
+        self.hits += 1
+        return order
+
+    def release(self, order: _BaseOrder) -> None:
+        r""" Returns an order to the pool """
+
+        free = self._free.get(order.__class__)
+
+        if free is None:
+            if not isinstance(order, _BaseOrder):
+                return  # e.g. a `pymatch.store.StoredOrder` handle
+            free = self._free[order.__class__] = []
+
+        if len(free) < self.maxsize:
+            free.append(order)
+
+
 # EOF
@@ -5,17 +5,23 @@
 #
 # """ Orderbook """
 
-from typing import Dict, List
+from typing import Dict, List, Optional, Tuple
 
 import abc
+import collections
+import itertools
 import os
 import sys
+import time
 
+import numpy as np
 import sortedcontainers
 
 from pymatch._typing import Order
 from pymatch import errors
 from pymatch import order as order_lib, display as display_lib
+from pymatch import store as store_lib, sink as sink_lib
+from pymatch import fenwick as fenwick_lib
 
 # Note: all prices and quantities are expressed in integers so to avoid
 # using a NaN value like float('Inf') (which is a double), we use the maxsize
@@ -24,34 +30,753 @@ INTEGER_NAN = sys.maxsize
 
 ENV_VAR_ENABLE_PROFILING = 'ENABLE_PROFILING'
 
+# A resting order of a level 3 (market-by-order) snapshot, see
+# `_BaseOrderbook.market_by_order`
+MARKET_BY_ORDER_DTYPE = np.dtype(
+    [
+        ('side', np.int8),
+        ('price', np.int64),
+        ('position', np.int64),  # zero-based, within the price level
+        ('identity', np.int64),
+        ('quantity', np.int64),
+        ('peak_size', np.int64),  # `LIMIT_ORDER_PEAK_SIZE` for limits
+        ('display_quantity', np.int64),
+    ]
+)
 
-class _PriceLevelContainer(sortedcontainers.SortedDict):
-    def __init__(self, side: order_lib.OrderSide):
-        self._side = side
-        super().__init__()
+# The display feeds: the whole book after every change, or only the changed
+# orders, see `pymatch.display.DeltaFormat`
+FEED_BOOK = 'book'
+FEED_DELTA = 'delta'
+
+
+class _QueueNode:
+    r""" A handle to an order resting in a `_PriceLevel` queue. The handle
+    remains valid until the order is removed from its queue; at which point
+    its `level` is reset to `None`.
+    """
+
+    __slots__ = ('order', 'level', 'prev', 'next')
+
+    def __init__(self, order: Order, level: '_PriceLevel'):
+        self.order = order
+        self.level = level
+        self.prev = None
+        self.next = None
+
+    def __repr__(self) -> str:
+        return f'{self.__class__.__qualname__}({self.order})'
+
+
+class _PriceLevel:
+    r""" A FIFO queue of all orders resting at a single price level. The
+    queue is a doubly linked list of `_QueueNode` handles; so that popping
+    the front of the queue, removing an arbitrary order given its handle
+    and taking the length are all O(1).
+
+    The level also carries running aggregates: the total `quantity`, the
+    `display_quantity` (limit orders and iceberg peaks only) and the order
+    count, `len(level)`. Appends and removals maintain them; the matching
+    engine must update the quantities on every fill and peak refresh. Depth
+    queries should read these aggregates rather than walking the queue.
+    """
+
+    __slots__ = (
+        'price',
+        'head',
+        'tail',
+        '_size',
+        'quantity',
+        'display_quantity',
+    )
+
+    def __init__(self, price: int):
+        self.price = price
+        self.head = None
+        self.tail = None
+        self._size = 0
+        self.quantity = 0
+        self.display_quantity = 0
+
+    def append(self, order: Order) -> _QueueNode:
+        return self.append_node(_QueueNode(order, self))
+
+    def append_node(self, node: _QueueNode) -> _QueueNode:
+        order = node.order
+
+        if self.tail is None:
+            self.head = node
+        else:
+            node.prev = self.tail
+            self.tail.next = node
+
+        self.tail = node
+        self._size += 1
+        self.quantity += order.quantity
+        self.display_quantity += order.display_quantity
+        return node
+
+    def remove(self, node: _QueueNode) -> None:
+        if node.level is not self:
+            raise ValueError(f'{node} does not rest in {self}. ')
+
+        if node.prev is None:
+            self.head = node.next
+        else:
+            node.prev.next = node.next
+
+        if node.next is None:
+            self.tail = node.prev
+        else:
+            node.next.prev = node.prev
+
+        node.level = node.prev = node.next = None
+        self._size -= 1
+        self.quantity -= node.order.quantity
+        self.display_quantity -= node.order.display_quantity
+
+    def popleft(self) -> Order:
+        if self.head is None:
+            raise IndexError('pop from an empty price level')
+
+        node = self.head
+        self.remove(node)
+        return node.order
+
+    def nodes(self):
+        node = self.head
+        while node is not None:
+            next_node = node.next  # allow removal whilst iterating
+            yield node
+            node = next_node
+
+    def __iter__(self):
+        return (node.order for node in self.nodes())
+
+    def __getitem__(self, index: int) -> Order:
+        # Note: O(k) walk, the matching engine itself never indexes queues
+        if index < 0:
+            index += self._size
+
+        if not 0 <= index < self._size:
+            raise IndexError('price level index out of range')
+
+        for position, order in enumerate(self):
+            if position == index:
+                return order
+
+    def __len__(self) -> int:
+        return self._size
+
+    def __repr__(self) -> str:
+        return (
+            f'{self.__class__.__qualname__}('
+            f'price={self.price} @ orders={self._size})'
+        )
+
+
+class _BasePriceLevelContainer:
+    r""" Behaviour shared by all price-level containers. Every resting order
+    is registered in the orderbook's order-id index when it is added, so
+    that it can later be found and removed without scanning.
+    """
+
+    _side: order_lib.OrderSide
+    _index: Dict
+    _store: Optional[store_lib.OrderStore] = None
+    _pool: Optional[order_lib.OrderPool] = None
+
+    # An optional index of the cumulative quantity over price levels, see
+    # `_TickLadderContainer`
+    _depth_index: Optional[fenwick_lib.FenwickTree] = None
 
-    def add(self, order: Order) -> List:
+    # The top-of-book: the level at the best price or `None` if the container
+    # is empty. It is only updated when a level at the touch is inserted or
+    # deleted
+    best_level: Optional[_PriceLevel] = None
+
+    @property
+    def best_price(self) -> int:
+        if self.best_level is None:
+            return INTEGER_NAN
+        return self.best_level.price
+
+    def add(self, order: Order) -> _QueueNode:
 
         try:
-            queue = self[order.price]  # O(log(n))
-            queue.append(order)  # O(log(n))
+            queue = self[order.price]
         except KeyError:
-            queue = [order]
+            queue = self[order.price] = _PriceLevel(order.price)
 
-        self[order.price] = queue  # O(log(n))
-        return queue
+            best_level = self.best_level
+            if (
+                best_level is None
+                or (order.price - best_level.price) * self._side > 0
+            ):
+                self.best_level = queue  # new touch
+
+        if self._store is None:
+            node = queue.append(order)  # O(1)
+        else:
+            # The store keeps the fields, the level holds the handle to them
+            node = queue.append_node(self._store.allocate(order, queue))
+
+        if self._depth_index is not None:
+            self._update_depth_index(order.price, order.quantity)
+
+        # Note: identities are expected to be unique amongst resting orders.
+        # On a collision, the most recently rested order is indexed
+        self._index[order.identity] = node  # O(1)
+        return node
+
+    def remove(self, node: _QueueNode, prune: bool = True) -> None:
+        r""" Removes a resting order given its handle.
+
+        Parameters:
+            node: the handle of the resting order
+            prune: remove the price level if it is depleted
+        """
+        queue = node.level
+        queue.remove(node)  # O(1)
+
+        if self._depth_index is not None and node.order.quantity:
+            self._update_depth_index(queue.price, -node.order.quantity)
+
+        if self._index.get(node.order.identity) is node:
+            del self._index[node.order.identity]  # O(1)
+
+        if self._store is not None:
+            self._store.release(node)  # O(1), recycles the slot
+        elif self._pool is not None and node.order.quantity == 0:
+            self._pool.release(node.order)  # O(1), recycles a filled order
+
+        if prune and not queue:
+            del self[queue.price]
+
+    def _validate_price(self, price: int) -> None:
+        r""" Raises if an order at `price` could not rest in this container;
+        any price can rest in a sorted container.
+        """
+        pass
+
+    def _remove_level(self, price: int) -> None:
+        r""" Removes a price level together with every order resting in it,
+        e.g. once the level is filled whole. The orders are filled (zeroed),
+        dropped from the order-id index and recycled, but not unlinked from
+        the queue one by one.
+        """
+        index = self._index
+        store = self._store
+        pool = self._pool
+
+        for node in self[price].nodes():
+            order = node.order
+            order.quantity = 0
+
+            if index.get(order.identity) is node:
+                del index[order.identity]  # O(1)
+
+            if store is not None:
+                store.release(node)  # O(1)
+            elif pool is not None:
+                pool.release(order)  # O(1)
+
+        del self[price]  # O(log(n))
+
+    def depth(
+        self, levels: Optional[int] = None, visible: bool = False
+    ) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        r""" Aggregates the price levels from the touch outward. The totals
+        are read from the running aggregates of each level, so the cost is
+        O(levels) regardless of the number of resting orders.
+
+        Parameters:
+            levels: the optional maximum number of price levels
+            visible: aggregate the displayed quantity (limit orders and
+                iceberg peaks) rather than the total quantity
+
+        Returns:
+            A tuple of (prices, quantities, counts) NumPy int64 arrays
+        """
+        queues = [self[price] for price in itertools.islice(self, levels)]
+
+        if visible:
+            quantities = [queue.display_quantity for queue in queues]
+        else:
+            quantities = [queue.quantity for queue in queues]
+
+        return (
+            np.array([queue.price for queue in queues], dtype=np.int64),
+            np.array(quantities, dtype=np.int64),
+            np.array([len(queue) for queue in queues], dtype=np.int64),
+        )
+
+    def cumulative_quantity(self, price: int) -> int:
+        r""" The quantity resting from the touch up to and including `price`.
+
+        Parameters:
+            price: the price that the cumulative quantity extends to
+
+        Returns:
+            The total quantity of the levels at or better than `price`
+        """
+        quantity = 0
+        for level_price in self:
+            if (price - level_price) * self._side > 0:
+                break  # beyond the price
+
+            quantity += self[level_price].quantity
+        return quantity
+
+    def sweep_price(self, quantity: int) -> int:
+        r""" The price of the level at which an aggressive order of
+        `quantity` would stop sweeping this side of the book.
+
+        Parameters:
+            quantity: the quantity of the aggressive order
+
+        Returns:
+            The price of the last level touched by the sweep, or
+            `INTEGER_NAN` if less than `quantity` rests on this side
+        """
+        for level_price in self:
+            quantity -= self[level_price].quantity
+            if quantity <= 0:
+                return level_price
+
+        return INTEGER_NAN
+
+    def _can_fill(self, price: Optional[int], quantity: int) -> bool:
+        r""" Whether an aggressive order can be filled in full against this
+        side of the book, without touching it.
+
+        Parameters:
+            price: the limit price of the aggressive order, or `None` for a
+                market order
+            quantity: the quantity of the aggressive order
+
+        Returns:
+            True if at least `quantity` rests at prices that the order can
+            execute at
+        """
+        # Note: a read-only walk from the touch, which stops as soon as the
+        # quantity is covered or the limit price is crossed
+        for level_price in self:
+            if price is not None and (price - level_price) * self._side > 0:
+                return False  # beyond the limit price
+
+            quantity -= self[level_price].quantity
+            if quantity <= 0:
+                return True
+
+        return quantity <= 0
+
+    def _write_market_by_order(self, orders: np.ndarray, start: int) -> int:
+        # Writes the resting orders from the touch outward into the rows of
+        # `orders` from `start`, and returns the end row
+        nodes, positions = [], []
+        for price in self:
+            for position, node in enumerate(self[price].nodes()):
+                nodes.append(node)
+                positions.append(position)
+
+        end = start + len(nodes)
+        rows = orders[start:end]
+        rows['side'] = self._side
+        rows['position'] = positions
+
+        if self._store is not None:
+            # Gather the fields straight from the columns of the store
+            handles = np.array([node.handle for node in nodes], dtype=np.int64)
+            columns = self._store._columns
+            for name in ('identity', 'price', 'quantity', 'peak_size'):
+                rows[name] = columns[name][handles]
+
+            quantity = rows['quantity']
+            rows['display_quantity'] = np.where(
+                rows['peak_size'] == order_lib.LIMIT_ORDER_PEAK_SIZE,
+                quantity,
+                np.minimum(columns['peak_quantity'][handles], quantity),
+            )
+            return end
+
+        resting_orders = [node.order for node in nodes]
+        rows['identity'] = [order.identity for order in resting_orders]
+        rows['price'] = [order.price for order in resting_orders]
+        rows['quantity'] = [order.quantity for order in resting_orders]
+        rows['peak_size'] = [
+            (
+                order.peak_size
+                if order.type is order_lib.OrderType.ICEBERG
+                else order_lib.LIMIT_ORDER_PEAK_SIZE
+            )
+            for order in resting_orders
+        ]
+        rows['display_quantity'] = [
+            order.display_quantity for order in resting_orders
+        ]
+        return end
+
+    def to_display(
+        self,
+        levels: Optional[int] = None,
+        orders: Optional[int] = None,
+        lines: Optional[List] = None,
+    ) -> List:
+        r""" Formats the resting orders from the touch outward. Only the
+        displayed levels are visited, so a bounded display costs O(levels)
+        rather than O(book size).
+
+        Parameters:
+            levels: the optional maximum number of price levels
+            orders: the optional maximum number of orders
+            lines: an optional list that the lines are appended to
+
+        Returns:
+            The list of lines
+        """
+        if lines is None:
+            lines = []
+
+        end = INTEGER_NAN if orders is None else len(lines) + orders
+        for price in itertools.islice(self, levels):  # lazily
+            for order in self[price]:
+                if len(lines) == end:
+                    return lines
+                lines.append(order.to_display())
+        return lines
+
+
+class _PriceLevelContainer(
+    _BasePriceLevelContainer, sortedcontainers.SortedDict
+):
+    def __init__(
+        self,
+        side: order_lib.OrderSide,
+        index: Dict,
+        store: Optional[store_lib.OrderStore] = None,
+        pool: Optional[order_lib.OrderPool] = None,
+    ):
+        self._side = side
+        self._index = index
+        self._store = store
+        self._pool = pool
+        super().__init__()
+
+    def __delitem__(self, price: int) -> None:
+        super().__delitem__(price)  # O(log(n))
+
+        if self.best_level is not None and price == self.best_level.price:
+            # The touch was removed, the next level becomes the best
+            if not self:
+                self.best_level = None
+            elif self._side is order_lib.OrderSide.ASK:
+                self.best_level = self.peekitem(0)[1]  # O(log(n))
+            else:
+                self.best_level = self.peekitem(-1)[1]  # "
 
     def __iter__(self):
         if self._side is order_lib.OrderSide.ASK:
             return super().__iter__()
         return super().__reversed__()
 
-    def to_display(self) -> List:
-        lines = []
-        for price, queue in self.items():
-            for order in queue:
-                lines.append(order.to_display())
-        return lines
+
+class _TickLadderContainer(_BasePriceLevelContainer):
+    r""" An array backed alternative to the `_PriceLevelContainer`. Price
+    levels are indexed directly by their tick offset from `min_price` in a
+    preallocated list, and the lowest and highest occupied levels are tracked
+    incrementally; so that best-price lookups and level inserts/removals are
+    O(1) amortized. Use this container for instruments that trade in a
+    bounded integer tick range.
+
+    With `depth_index`, the quantity of every level is also kept in a
+    Fenwick tree over the ticks, so that `cumulative_quantity`,
+    `sweep_price` and `_can_fill` are answered in O(log(n)) rather than by
+    walking the levels.
+    """
+
+    def __init__(
+        self,
+        side: order_lib.OrderSide,
+        index: Dict,
+        min_price: int,
+        max_price: int,
+        tick_size: int = 1,
+        store: Optional[store_lib.OrderStore] = None,
+        pool: Optional[order_lib.OrderPool] = None,
+        depth_index: bool = False,
+    ):
+        if max_price < min_price or tick_size <= 0:
+            raise ValueError(
+                f'Invalid tick range [{min_price}, {max_price}] with a tick '
+                f'size of {tick_size}. '
+            )
+
+        self._side = side
+        self._index = index
+        self._store = store
+        self._pool = pool
+        self._min_price = min_price
+        self._max_price = max_price
+        self._tick_size = tick_size
+
+        self._levels = [None] * ((max_price - min_price) // tick_size + 1)
+        self._num_levels = 0
+
+        if depth_index:
+            self._depth_index = fenwick_lib.FenwickTree(len(self._levels))
+
+        # indices of the lowest and highest occupied levels
+        self._low = len(self._levels)
+        self._high = -1
+
+    def _to_index(self, price: int) -> int:
+        index, remainder = divmod(price - self._min_price, self._tick_size)
+        if remainder or not 0 <= index < len(self._levels):
+            raise errors.PriceOutOfRangeError(
+                f'Received a price({price}) outside of the tick range '
+                f'[{self._min_price}, {self._max_price}] with a tick size '
+                f'of {self._tick_size}. '
+            )
+        return index
+
+    def _validate_price(self, price: int) -> None:
+        self._to_index(price)  # raises `PriceOutOfRangeError`
+
+    def _to_price(self, index: int) -> int:
+        return self._min_price + index * self._tick_size
+
+    def _update_depth_index(self, price: int, delta: int) -> None:
+        self._depth_index.add(self._to_index(price), delta)  # O(log(n))
+
+    def cumulative_quantity(self, price: int) -> int:
+        depth_index = self._depth_index
+        if depth_index is None:
+            return super().cumulative_quantity(price)
+
+        # The ticks at or better than the price: at or below it for the
+        # asks, at or above it for the bids
+        offset = price - self._min_price
+        if self._side is order_lib.OrderSide.ASK:
+            return depth_index.prefix_sum(offset // self._tick_size + 1)
+
+        start = -(-offset // self._tick_size)
+        return depth_index.total() - depth_index.prefix_sum(start)
+
+    def sweep_price(self, quantity: int) -> int:
+        depth_index = self._depth_index
+        if depth_index is None:
+            return super().sweep_price(quantity)
+
+        quantity = max(quantity, 1)  # any order touches the best level
+        total = depth_index.total()
+        if quantity > total:
+            return INTEGER_NAN
+
+        # The asks are swept upward from the lowest tick, the bids downward
+        # from the highest; i.e. up to the first tick that leaves less than
+        # `quantity` resting above it
+        if self._side is order_lib.OrderSide.ASK:
+            return self._to_price(depth_index.search(quantity))
+        return self._to_price(depth_index.search(total - quantity + 1))
+
+    def _can_fill(self, price: Optional[int], quantity: int) -> bool:
+        if self._depth_index is None:
+            return super()._can_fill(price, quantity)
+
+        if price is None:
+            return self._depth_index.total() >= quantity
+        return self.cumulative_quantity(price) >= quantity
+
+    def peekitem(self, index: int = -1) -> Tuple:
+        if not self._num_levels:
+            raise IndexError('The price level container is empty. ')
+
+        if index == 0:  # lowest price
+            position = self._low
+        elif index == -1:  # highest price
+            position = self._high
+        else:
+            price = self.keys()[index]
+            return price, self[price]
+
+        return self._to_price(position), self._levels[position]
+
+    def keys(self) -> List:
+        r""" Returns all occupied prices in ascending order """
+        if not self._num_levels:
+            return []
+
+        levels = self._levels
+        return [
+            self._to_price(position)
+            for position in range(self._low, self._high + 1)
+            if levels[position] is not None
+        ]
+
+    def values(self) -> List:
+        return [self[price] for price in self]
+
+    def items(self) -> List:
+        return [(price, self[price]) for price in self]
+
+    def __getitem__(self, price: int) -> _PriceLevel:
+        try:
+            queue = self._levels[self._to_index(price)]
+        except errors.PriceOutOfRangeError:
+            queue = None
+
+        if queue is None:
+            raise KeyError(price)
+
+        return queue
+
+    def __setitem__(self, price: int, queue: _PriceLevel) -> None:
+        index = self._to_index(price)
+
+        if self._levels[index] is None:
+            self._num_levels += 1
+
+            if index < self._low:
+                self._low = index
+            if index > self._high:
+                self._high = index
+
+        self._levels[index] = queue
+
+    def __delitem__(self, price: int) -> None:
+        index = self._to_index(price)
+        levels = self._levels
+
+        if levels[index] is None:
+            raise KeyError(price)
+
+        if self._depth_index is not None and levels[index].quantity:
+            # e.g. a level consumed whole by a market sweep
+            self._depth_index.add(index, -levels[index].quantity)
+
+        levels[index] = None
+        self._num_levels -= 1
+
+        if not self._num_levels:
+            self._low = len(levels)
+            self._high = -1
+            self.best_level = None
+            return
+
+        # Walk toward the next occupied level; the walk is bounded by the gap
+        # to the next level so this is O(1) amortized on a dense book
+        if index == self._low:
+            while levels[self._low] is None:
+                self._low += 1
+
+            if self._side is order_lib.OrderSide.ASK:
+                self.best_level = levels[self._low]
+
+        if index == self._high:
+            while levels[self._high] is None:
+                self._high -= 1
+
+            if self._side is order_lib.OrderSide.BID:
+                self.best_level = levels[self._high]
+
+    def __contains__(self, price: int) -> bool:
+        try:
+            self[price]
+        except KeyError:
+            return False
+        return True
+
+    def __len__(self) -> int:
+        return self._num_levels
+
+    def __iter__(self):
+        if not self._num_levels:
+            return iter(())
+
+        if self._side is order_lib.OrderSide.ASK:
+            positions = range(self._low, self._high + 1)
+        else:
+            positions = range(self._high, self._low - 1, -1)
+
+        levels = self._levels
+        return (
+            self._to_price(position)
+            for position in positions
+            if levels[position] is not None
+        )
+
+
+class _TriggerBook:
+    r""" The pending stop orders of one side, held off the book and keyed by
+    their stop price. Buy stops trigger once a trade prints at or above
+    their stop price and sell stops at or below it, so the triggered stops
+    are always at the near end of the sorted keys; a trade only checks that
+    boundary, in O(log(n)) per triggered stop price, and never scans the
+    pending stops.
+    """
+
+    def __init__(self, side: order_lib.OrderSide):
+        self._side = side
+
+        # given {stop_price: {identity: (sequence, order)}} in arrival order
+        self._stops = sortedcontainers.SortedDict()
+        self._num_stops = 0
+
+    def __len__(self) -> int:
+        return self._num_stops
+
+    def add(self, order: Order, sequence: int) -> None:
+        r""" Holds a stop order until it is triggered.
+
+        Parameters:
+            order: a `StopOrder` or `StopLimitOrder`
+            sequence: the arrival number of the order, which breaks ties
+                between stops that trigger at the same time
+        """
+        try:
+            stops = self._stops[order.stop_price]  # O(log(n))
+        except KeyError:
+            stops = self._stops[order.stop_price] = {}
+
+        stops[order.identity] = (sequence, order)
+        self._num_stops += 1
+
+    def remove(self, order: Order) -> None:
+        r""" Removes a pending stop order, e.g. once it is cancelled """
+        stops = self._stops[order.stop_price]
+        del stops[order.identity]  # O(1)
+        self._num_stops -= 1
+
+        if not stops:
+            del self._stops[order.stop_price]
+
+    def is_triggered(self, stop_price: int, price: int) -> bool:
+        r""" Whether a trade at `price` triggers a stop at `stop_price` """
+        return (price - stop_price) * self._side >= 0
+
+    def pop_triggered(self, price: int) -> List[Tuple]:
+        r""" Removes every stop triggered by a trade at `price`.
+
+        Parameters:
+            price: the price of the trade
+
+        Returns:
+            A list of (sequence, order) tuples, ordered by stop price from
+            the boundary inward and then by arrival
+        """
+        triggered = []
+
+        # The nearest stop price: the lowest of the buys, the highest of
+        # the sells
+        index = 0 if self._side is order_lib.OrderSide.BUY else -1
+        stops = self._stops
+        while stops and self.is_triggered(stops.peekitem(index)[0], price):
+            _, triggered_stops = stops.popitem(index)  # O(log(n))
+            triggered.extend(triggered_stops.values())
+
+        self._num_stops -= len(triggered)
+        return triggered
 
 
 class _BaseOrderbook(abc.ABC):
@@ -60,7 +785,76 @@ class _BaseOrderbook(abc.ABC):
     when constructing orderbooks.
     """
 
-    def __init__(self, is_display: bool = True):
+    def __init__(
+        self,
+        is_display: bool = True,
+        tick_range: Optional[Tuple[int, int]] = None,
+        tick_size: int = 1,
+        order_store: Optional[store_lib.OrderStore] = None,
+        order_pool: Optional[order_lib.OrderPool] = None,
+        output_sink: Optional[sink_lib.OutputSink] = None,
+        feed: str = FEED_BOOK,
+        display_levels: Optional[int] = None,
+        display_orders: Optional[int] = None,
+        quote_every: int = 1,
+        quote_interval: Optional[float] = None,
+        quote_on_bbo: bool = False,
+        depth_index: bool = False,
+    ):
+        r""" Base constructor for building all orderbooks.
+
+        Parameters:
+            is_display: write quote and trade messages to the output sink
+            tick_range: an optional (min_price, max_price) tuple; if given
+                the price levels are held in an array backed tick ladder
+                instead of a sorted dictionary
+            tick_size: the price increment between levels of the ladder
+            depth_index: keep the cumulative quantity of the tick ladder in
+                a Fenwick tree, so that fill-or-kill orders,
+                `cumulative_quantity` and `sweep_price` are answered in
+                O(log(n)); requires a `tick_range`
+            order_store: an optional `pymatch.store.OrderStore`; if given
+                the fields of resting orders are held in its columns, for
+                vectorized analytics, and the price levels hold a handle to
+                each row instead of the order object; matching is slower
+            order_pool: an optional `pymatch.order.OrderPool`; if given
+                orders are returned to the pool once fully filled
+            output_sink: an optional `pymatch.sink.OutputSink` that quote
+                and trade messages are written to; defaults to stdout. A
+                `pymatch.sink.NullSink` disables the display
+            feed: either `FEED_BOOK` to display the whole book after every
+                change, or `FEED_DELTA` to display only the changed orders
+            display_levels: the optional maximum number of price levels per
+                side displayed by the book feed
+            display_orders: the optional maximum number of orders per side
+                displayed by the book feed
+            quote_every: conflate the book feed, publishing the book at most
+                once every `quote_every` updates
+            quote_interval: the optional number of seconds that must pass
+                between two publications of the book feed
+            quote_on_bbo: only publish the book feed when the best bid or
+                ask (price or size) changed
+
+        Note: a conflated book is only published once all of the given
+        conditions hold; the skipped states are coalesced into the next
+        publication, see `publish`.
+        """
+        if feed not in (FEED_BOOK, FEED_DELTA):
+            raise ValueError(f'Invalid feed({feed}). ')
+
+        for limit in (display_levels, display_orders):
+            if limit is not None and limit <= 0:
+                raise ValueError(f'Invalid display limit({limit}). ')
+
+        if quote_every < 1:
+            raise ValueError(f'Invalid quote_every({quote_every}). ')
+
+        if quote_interval is not None and quote_interval < 0:
+            raise ValueError(f'Invalid quote_interval({quote_interval}). ')
+
+        if depth_index and tick_range is None:
+            raise ValueError('A depth index requires a tick_range. ')
+
         self._tick_tape = 0
 
         # Note: Currently, in order to display the orderbook to stdout, the
@@ -70,10 +864,88 @@ class _BaseOrderbook(abc.ABC):
         if os.getenv(ENV_VAR_ENABLE_PROFILING):
             is_display = False
 
+        if output_sink is None:
+            output_sink = sink_lib.StdoutSink()
+        elif isinstance(output_sink, sink_lib.NullSink):
+            is_display = False
+
         self._is_display = is_display
-        self._bids = _PriceLevelContainer(order_lib.OrderSide.BUY)
-        self._asks = _PriceLevelContainer(order_lib.OrderSide.ASK)
-        # given {price[Integer]: queue[List[Order]]}
+        self._is_delta = is_display and feed == FEED_DELTA
+        self._output_sink = output_sink
+
+        self._display_levels = display_levels
+        self._display_orders = display_orders
+        self._display_buffer: List[str] = []  # reused by every quote
+
+        self._quote_every = quote_every
+        self._quote_interval = quote_interval
+        self._quote_on_bbo = quote_on_bbo
+        self._is_conflated = (
+            quote_every > 1 or quote_interval is not None or quote_on_bbo
+        )
+
+        # The state of the book feed as of the last publication
+        self._num_updates = 0
+        self._last_quote_time = float('-inf')
+        self._last_bbo = None
+        self._is_quote_pending = False
+
+        # given {identity[Integer]: handle[_QueueNode]} of all resting orders
+        self._orders = {}
+
+        # given {identity[Integer]: order} of the stop orders held off the
+        # book, see `_TriggerBook`
+        self._stops = {}
+        self._buy_stops = _TriggerBook(order_lib.OrderSide.BUY)
+        self._sell_stops = _TriggerBook(order_lib.OrderSide.SELL)
+        self._stop_sequence = itertools.count()
+        self._triggered = collections.deque()  # stops yet to be submitted
+        self._is_triggering = False
+
+        self._last_trade_price = INTEGER_NAN
+
+        # Whilst in an auction orders accumulate without matching; given
+        # {identity[Integer]: order} of the market orders held for the
+        # uncrossing, in arrival order
+        self._is_auction = False
+        self._auction_orders = {}
+
+        self._order_store = order_store
+        self._order_pool = order_pool
+
+        if tick_range is None:
+            self._bids = _PriceLevelContainer(
+                order_lib.OrderSide.BUY,
+                self._orders,
+                store=order_store,
+                pool=order_pool,
+            )
+            self._asks = _PriceLevelContainer(
+                order_lib.OrderSide.ASK,
+                self._orders,
+                store=order_store,
+                pool=order_pool,
+            )
+        else:
+            self._bids = _TickLadderContainer(
+                order_lib.OrderSide.BUY,
+                self._orders,
+                *tick_range,
+                tick_size=tick_size,
+                store=order_store,
+                pool=order_pool,
+                depth_index=depth_index,
+            )
+            self._asks = _TickLadderContainer(
+                order_lib.OrderSide.ASK,
+                self._orders,
+                *tick_range,
+                tick_size=tick_size,
+                store=order_store,
+                pool=order_pool,
+                depth_index=depth_index,
+            )
+        # given {price[Integer]: queue[_PriceLevel[Order]]}
         super().__init__()
 
     def __repr__(self) -> str:
@@ -97,6 +969,29 @@ class _BaseOrderbook(abc.ABC):
 
         self._tick_tape = index
 
+    def __contains__(self, identity: int) -> bool:
+        return identity in self._orders
+
+    def _get_order_handle(self, identity: int) -> _QueueNode:
+        try:
+            return self._orders[identity]  # O(1)
+        except KeyError:
+            raise errors.OrderNotFoundError(
+                f'Could not find a resting order with the id({identity}). '
+            ) from None
+
+    @property
+    def order_store(self) -> Optional[store_lib.OrderStore]:
+        return self._order_store
+
+    @property
+    def order_pool(self) -> Optional[order_lib.OrderPool]:
+        return self._order_pool
+
+    @property
+    def output_sink(self) -> sink_lib.OutputSink:
+        return self._output_sink
+
     @property
     def bids(self) -> Dict:
         return self._bids
@@ -105,14 +1000,17 @@ class _BaseOrderbook(abc.ABC):
 
     @property
     def best_bid(self) -> int:
-        return self._best_bid
+        return self._bids.best_price  # O(1)
 
-    @best_bid.getter
-    def best_bid(self) -> int:
-        try:
-            return self.bids.keys()[-1]
-        except IndexError:
-            return INTEGER_NAN
+    @property
+    def best_bid_size(self) -> int:
+        level = self._bids.best_level
+        return 0 if level is None else level.quantity  # O(1)
+
+    @property
+    def best_bid_count(self) -> int:
+        level = self._bids.best_level
+        return 0 if level is None else len(level)  # O(1)
 
     @property
     def asks(self) -> Dict:
@@ -122,14 +1020,17 @@ class _BaseOrderbook(abc.ABC):
 
     @property
     def best_ask(self) -> int:
-        return self._best_ask
+        return self._asks.best_price  # O(1)
 
-    @best_ask.getter
-    def best_ask(self) -> int:
-        try:
-            return self.asks.keys()[0]
-        except IndexError:
-            return INTEGER_NAN
+    @property
+    def best_ask_size(self) -> int:
+        level = self._asks.best_level
+        return 0 if level is None else level.quantity  # O(1)
+
+    @property
+    def best_ask_count(self) -> int:
+        level = self._asks.best_level
+        return 0 if level is None else len(level)  # O(1)
 
     @abc.abstractmethod
     def add(self, order: Order) -> None:
@@ -146,14 +1047,14 @@ class _BaseOrderbook(abc.ABC):
         pass
 
     @abc.abstractmethod
-    def cancel(self, order: Order) -> None:
+    def cancel(self, identity: int) -> Order:
         r""" The `cancel` method removes an order from the orderbook.
 
         Parameters:
-            order: a `pymatch.order.Order` order
+            identity: the id of an order resting on the orderbook
 
         Returns:
-            None
+            The cancelled `pymatch.order.Order` order
         """
         pass
 
@@ -169,13 +1070,270 @@ class _BaseOrderbook(abc.ABC):
         """
         pass
 
+    def depth(
+        self, levels: Optional[int] = None, visible: bool = False
+    ) -> Tuple[Tuple, Tuple]:
+        r""" A level 2 snapshot of the book.
+
+        Parameters:
+            levels: the optional maximum number of price levels per side
+            visible: aggregate the displayed quantity (limit orders and
+                iceberg peaks) rather than the total quantity
+
+        Returns:
+            A tuple of (bids, asks), each a tuple of (prices, quantities,
+            counts) NumPy int64 arrays ordered from the touch outward
+        """
+        return (
+            self._bids.depth(levels, visible),
+            self._asks.depth(levels, visible),
+        )
+
+    def market_by_order(self, path: Optional[str] = None) -> np.ndarray:
+        r""" A level 3 (market-by-order) snapshot of every resting order,
+        see `MARKET_BY_ORDER_DTYPE`. The bids come first, then the asks,
+        each ordered from the touch outward and by time-priority within a
+        price level.
+
+        Parameters:
+            path: an optional `.npy` file that the snapshot is written to
+                directly, through a memory-map, rather than held in memory
+
+        Returns:
+            The snapshot as a structured NumPy array, memory-mapped if a
+            path is given
+        """
+        num_orders = sum(
+            len(book[price])
+            for book in (self._bids, self._asks)
+            for price in book
+        )
+
+        if path is None:
+            orders = np.empty(num_orders, dtype=MARKET_BY_ORDER_DTYPE)
+        else:
+            orders = np.lib.format.open_memmap(
+                path,
+                mode='w+',
+                dtype=MARKET_BY_ORDER_DTYPE,
+                shape=(num_orders,),
+            )
+
+        end = self._bids._write_market_by_order(orders, 0)
+        self._asks._write_market_by_order(orders, end)
+
+        if path is not None:
+            orders.flush()
+        return orders
+
+    def cumulative_quantity(
+        self, side: order_lib.OrderSide, price: int
+    ) -> int:
+        r""" The quantity resting on one side of the book between the touch
+        and `price`, inclusive. O(log(n)) with a `depth_index`.
+
+        Parameters:
+            side: the side of the book, e.g. `OrderSide.ASK` for the
+                quantity that a buy order limited at `price` could take
+            price: the price that the cumulative quantity extends to
+
+        Returns:
+            The total quantity of the levels at or better than `price`
+        """
+        book = self._bids if side is order_lib.OrderSide.BID else self._asks
+        return book.cumulative_quantity(price)
+
+    def sweep_price(self, side: order_lib.OrderSide, quantity: int) -> int:
+        r""" The price at which a sweep of `quantity` through one side of the
+        book would end; i.e. the worst price that an aggressive order of
+        that quantity would execute at. O(log(n)) with a `depth_index`.
+
+        Parameters:
+            side: the side of the book that is swept, e.g. `OrderSide.ASK`
+                for an aggressive buy order
+            quantity: the quantity of the aggressive order
+
+        Returns:
+            The price of the last level touched by the sweep, or
+            `INTEGER_NAN` if less than `quantity` rests on that side
+        """
+        book = self._bids if side is order_lib.OrderSide.BID else self._asks
+        return book.sweep_price(quantity)
+
+    @property
+    def last_trade_price(self) -> int:
+        return self._last_trade_price
+
+    @property
+    def is_auction(self) -> bool:
+        return self._is_auction
+
+    @property
+    def bbo(self) -> Tuple[int, int, int, int]:
+        r""" The (best_bid, best_bid_size, best_ask, best_ask_size) """
+        bid_level = self._bids.best_level
+        ask_level = self._asks.best_level
+        return (
+            INTEGER_NAN if bid_level is None else bid_level.price,
+            0 if bid_level is None else bid_level.quantity,
+            INTEGER_NAN if ask_level is None else ask_level.price,
+            0 if ask_level is None else ask_level.quantity,
+        )
+
+    def publish(self) -> None:
+        r""" Publishes the book if a conflated update is still pending, e.g.
+        at the end of the input or on a timer.
+        """
+        if self._is_quote_pending:
+            self._publish_quote_message()
+
+    def _add_stop(self, order: Order) -> None:
+        if order.side is order_lib.OrderSide.BUY:
+            book, making_orderbook = self._buy_stops, self._bids
+        else:
+            book, making_orderbook = self._sell_stops, self._asks
+
+        if order.type is order_lib.OrderType.STOP_LIMIT:
+            # Note: rejected on entry, like a limit order, rather than once
+            # it triggers within the `add` of some other order
+            making_orderbook._validate_price(order.price)
+
+        # Note: a stop already at or through the last trade is submitted
+        # at once, rather than held until the next trade
+        if self._last_trade_price != INTEGER_NAN and book.is_triggered(
+            order.stop_price, self._last_trade_price
+        ):
+            return self._submit_stop(order)
+
+        self._hold_stop(order, next(self._stop_sequence))
+
+    def _hold_stop(self, order: Order, sequence: int) -> None:
+        if order.side is order_lib.OrderSide.BUY:
+            book = self._buy_stops
+        else:
+            book = self._sell_stops
+
+        self._stops[order.identity] = order
+        book.add(order, sequence)
+
+    def _cancel_stop(self, identity: int) -> Order:
+        order = self._stops.pop(identity)  # O(1)
+
+        if order.side is order_lib.OrderSide.BUY:
+            self._buy_stops.remove(order)
+        else:
+            self._sell_stops.remove(order)
+        return order
+
+    def _submit_stop(self, stop: Order) -> None:
+        order = stop.trigger(self._order_pool)
+        if self._order_pool is not None:
+            self._order_pool.release(stop)
+        self.add(order)
+
+    def _trigger_stops(self, first_price: int, last_price: int) -> None:
+        r""" Triggers, and submits, the stop orders crossed by the trades of
+        one aggressive order; which printed from `first_price` (the touch) to
+        `last_price`.
+
+        Stops triggered together are submitted in the order that the trades
+        crossed their stop price, ties in arrival order. The orders that they
+        trade against may trigger further stops, which are queued behind
+        them: a cascade is processed breadth-first, in a deterministic order,
+        within the `add` of the order that started it.
+        """
+        self._last_trade_price = last_price
+
+        if self._stops:
+            triggered = self._buy_stops.pop_triggered(
+                max(first_price, last_price)
+            )
+            triggered += self._sell_stops.pop_triggered(
+                min(first_price, last_price)
+            )
+
+            def crossing(stop: Tuple) -> Tuple[int, int]:
+                sequence, order = stop
+                if order.side is order_lib.OrderSide.BUY:
+                    book = self._buy_stops
+                else:
+                    book = self._sell_stops
+
+                # Note: stops already through the first trade are triggered
+                # by it, the others as the trades move toward `last_price`
+                if book.is_triggered(order.stop_price, first_price):
+                    return 0, sequence
+                return abs(order.stop_price - first_price), sequence
+
+            triggered.sort(key=crossing)
+            for stop in triggered:
+                del self._stops[stop[1].identity]
+                self._triggered.append(stop)
+
+        if self._is_triggering or not self._triggered:
+            return  # an outer call submits the queued stops
+
+        self._is_triggering = True
+        try:
+            while self._triggered:
+                _, order = self._triggered.popleft()
+                self._submit_stop(order)
+        except Exception:
+            # The stops still queued are held again, where they can be
+            # cancelled, rather than left behind to be submitted by the
+            # cascade of some later, unrelated order
+            while self._triggered:
+                sequence, order = self._triggered.popleft()
+                self._hold_stop(order, sequence)
+            raise
+        finally:
+            self._is_triggering = False
+
+    def _is_quote_due(self) -> bool:
+        if self._num_updates < self._quote_every:
+            return False
+
+        if (
+            self._quote_interval is not None
+            and time.monotonic() - self._last_quote_time < self._quote_interval
+        ):
+            return False
+
+        return not self._quote_on_bbo or self.bbo != self._last_bbo
+
     def _output_quote_message(self, *args, **kwargs) -> None:
-        message = display_lib.BookFormat(self.bids, self.asks)
-        sys.stdout.write(message.body)
+        if self._is_conflated:
+            self._num_updates += 1
+            if not self._is_quote_due():
+                self._is_quote_pending = True  # coalesced into the next
+                return
+
+        self._publish_quote_message()
+
+    def _publish_quote_message(self) -> None:
+        if self._is_conflated:
+            self._num_updates = 0
+            self._last_bbo = self.bbo
+            if self._quote_interval is not None:
+                self._last_quote_time = time.monotonic()
+            self._is_quote_pending = False
+
+        message = display_lib.BookFormat(
+            self.bids,
+            self.asks,
+            levels=self._display_levels,
+            orders=self._display_orders,
+            buffer=self._display_buffer,
+        )
+        self._output_sink.write(message.body)
 
     def _output_trade_message(self, *args, **kwargs) -> None:
         message = display_lib.TradeFormat.from_orders(*args, **kwargs)
-        sys.stdout.write(message.body)
+        self._output_sink.write(message.body)
+
+    def _output_delta_message(self, *args, **kwargs) -> None:
+        message = display_lib.DeltaFormat(*args, **kwargs)
+        self._output_sink.write(message.body)
 
 
 # EOF
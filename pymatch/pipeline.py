@@ -0,0 +1,99 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+#
+# "Author: Nathan Matare <nathan.matare@gmail.com>"
+#
+# """ Ingestion Pipeline """
+
+import queue
+import threading
+from typing import Iterable, Iterator
+
+# Note: how long a blocked stage waits before checking if the pipeline
+# was stopped
+_POLL_INTERVAL = 0.1
+
+_DONE = object()
+
+
+class _Failure:
+
+    __slots__ = ('error',)
+
+    def __init__(self, error: BaseException):
+        self.error = error
+
+
+def prefetch(iterable: Iterable, depth: int = 2) -> Iterator:
+    r""" Runs an iterable in a background thread, one pipeline stage ahead
+    of its consumer. Items are handed over through a queue of at most
+    `depth` items, so that the producer blocks rather than running ahead,
+    and memory stays bounded by the size of `depth` items.
+
+    This overlaps reading and parsing the input (which releases the GIL on
+    I/O and in NumPy) with matching. An exception raised by the iterable is
+    re-raised to the consumer.
+
+    Parameters:
+        iterable: the producing stage, e.g. a chunked parser
+        depth: the maximum number of items produced ahead of the consumer;
+            zero runs the iterable in the calling thread
+
+    Returns:
+        An iterator of the items of `iterable`, in order
+    """
+
+    if depth < 0:
+        raise ValueError(f'Invalid depth({depth}). ')
+
+    if not depth:
+        yield from iterable
+        return
+
+    items = queue.Queue(maxsize=depth)
+    stopped = threading.Event()
+
+    def put(item) -> bool:
+        while not stopped.is_set():
+            try:
+                items.put(item, timeout=_POLL_INTERVAL)
+                return True
+            except queue.Full:
+                pass
+        return False
+
+    def produce() -> None:
+        try:
+            for item in iterable:
+                if not put(item):
+                    return
+        except BaseException as error:
+            put(_Failure(error))
+        else:
+            put(_DONE)
+
+    producer = threading.Thread(
+        target=produce, name='pymatch-prefetch', daemon=True
+    )
+    producer.start()
+
+    try:
+        while 1:
+            item = items.get()
+
+            if item is _DONE:
+                break
+
+            if isinstance(item, _Failure):
+                raise item.error
+
+            yield item
+
+    finally:
+        # The consumer stopped early, or failed: release the producer. A
+        # producer blocked on its input is abandoned as a daemon thread
+        stopped.set()
+        producer.join(timeout=10 * _POLL_INTERVAL)
+
+
+# EOF
@@ -0,0 +1,165 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+#
+# "Author: Nathan Matare <nathan.matare@gmail.com>"
+#
+# """ Output sinks for orderbook messages """
+
+from typing import List, Optional
+
+import abc
+import sys
+import time
+
+
+class OutputSink(abc.ABC):
+    r""" The `OutputSink` class is a base class for all destinations of the
+    quote and trade messages of an orderbook. A sink is also a context
+    manager which flushes and closes it on exit.
+    """
+
+    @abc.abstractmethod
+    def write(self, message: str) -> None:
+        r""" Writes a formatted message to the sink.
+
+        Parameters:
+            message: the message
+
+        Returns:
+            None
+        """
+        pass
+
+    def flush(self) -> None:
+        r""" Writes out any buffered messages """
+        pass
+
+    def close(self) -> None:
+        r""" Flushes the sink and releases its resources """
+        self.flush()
+
+    def __enter__(self) -> 'OutputSink':
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.close()
+
+
+class StdoutSink(OutputSink):
+    r""" Writes every message to stdout as it is produced. `sys.stdout` is
+    looked up on every write, so the sink follows redirections such as
+    `contextlib.redirect_stdout`.
+    """
+
+    def write(self, message: str) -> None:
+        sys.stdout.write(message)
+
+    def flush(self) -> None:
+        sys.stdout.flush()
+
+    def close(self) -> None:
+        self.flush()  # never close stdout
+
+
+class NullSink(OutputSink):
+    r""" Discards all messages. An orderbook given a `NullSink` disables
+    its display, so that messages are never formatted in the first place.
+    """
+
+    def write(self, message: str) -> None:
+        pass
+
+
+class ListSink(OutputSink):
+    r""" Collects messages in memory, e.g. for testing """
+
+    def __init__(self):
+        self.messages: List[str] = []
+
+    def write(self, message: str) -> None:
+        self.messages.append(message)
+
+    def getvalue(self) -> str:
+        r""" Returns all messages written so far, concatenated """
+        return ''.join(self.messages)
+
+
+class FileSink(OutputSink):
+    r""" Writes messages to a file through a buffered file object.
+
+    Parameters:
+        path: the path of the file, which is truncated
+        buffer_size: the size in bytes of the buffer of the file object
+    """
+
+    def __init__(self, path: str, buffer_size: int = 1 << 16):
+        self._file = open(path, 'w', buffering=buffer_size)
+
+    def write(self, message: str) -> None:
+        self._file.write(message)
+
+    def flush(self) -> None:
+        self._file.flush()
+
+    def close(self) -> None:
+        self._file.close()
+
+
+class BufferedSink(OutputSink):
+    r""" Accumulates messages and writes them to another sink in batches,
+    amortizing the cost of each write across many messages.
+
+    The buffer is flushed once it holds at least `max_size` characters or,
+    if given, once `max_delay` seconds have passed since the last flush.
+    Note: the delay is only checked when a message is written; call `flush`
+    (or use the sink as a context manager) to write out the tail.
+
+    Parameters:
+        sink: the sink written to on flush; defaults to a `StdoutSink`
+        max_size: the number of buffered characters that triggers a flush
+        max_delay: the optional number of seconds after which a write
+            triggers a flush
+    """
+
+    def __init__(
+        self,
+        sink: Optional[OutputSink] = None,
+        max_size: int = 1 << 16,
+        max_delay: Optional[float] = None,
+    ):
+        if max_size <= 0:
+            raise ValueError(f'Invalid max_size({max_size}). ')
+
+        self.sink = StdoutSink() if sink is None else sink
+        self.max_size = max_size
+        self.max_delay = max_delay
+
+        self._messages: List[str] = []
+        self._size = 0
+        self._last_flush = time.monotonic()
+
+    def write(self, message: str) -> None:
+        self._messages.append(message)
+        self._size += len(message)
+
+        if self._size >= self.max_size or (
+            self.max_delay is not None
+            and time.monotonic() - self._last_flush >= self.max_delay
+        ):
+            self.flush()
+
+    def flush(self) -> None:
+        if self._messages:
+            self.sink.write(''.join(self._messages))
+            self._messages.clear()
+            self._size = 0
+
+        self._last_flush = time.monotonic()
+        self.sink.flush()
+
+    def close(self) -> None:
+        self.flush()
+        self.sink.close()
+
+
+# EOF
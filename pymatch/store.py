@@ -0,0 +1,280 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+#
+# "Author: Nathan Matare <nathan.matare@gmail.com>"
+#
+# """ Struct-of-arrays order store """
+
+from typing import Dict, Tuple
+
+import numpy as np
+
+from pymatch._typing import Order
+from pymatch import order as order_lib
+
+LIMIT_ORDER_PEAK_SIZE = order_lib.LIMIT_ORDER_PEAK_SIZE
+
+# Note: free slots are marked with a side of zero
+_FREE_SIDE = 0
+
+_SIDES = {side.value: side for side in order_lib.OrderSide}
+
+
+class StoredOrder:
+    r""" A handle to an order resting in an `OrderStore`. All fields are held
+    in the columns of the store, so the handle only carries its row and the
+    links of the price-level queue that it rests in; it serves as both the
+    order and its queue node.
+
+    Note: the handle is only valid whilst the order rests on the book. Once
+    removed, its slot is recycled by the store.
+    """
+
+    __slots__ = ('_store', 'handle', 'level', 'prev', 'next')
+
+    def __init__(self, store: 'OrderStore', handle: int, level: type):
+        self._store = store
+        self.handle = handle
+        self.level = level
+        self.prev = None
+        self.next = None
+
+    @property
+    def order(self) -> 'StoredOrder':
+        return self
+
+    @property
+    def identity(self) -> int:
+        return self._store._identity[self.handle]
+
+    @property
+    def side(self) -> order_lib.OrderSide:
+        return _SIDES[self._store._side[self.handle]]
+
+    @property
+    def price(self) -> int:
+        return self._store._price[self.handle]
+
+    @property
+    def quantity(self) -> int:
+        return self._store._quantity[self.handle]
+
+    @quantity.setter
+    def quantity(self, quantity: int) -> None:
+        self._store._quantity[self.handle] = quantity
+
+    @property
+    def peak_size(self) -> int:
+        return self._store._peak_size[self.handle]
+
+    @property
+    def peak_quantity(self) -> int:
+        return self._store._peak_quantity[self.handle]
+
+    @peak_quantity.setter
+    def peak_quantity(self, peak_quantity: int) -> None:
+        self._store._peak_quantity[self.handle] = peak_quantity
+
+    @property
+    def type(self) -> order_lib.OrderType:
+        if self._store._peak_size[self.handle] == LIMIT_ORDER_PEAK_SIZE:
+            return order_lib.OrderType.LIMIT
+        return order_lib.OrderType.ICEBERG
+
+    @property
+    def display_quantity(self) -> int:
+        store = self._store
+        handle = self.handle
+        quantity = store._quantity[handle]
+
+        if store._peak_size[handle] == LIMIT_ORDER_PEAK_SIZE:
+            return quantity
+
+        peak_quantity = store._peak_quantity[handle]
+        return peak_quantity if peak_quantity < quantity else quantity
+
+    def _update_display_quantity(self, matched_quantity: int) -> None:
+        if self._store._peak_size[self.handle] != LIMIT_ORDER_PEAK_SIZE:
+            order_lib.IcebergOrder._update_display_quantity(
+                self, matched_quantity
+            )
+
+    def to_display(self, **kwargs) -> str:
+        return order_lib._BaseOrder.to_display(self, **kwargs)
+
+    def to_order(self) -> Order:
+        r""" Materializes the handle into a standalone order object """
+        return self._store.get(self.handle)
+
+    def __repr__(self) -> str:
+        return (
+            f'{self.__class__.__qualname__}('
+            f'price={self.price} @ quantity={self.quantity})'
+        )
+
+
+class OrderStore:
+    r""" The `OrderStore` keeps the fields of all resting orders in
+    preallocated NumPy int64 columns (struct-of-arrays) addressed by integer
+    handles. Slots are recycled through a free-list when an order is filled
+    or cancelled, and the columns double in size when the store is full.
+
+    Pass an `OrderStore` to an orderbook to hold its resting orders; the
+    live book can then be analysed with vectorized NumPy, see `depth` and
+    `exposure`.
+
+    Note: the store is not a memory optimisation. The price levels still
+    hold one `StoredOrder` handle per resting order, so memory per order
+    drops by less than half, and matching reads every field through the
+    columns, which is slower than reading the attributes of an order.
+    """
+
+    COLUMNS = (
+        'identity',
+        'side',
+        'price',
+        'quantity',
+        'peak_size',
+        'peak_quantity',
+    )
+
+    def __init__(self, capacity: int = 1024):
+        if capacity <= 0:
+            raise ValueError(f'Invalid capacity({capacity}). ')
+
+        self._columns = {
+            name: np.zeros(capacity, dtype=np.int64) for name in self.COLUMNS
+        }
+        self._bind_columns()
+
+        # Note: handles are handed out from the end of the free-list so that
+        # the lowest free slot is reused first
+        self._free = list(range(capacity - 1, -1, -1))
+        self._num_orders = 0
+
+    def _bind_columns(self) -> None:
+        # Scalar access through a memoryview returns python integers, which
+        # is several times faster than indexing the NumPy array
+        for name, column in self._columns.items():
+            setattr(self, f'_{name}', memoryview(column))
+
+    def _grow(self) -> None:
+        capacity = self.capacity
+
+        for name in self.COLUMNS:
+            column = np.zeros(2 * capacity, dtype=np.int64)
+            column[:capacity] = self._columns[name]
+            self._columns[name] = column
+
+        self._bind_columns()
+        self._free.extend(range(2 * capacity - 1, capacity - 1, -1))
+
+    @property
+    def capacity(self) -> int:
+        return len(self._columns['identity'])
+
+    @property
+    def nbytes(self) -> int:
+        return sum(column.nbytes for column in self._columns.values())
+
+    @property
+    def columns(self) -> Dict:
+        r""" Read-only views of the columns; free slots have a side of 0 """
+        views = {}
+        for name, column in self._columns.items():
+            view = column.view()
+            view.flags.writeable = False
+            views[name] = view
+        return views
+
+    def __len__(self) -> int:
+        return self._num_orders
+
+    def allocate(self, order: Order, level: type = None) -> StoredOrder:
+        r""" Copies an order into a free slot of the store.
+
+        Parameters:
+            order: a `pymatch.order.Order` order
+            level: the price level that the order will rest in
+
+        Returns:
+            A `StoredOrder` handle
+        """
+        if not self._free:
+            self._grow()
+
+        handle = self._free.pop()  # O(1)
+
+        self._identity[handle] = order.identity
+        self._side[handle] = order.side
+        self._price[handle] = order.price
+        self._quantity[handle] = order.quantity
+
+        if order.type is order_lib.OrderType.ICEBERG:
+            self._peak_size[handle] = order.peak_size
+            self._peak_quantity[handle] = order.peak_quantity
+        else:
+            self._peak_size[handle] = LIMIT_ORDER_PEAK_SIZE
+            self._peak_quantity[handle] = LIMIT_ORDER_PEAK_SIZE
+
+        self._num_orders += 1
+        return StoredOrder(self, handle, level)
+
+    def release(self, stored_order: StoredOrder) -> None:
+        r""" Returns the slot of an order to the free-list """
+        self._side[stored_order.handle] = _FREE_SIDE
+        self._free.append(stored_order.handle)  # O(1)
+        self._num_orders -= 1
+
+    def get(self, handle: int) -> Order:
+        r""" Builds a standalone order object from the slot of the store """
+        if self._peak_size[handle] == LIMIT_ORDER_PEAK_SIZE:
+            order = order_lib.LimitOrder.__new__(order_lib.LimitOrder)
+        else:
+            # Note: bypass the constructor, a resting iceberg may legitimately
+            # hold less than its peak size
+            order = order_lib.IcebergOrder.__new__(order_lib.IcebergOrder)
+            order.peak_size = self._peak_size[handle]
+            order.peak_quantity = self._peak_quantity[handle]
+
+        order.identity = self._identity[handle]
+        order.side = _SIDES[self._side[handle]]
+        order.price = self._price[handle]
+        order.quantity = self._quantity[handle]
+        order.time_in_force = order_lib.TimeInForce.DAY  # a resting order
+        return order
+
+    def _live(self, side: order_lib.OrderSide) -> np.ndarray:
+        return self._columns['side'] == side
+
+    def depth(self, side: order_lib.OrderSide) -> Tuple:
+        r""" Aggregates the live orders of one side by price level.
+
+        Parameters:
+            side: the orderside
+
+        Returns:
+            A tuple of (prices, quantities, counts) NumPy arrays, in
+            ascending price order
+        """
+        live = self._live(side)
+        prices, inverse, counts = np.unique(
+            self._columns['price'][live],
+            return_inverse=True,
+            return_counts=True,
+        )
+        quantities = np.zeros(len(prices), dtype=np.int64)
+        np.add.at(quantities, inverse, self._columns['quantity'][live])
+        return prices, quantities, counts
+
+    def exposure(self, side: order_lib.OrderSide) -> int:
+        r""" The notional (price x quantity) of all live orders of one side """
+        live = self._live(side)
+        return int(
+            np.dot(
+                self._columns['price'][live], self._columns['quantity'][live]
+            )
+        )
+
+
+# EOF
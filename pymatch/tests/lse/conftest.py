@@ -9,6 +9,8 @@ import sys
 
 import numpy as np
 
+from pymatch import lse as lse_order_lib, sink as sink_lib
+
 
 def generate_testing_orders(
     ask_sigma: float = 1.0,
@@ -52,6 +54,20 @@ def generate_testing_orders(
     return orders
 
 
+def build_orderbook(lines: List, **kwargs) -> type:
+    r""" Creates an orderbook writing to a `ListSink`, adds `lines` to it and
+    clears the messages that they output.
+    """
+
+    orderbook = lse_order_lib.LSEOrderbook(
+        output_sink=sink_lib.ListSink(), **kwargs
+    )
+    for line in lines:
+        orderbook.add(lse_order_lib.build_order_from_ascii_string(line))
+    orderbook.output_sink.messages.clear()
+    return orderbook
+
+
 def run_orderbook(
     orderbook: type, orders: List, validate: bool = False,
 ) -> None:
@@ -0,0 +1,237 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+# "Author: Nathan Matare <nathan.matare@gmail.com>"
+#
+# """ Test the binary wire format """
+
+import io
+import sys
+import contextlib
+
+import numpy as np
+import pytest
+
+from pymatch import errors, main as main_lib, order as order_lib
+from pymatch import lse as lse_order_lib
+from pymatch.tests.lse import conftest
+
+
+class TestBinaryWireFormat:
+    def test_record_layout(self) -> None:
+
+        order = lse_order_lib.build_order_from_ascii_string(
+            'A,100345,5103,100000,10000'
+        )
+        record = lse_order_lib.encode_order(order)
+
+        assert len(record) == lse_order_lib.BINARY_RECORD.size == 33
+        assert lse_order_lib.BINARY_DTYPE.itemsize == 33  # same packing
+        assert record == (
+            (-1).to_bytes(1, 'little', signed=True)
+            + (100345).to_bytes(8, 'little')
+            + (5103).to_bytes(8, 'little')
+            + (100000).to_bytes(8, 'little')
+            + (10000).to_bytes(8, 'little')
+        )
+
+    def test_round_trip(self) -> None:
+
+        lines = conftest.generate_testing_orders(num_orders_per_side=500)
+        orders = [
+            lse_order_lib.build_order_from_ascii_string(line) for line in lines
+        ]
+
+        buffer = lse_order_lib.encode_orders(orders)
+        parsed, _ = lse_order_lib.parse_setsmm_buffer(
+            '\n'.join(lines).encode('ascii')
+        )
+        assert buffer == lse_order_lib.encode_array(parsed)
+
+        decoded, malformed = lse_order_lib.decode_array(buffer)
+        assert not len(malformed)
+        assert np.shares_memory(decoded, np.frombuffer(buffer, np.uint8))
+        assert decoded.tolist() == parsed.tolist()
+
+        for order, expected in zip(
+            lse_order_lib.decode_orders(memoryview(buffer)), orders
+        ):
+            assert order.__class__ is expected.__class__
+            assert order.side is expected.side
+            assert order.identity == expected.identity
+            assert order.price == expected.price
+            assert order.quantity == expected.quantity
+            assert order.display_quantity == expected.display_quantity
+
+    def test_market_order(self) -> None:
+
+        order = lse_order_lib.build_order_from_ascii_string('A,1,,100')
+        buffer = lse_order_lib.encode_order(order)
+
+        (decoded,) = lse_order_lib.decode_orders(buffer)
+        assert isinstance(decoded, lse_order_lib.LSEMarketOrder)
+        assert (decoded.side, decoded.identity, decoded.quantity) == (
+            order.side,
+            1,
+            100,
+        )
+
+        orders, _ = lse_order_lib.parse_setsmm_buffer(b'A,1,,100\n')
+        assert lse_order_lib.encode_array(orders) == buffer
+
+    def test_stop_orders_are_not_encoded(self) -> None:
+
+        orders = [
+            order_lib.StopOrder(
+                5103, order_lib.OrderSide.BID, 1, 100, _private_call=False
+            ),
+            order_lib.StopLimitOrder(
+                5103,
+                order_lib.OrderSide.ASK,
+                2,
+                5100,
+                100,
+                _private_call=False,
+            ),
+        ]
+
+        for order in orders:
+            with pytest.raises(errors.InvalidOrderFormatError):
+                lse_order_lib.encode_order(order)
+
+            with pytest.raises(errors.InvalidOrderFormatError):
+                lse_order_lib.encode_orders([order])
+
+    def test_malformed_records(self) -> None:
+
+        record = lse_order_lib.BINARY_RECORD
+        buffer = b''.join(
+            [
+                record.pack(1, 1, 5103, 7500, 0),
+                record.pack(0, 2, 5103, 7500, 0),  # invalid side
+                record.pack(-1, 3, 5103, 100, 100),  # peak size too large
+                record.pack(-1, 4, 5103, -100, 0),  # negative quantity
+                record.pack(-1, 5, 5103, 100, 10),
+                record.pack(1, 6, -1, 100, 0),  # market order
+                record.pack(1, 7, -1, 100, 10),  # market order with a peak
+                record.pack(1, 8, -2, 100, 0),  # negative price
+            ]
+        )
+
+        orders, malformed = lse_order_lib.decode_array(buffer)
+        assert list(malformed) == [1, 2, 3, 6, 7]
+        assert list(orders['identity']) == [1, 5, 6]
+
+        with pytest.raises(errors.InvalidOrderFormatError):
+            list(lse_order_lib.decode_orders(buffer))
+
+        # Every malformed record is rejected, not only an invalid side
+        for index in malformed:
+            start = index * record.size
+            with pytest.raises(errors.InvalidOrderFormatError):
+                lse_order_lib.decode_orders(
+                    buffer[start : start + record.size]
+                )
+
+        decoded = list(
+            lse_order_lib.decode_orders(
+                b''.join(
+                    buffer[index * record.size : (index + 1) * record.size]
+                    for index in [0, 4, 5]
+                )
+            )
+        )
+        assert [order.identity for order in decoded] == [1, 5, 6]
+        assert isinstance(decoded[1], lse_order_lib.LSEIcebergOrder)
+        assert isinstance(decoded[2], lse_order_lib.LSEMarketOrder)
+
+        with pytest.raises(errors.InvalidOrderFormatError):
+            lse_order_lib.decode_array(buffer[:-1])  # truncated record
+
+        # Only the orders preceding the first malformed record
+        orders, malformed = lse_order_lib.decode_array(
+            buffer, stop_at_malformed=True
+        )
+        assert list(malformed) == [1]
+        assert list(orders['identity']) == [1]
+
+        for chunk_size in [1, 3 * record.size, len(buffer)]:
+            for chunks in [
+                lse_order_lib.iter_decode_array(
+                    buffer, chunk_size, stop_at_malformed=True
+                ),
+                lse_order_lib.iter_decode_stream(
+                    io.BytesIO(buffer), chunk_size, stop_at_malformed=True
+                ),
+            ]:
+                chunks = list(chunks)
+                orders = np.concatenate([orders for orders, _ in chunks])
+                assert list(orders['identity']) == [1]
+                assert list(chunks[-1][1]) == [1]
+
+    def test_decode_in_chunks(self) -> None:
+
+        record = lse_order_lib.BINARY_RECORD
+        buffer = b''.join(
+            record.pack(0 if index == 7 else 1, index, 5103, 100, 0)
+            for index in range(50)
+        )
+
+        for chunk_size in [1, 100, 1_000, len(buffer)]:
+            chunks = list(lse_order_lib.iter_decode_array(buffer, chunk_size))
+            orders = np.concatenate([orders for orders, _ in chunks])
+            malformed = np.concatenate([malformed for _, malformed in chunks])
+
+            assert list(malformed) == [7]
+            assert list(orders['identity']) == [i for i in range(50) if i != 7]
+
+    def test_decode_stream(self) -> None:
+
+        record = lse_order_lib.BINARY_RECORD
+        buffer = b''.join(
+            record.pack(0 if index == 7 else 1, index, 5103, 100, 0)
+            for index in range(50)
+        )
+
+        for chunk_size in [1, 100, 1_000, len(buffer)]:
+            chunks = list(
+                lse_order_lib.iter_decode_stream(
+                    io.BytesIO(buffer), chunk_size
+                )
+            )
+            orders = np.concatenate([orders for orders, _ in chunks])
+            malformed = np.concatenate([malformed for _, malformed in chunks])
+
+            assert list(malformed) == [7]
+            assert list(orders['identity']) == [i for i in range(50) if i != 7]
+
+        with pytest.raises(errors.InvalidOrderFormatError):
+            list(lse_order_lib.iter_decode_stream(io.BytesIO(buffer[:-1])))
+
+    def test_main_binary_input(self, monkeypatch) -> None:
+
+        lines = ['B,1234567890,32503,1234567890', 'B,1138,31502,7500']
+        orders = [
+            lse_order_lib.build_order_from_ascii_string(line) for line in lines
+        ]
+
+        stdouts = []
+        for input_format, data in [
+            (main_lib.INPUT_FORMAT_ASCII, '\n'.join(lines).encode('ascii')),
+            (
+                main_lib.INPUT_FORMAT_BINARY,
+                lse_order_lib.encode_orders(orders),
+            ),
+        ]:
+            monkeypatch.setattr(
+                sys, 'stdin', io.TextIOWrapper(io.BytesIO(data))
+            )
+            with io.StringIO() as stream:
+                with contextlib.redirect_stdout(stream):
+                    main_lib._run_lse_orderbook_from_stdin(input_format)
+                stdouts.append(stream.getvalue())
+
+        assert stdouts[0] == stdouts[1]
+        assert '1234567890|1,234,567,890| 32,503' in stdouts[1]
+
+
+# EOF
@@ -8,8 +8,16 @@ import os
 import io
 import sys
 import copy
+import random
 import contextlib
 
+import numpy as np
+import pytest
+
+from pymatch import errors, store as store_lib, sink as sink_lib
+from pymatch import display as display_lib, order as order_lib
+from pymatch import orderbook as orderbook_lib
+from pymatch.lse import lse_orderbook as lse_orderbook_lib
 from pymatch import lse as lse_order_lib
 from pymatch.tests.lse import conftest
 
@@ -141,6 +149,33 @@ class TestLimitOrder:
         assert '32,507' not in stdout
         assert '33,000' in stdout
 
+    def test_match_in_time_priority(self):
+        # Resting orders at the same level must fill in the order that
+        # they arrived
+        orderbook = lse_order_lib.LSEOrderbook()
+
+        with open(os.devnull, 'w') as null:
+            with contextlib.redirect_stdout(null):
+                for x in ['A,1,100,10', 'A,2,100,10', 'A,3,100,10']:
+                    orderbook.add(
+                        lse_order_lib.build_order_from_ascii_string(x)
+                    )
+
+        x = 'B,4,100,25'
+        aggressive_order = lse_order_lib.build_order_from_ascii_string(x)
+
+        with io.StringIO() as stream:
+            with contextlib.redirect_stdout(stream):
+                orderbook.add(aggressive_order)
+            stdout = stream.getvalue()
+
+        assert stdout.split('\n')[1] == '4,1,100,10'
+        assert stdout.split('\n')[2] == '4,2,100,10'
+        assert stdout.split('\n')[3] == '4,3,100,5'
+        assert len(orderbook.asks[100]) == 1
+        assert orderbook.asks[100][0].identity == 3
+        assert orderbook.asks[100][0].quantity == 5
+
 
 class TestIcebergOrder:
 
@@ -292,6 +327,1849 @@ class TestIcebergOrder:
         assert stdout.split('\n')[2] == '888,99999,100,20000' in stdout
 
 
+def _step_round_robin(orders, quantity):
+    # Reference implementation: steps through the queue one displayed peak
+    # at a time, as the iceberg round robin is specified
+    queue = list(orders)
+    matches = {}
+
+    position = 0
+    while queue and quantity > 0:
+        order = queue[position]
+
+        matched_quantity = min(quantity, order.display_quantity)
+        quantity -= matched_quantity
+        order.quantity -= matched_quantity
+        order._update_display_quantity(matched_quantity)
+
+        matches.setdefault(order.identity, 0)
+        matches[order.identity] += matched_quantity
+
+        if order.quantity == 0:
+            del queue[position]
+        else:
+            position += 1
+
+        if position >= len(queue):
+            position = 0  # new cycle
+
+    return matches
+
+
+class TestIcebergAllocation:
+    def test_allocation_matches_round_robin(self):
+
+        rng = random.Random(666)
+
+        for _ in range(500):
+            lines = []
+            for identity in range(rng.randint(2, 6)):
+                quantity = rng.randint(1, 500)
+                line = f'B,{identity},100,{quantity}'
+                if quantity > 1 and rng.random() < 0.7:
+                    line += f',{rng.randint(1, quantity - 1)}'
+                lines.append(line)
+
+            total_quantity = sum(int(line.split(',')[3]) for line in lines)
+
+            orderbook = lse_order_lib.LSEOrderbook(is_display=False)
+            for line in lines:
+                order = lse_order_lib.build_order_from_ascii_string(line)
+                orderbook.add(order)
+
+            # Partially fill some peaks, so that the round robin starts from
+            # partially displayed icebergs
+            x = f'A,98,100,{rng.randint(1, 50)}'
+            orderbook.add(lse_order_lib.build_order_from_ascii_string(x))
+            if 100 not in orderbook.bids:
+                continue
+
+            queue = orderbook.bids[100]
+            expected_orders = copy.deepcopy(list(queue))
+
+            quantity = rng.randint(1, total_quantity + 100)
+            expected_matches = _step_round_robin(expected_orders, quantity)
+
+            x = f'A,99,100,{quantity}'
+            orderbook._is_display = True
+            with io.StringIO() as stream:
+                with contextlib.redirect_stdout(stream):
+                    orderbook.add(
+                        lse_order_lib.build_order_from_ascii_string(x)
+                    )
+                stdout = stream.getvalue()
+
+            trades = [
+                line.split(',')
+                for line in stdout.split('\n')
+                if line.count(',') == 3 and '|' not in line
+            ]
+            matches = {int(trade[0]): int(trade[3]) for trade in trades}
+
+            assert matches == expected_matches
+            assert list(matches) == list(expected_matches)  # same order
+
+            remaining = [o for o in expected_orders if o.quantity > 0]
+            if 100 not in orderbook.bids:
+                assert not remaining
+                continue
+
+            def to_state(orders):
+                return [
+                    (o.identity, o.quantity, o.display_quantity)
+                    for o in orders
+                ]
+
+            assert to_state(orderbook.bids[100]) == to_state(remaining)
+
+    def test_large_aggressive_order(self):
+
+        orderbook = lse_order_lib.LSEOrderbook(is_display=False)
+        for identity in range(10):
+            x = f'B,{identity},100,10000000,100'
+            orderbook.add(lse_order_lib.build_order_from_ascii_string(x))
+
+        x = 'A,99,100,10000050'
+        orderbook.add(lse_order_lib.build_order_from_ascii_string(x))
+
+        queue = orderbook.bids[100]
+        assert queue.quantity == 100_000_000 - 10_000_050
+        # 10,000 full rounds of 100 share peaks; the first iceberg in
+        # time-priority then takes the remaining 50 shares
+        assert [o.quantity for o in queue] == [9_000_000 - 50] + [
+            9_000_000
+        ] * 9
+        assert queue[0].display_quantity == 50
+        assert orderbook.best_bid_size == queue.quantity
+
+
+class TestCancel:
+    def _build_orderbook(self, **kwargs):
+        orderbook = lse_order_lib.LSEOrderbook(is_display=False, **kwargs)
+
+        for x in [
+            'B,1,99,100',
+            'B,2,99,200',
+            'B,3,98,300',
+            'A,4,101,100',
+            'A,5,102,200,50',
+        ]:
+            orderbook.add(lse_order_lib.build_order_from_ascii_string(x))
+
+        return orderbook
+
+    def test_cancel_resting_order(self):
+
+        for kwargs in [{}, {'tick_range': (90, 110)}]:
+            orderbook = self._build_orderbook(**kwargs)
+
+            order = orderbook.cancel(1)
+            assert order.identity == 1
+            assert 1 not in orderbook
+            assert [order.identity for order in orderbook.bids[99]] == [2]
+            assert orderbook.best_bid == 99
+
+            orderbook.cancel(2)  # depletes the level
+            assert 99 not in orderbook.bids
+            assert orderbook.best_bid == 98
+
+            orderbook.cancel(4)
+            assert orderbook.best_ask == 102
+
+            orderbook.cancel(5)
+            orderbook.cancel(3)
+            assert orderbook.best_bid == sys.maxsize  # aka NaN
+            assert orderbook.best_ask == sys.maxsize  # "
+            assert not orderbook.bids and not orderbook.asks
+
+    def test_cancel_unknown_order(self):
+
+        orderbook = self._build_orderbook()
+
+        with pytest.raises(errors.OrderNotFoundError):
+            orderbook.cancel(42)
+
+        orderbook.cancel(1)
+        with pytest.raises(errors.OrderNotFoundError):
+            orderbook.cancel(1)  # already cancelled
+
+    def test_cancel_after_fills(self):
+
+        orderbook = self._build_orderbook()
+
+        # fully fills 1, partially fills 2
+        x = 'A,6,99,150'
+        orderbook.add(lse_order_lib.build_order_from_ascii_string(x))
+
+        assert 1 not in orderbook
+        with pytest.raises(errors.OrderNotFoundError):
+            orderbook.cancel(1)
+
+        order = orderbook.cancel(2)
+        assert order.quantity == 150
+        assert orderbook.best_bid == 98
+
+    def test_cancel_display(self):
+
+        orderbook = self._build_orderbook()
+        orderbook._is_display = True
+
+        with io.StringIO() as stream:
+            with contextlib.redirect_stdout(stream):
+                orderbook.cancel(3)
+            stdout = stream.getvalue()
+
+        assert '98' not in stdout
+        assert '99' in stdout
+
+
+class TestModify:
+    def _build_orderbook(self, **kwargs):
+        orderbook = lse_order_lib.LSEOrderbook(is_display=False, **kwargs)
+
+        for x in [
+            'B,1,99,100',
+            'B,2,99,200',
+            'B,3,99,300,100',
+            'A,4,101,100',
+        ]:
+            orderbook.add(lse_order_lib.build_order_from_ascii_string(x))
+
+        return orderbook
+
+    def test_reduce_quantity_keeps_priority(self):
+
+        orderbook = self._build_orderbook()
+        resting_order = orderbook.bids[99][0]
+
+        x = 'B,1,99,40'
+        orderbook.modify(lse_order_lib.build_order_from_ascii_string(x))
+
+        assert orderbook.bids[99][0] is resting_order  # amended in place
+        assert resting_order.quantity == 40
+        assert [order.identity for order in orderbook.bids[99]] == [1, 2, 3]
+
+        x = 'B,3,99,50,100'
+        with pytest.raises(errors.OrderError):  # peak less than the size
+            orderbook.modify(lse_order_lib.build_order_from_ascii_string(x))
+
+        x = 'B,3,99,150,100'
+        orderbook.modify(lse_order_lib.build_order_from_ascii_string(x))
+        assert orderbook.bids[99][2].quantity == 150
+        assert orderbook.bids[99][2].peak_quantity == 100
+
+    def test_price_out_of_range(self):
+
+        orderbook = self._build_orderbook(tick_range=(89, 113), tick_size=2)
+        snapshot = orderbook.market_by_order()
+
+        for x in ['B,3,80,10', 'B,3,100,10', 'B,3,120,10']:
+            with pytest.raises(errors.PriceOutOfRangeError):
+                orderbook.modify(
+                    lse_order_lib.build_order_from_ascii_string(x)
+                )
+
+        # The resting order is left untouched
+        assert 3 in orderbook
+        assert np.array_equal(orderbook.market_by_order(), snapshot)
+
+    def test_increase_quantity_loses_priority(self):
+
+        orderbook = self._build_orderbook()
+
+        x = 'B,1,99,101'
+        orderbook.modify(lse_order_lib.build_order_from_ascii_string(x))
+
+        assert [order.identity for order in orderbook.bids[99]] == [2, 3, 1]
+        assert orderbook.bids[99][2].quantity == 101
+
+    def test_price_change_loses_priority(self):
+
+        orderbook = self._build_orderbook()
+
+        x = 'B,2,98,200'
+        orderbook.modify(lse_order_lib.build_order_from_ascii_string(x))
+
+        assert [order.identity for order in orderbook.bids[99]] == [1, 3]
+        assert [order.identity for order in orderbook.bids[98]] == [2]
+
+        # Moving the price through the spread trades
+        orderbook._is_display = True
+        x = 'B,2,101,200'
+        with io.StringIO() as stream:
+            with contextlib.redirect_stdout(stream):
+                orderbook.modify(
+                    lse_order_lib.build_order_from_ascii_string(x)
+                )
+            stdout = stream.getvalue()
+
+        assert stdout.split('\n')[1] == '2,4,101,100'
+        assert 98 not in orderbook.bids
+        assert orderbook.best_bid == 101
+        assert orderbook.best_ask == sys.maxsize  # aka NaN
+        assert orderbook.bids[101][0].quantity == 100
+
+    def test_invalid_modify(self):
+
+        orderbook = self._build_orderbook()
+
+        x = 'B,42,99,100'
+        with pytest.raises(errors.OrderNotFoundError):
+            orderbook.modify(lse_order_lib.build_order_from_ascii_string(x))
+
+        x = 'A,1,99,100'
+        with pytest.raises(errors.InvalidModificationError):
+            orderbook.modify(lse_order_lib.build_order_from_ascii_string(x))
+
+        x = 'B,1,99,0'
+        orderbook.modify(lse_order_lib.build_order_from_ascii_string(x))
+        assert 1 not in orderbook
+
+
+class TestTopOfBook:
+    def test_cached_top_of_book(self):
+
+        lines = conftest.generate_testing_orders(num_orders_per_side=1_000)
+        prices = [int(line.split(',')[2]) for line in lines]
+
+        for kwargs in [{}, {'tick_range': (min(prices), max(prices))}]:
+            orderbook = lse_order_lib.LSEOrderbook(is_display=False, **kwargs)
+
+            for line in lines:
+                order = lse_order_lib.build_order_from_ascii_string(line)
+                orderbook.add(order)
+
+                for side, best_price, size, count in [
+                    (
+                        orderbook.bids,
+                        orderbook.best_bid,
+                        orderbook.best_bid_size,
+                        orderbook.best_bid_count,
+                    ),
+                    (
+                        orderbook.asks,
+                        orderbook.best_ask,
+                        orderbook.best_ask_size,
+                        orderbook.best_ask_count,
+                    ),
+                ]:
+                    if not side:
+                        assert best_price == sys.maxsize  # aka NaN
+                        assert size == count == 0
+                        continue
+
+                    queue = side[next(iter(side))]  # re-computed touch
+                    assert best_price == queue.price
+                    assert size == sum(order.quantity for order in queue)
+                    assert count == len(queue)
+
+    def test_top_of_book_after_cancel_and_modify(self):
+
+        orderbook = lse_order_lib.LSEOrderbook(is_display=False)
+
+        for x in ['B,1,99,100', 'B,2,99,200', 'B,3,98,300']:
+            orderbook.add(lse_order_lib.build_order_from_ascii_string(x))
+
+        assert (orderbook.best_bid_size, orderbook.best_bid_count) == (300, 2)
+
+        x = 'B,2,99,50'
+        orderbook.modify(lse_order_lib.build_order_from_ascii_string(x))
+        assert (orderbook.best_bid_size, orderbook.best_bid_count) == (150, 2)
+
+        orderbook.cancel(1)
+        assert (orderbook.best_bid_size, orderbook.best_bid_count) == (50, 1)
+
+        orderbook.cancel(2)
+        assert orderbook.best_bid == 98
+        assert (orderbook.best_bid_size, orderbook.best_bid_count) == (300, 1)
+
+
+class TestPriceLevelAggregates:
+    def _assert_aggregates(self, orderbook):
+        for side in [orderbook.bids, orderbook.asks]:
+            for price in side:
+                queue = side[price]
+                assert queue.quantity == sum(o.quantity for o in queue)
+                assert queue.display_quantity == sum(
+                    o.display_quantity for o in queue
+                )
+                assert len(queue) == len(list(queue))
+                assert all(0 < o.display_quantity <= o.quantity for o in queue)
+
+    def test_aggregates_during_matching(self):
+
+        lines = conftest.generate_testing_orders(num_orders_per_side=500)
+
+        orderbook = lse_order_lib.LSEOrderbook(is_display=False)
+        for index, line in enumerate(lines):
+            order = lse_order_lib.build_order_from_ascii_string(line)
+            orderbook.add(order)
+
+            if index % 7 == 0 and order.identity in orderbook:
+                orderbook.cancel(order.identity)
+
+            self._assert_aggregates(orderbook)
+
+    def test_aggregates_with_iceberg_peaks(self):
+
+        orderbook = lse_order_lib.LSEOrderbook(is_display=False)
+
+        for x in ['B,1,100,50', 'B,2,100,1000,100', 'B,3,100,500,200']:
+            orderbook.add(lse_order_lib.build_order_from_ascii_string(x))
+
+        queue = orderbook.bids[100]
+        assert (queue.quantity, queue.display_quantity) == (1550, 350)
+
+        x = 'A,4,100,475'  # fills 1 and cycles through both peaks
+        orderbook.add(lse_order_lib.build_order_from_ascii_string(x))
+        self._assert_aggregates(orderbook)
+        assert len(queue) == 2
+        assert queue.quantity == 1550 - 475
+
+        x = 'B,3,100,150,100'  # peak change loses priority
+        orderbook.modify(lse_order_lib.build_order_from_ascii_string(x))
+        self._assert_aggregates(orderbook)
+
+        x = 'B,2,100,20,100'
+        with pytest.raises(errors.OrderError):
+            orderbook.modify(lse_order_lib.build_order_from_ascii_string(x))
+
+        x = 'B,2,100,200,100'
+        orderbook.modify(lse_order_lib.build_order_from_ascii_string(x))
+        self._assert_aggregates(orderbook)
+        assert queue.quantity == 350
+
+
+class TestOrderStore:
+    def test_store_matches_object_orderbook(self):
+
+        lines = conftest.generate_testing_orders(num_orders_per_side=500)
+
+        order_store = store_lib.OrderStore(capacity=16)
+        orderbook = lse_order_lib.LSEOrderbook()
+        stored_orderbook = lse_order_lib.LSEOrderbook(order_store=order_store)
+
+        for index, line in enumerate(lines):
+            stdouts = []
+            for book in [orderbook, stored_orderbook]:
+                order = lse_order_lib.build_order_from_ascii_string(line)
+
+                with io.StringIO() as stream:
+                    with contextlib.redirect_stdout(stream):
+                        book.add(order)
+
+                        if index % 5 == 0 and order.identity in book:
+                            cancelled = book.cancel(order.identity)
+                            assert cancelled.identity == order.identity
+
+                    stdouts.append(stream.getvalue())
+
+            assert stdouts[0] == stdouts[1]
+
+        assert len(order_store) == sum(
+            len(book[price])
+            for book in [stored_orderbook.bids, stored_orderbook.asks]
+            for price in book
+        )
+        assert order_store.capacity < len(lines)  # slots were recycled
+
+        for side in [order_lib.OrderSide.BID, order_lib.OrderSide.ASK]:
+            book = orderbook.bids if side > 0 else orderbook.asks
+            prices, quantities, counts = order_store.depth(side)
+            assert list(prices) == sorted(book)
+            assert list(quantities) == [book[p].quantity for p in prices]
+            assert list(counts) == [len(book[p]) for p in prices]
+
+
+class TestDepth:
+    def test_depth_matches_order_store(self):
+
+        lines = conftest.generate_testing_orders(num_orders_per_side=500)
+        prices = [int(line.split(',')[2]) for line in lines]
+
+        for kwargs in [{}, {'tick_range': (min(prices), max(prices))}]:
+            order_store = store_lib.OrderStore()
+            orderbook = lse_order_lib.LSEOrderbook(
+                is_display=False, order_store=order_store, **kwargs
+            )
+            for line in lines:
+                orderbook.add(
+                    lse_order_lib.build_order_from_ascii_string(line)
+                )
+
+            bids, asks = orderbook.depth()
+            for (prices, quantities, counts), side in [
+                (
+                    [array[::-1] for array in bids],  # ascending
+                    order_lib.OrderSide.BID,
+                ),
+                (asks, order_lib.OrderSide.ASK),
+            ]:
+                for array, expected in zip(
+                    (prices, quantities, counts), order_store.depth(side)
+                ):
+                    assert array.dtype == np.int64
+                    assert np.array_equal(array, expected)
+
+            assert bids[0][0] == orderbook.best_bid
+            assert asks[0][0] == orderbook.best_ask
+
+            top_bids, top_asks = orderbook.depth(levels=5)
+            for top, full in [(top_bids, bids), (top_asks, asks)]:
+                for array, expected in zip(top, full):
+                    assert np.array_equal(array, expected[:5])
+
+            _, visible_asks = orderbook.depth(visible=True)
+            assert list(visible_asks[1]) == [
+                sum(order.display_quantity for order in orderbook.asks[price])
+                for price in asks[0]
+            ]
+            assert (visible_asks[1] <= asks[1]).all()
+
+    def test_empty_book(self):
+
+        bids, asks = lse_order_lib.LSEOrderbook(is_display=False).depth()
+        for array in bids + asks:
+            assert array.dtype == np.int64
+            assert len(array) == 0
+
+
+class TestMarketByOrder:
+    def test_snapshot(self, tmp_path):
+
+        lines = conftest.generate_testing_orders(num_orders_per_side=500)
+        prices = [int(line.split(',')[2]) for line in lines]
+
+        snapshots = []
+        for kwargs in [
+            {},
+            {'order_store': store_lib.OrderStore()},
+            {'tick_range': (min(prices), max(prices))},
+        ]:
+            orderbook = lse_order_lib.LSEOrderbook(is_display=False, **kwargs)
+            for line in lines:
+                orderbook.add(
+                    lse_order_lib.build_order_from_ascii_string(line)
+                )
+
+            snapshot = orderbook.market_by_order()
+            assert snapshot.dtype == orderbook_lib.MARKET_BY_ORDER_DTYPE
+            snapshots.append(snapshot)
+
+            expected = []
+            for side, book in [(1, orderbook.bids), (-1, orderbook.asks)]:
+                for price in book:
+                    for position, order in enumerate(book[price]):
+                        expected.append(
+                            (
+                                side,
+                                price,
+                                position,
+                                order.identity,
+                                order.quantity,
+                                (
+                                    order.peak_size
+                                    if order.type
+                                    is order_lib.OrderType.ICEBERG
+                                    else order_lib.LIMIT_ORDER_PEAK_SIZE
+                                ),
+                                order.display_quantity,
+                            )
+                        )
+            assert snapshot.tolist() == expected
+
+            path = tmp_path / 'orders.npy'
+            assert np.array_equal(
+                orderbook.market_by_order(str(path)), snapshot
+            )
+            assert np.array_equal(np.load(path), snapshot)
+
+        assert all(np.array_equal(snapshots[0], other) for other in snapshots)
+
+    def test_empty_book(self, tmp_path):
+
+        orderbook = lse_order_lib.LSEOrderbook(is_display=False)
+        assert len(orderbook.market_by_order()) == 0
+
+        path = tmp_path / 'orders.npy'
+        orderbook.market_by_order(str(path))
+        assert len(np.load(path)) == 0
+
+
+class TestMarketOrder:
+    def test_sweep_matches_marketable_limit(self):
+
+        lines = conftest.generate_testing_orders(num_orders_per_side=300)
+
+        for kwargs in [
+            {},
+            {'order_store': store_lib.OrderStore()},
+            {'order_pool': order_lib.OrderPool()},
+            {'feed': orderbook_lib.FEED_DELTA},
+        ]:
+            for side, price in [('B', 10**15), ('A', 0)]:
+                orderbook = conftest.build_orderbook(
+                    lines, display_levels=5, **kwargs
+                )
+                bids, asks = orderbook.depth()
+                quantities = asks[1] if side == 'B' else bids[1]
+
+                for quantity in [
+                    1,
+                    int(quantities[:10].sum()),  # whole levels
+                    int(quantities[:10].sum() + quantities[10] // 2),
+                ]:
+                    market_orderbook = conftest.build_orderbook(
+                        lines, display_levels=5, **kwargs
+                    )
+                    limit_orderbook = conftest.build_orderbook(
+                        lines, display_levels=5, **kwargs
+                    )
+
+                    market_orderbook.add(
+                        lse_order_lib.build_order_from_ascii_string(
+                            f'{side},999999,,{quantity}'
+                        )
+                    )
+                    limit_orderbook.add(
+                        lse_order_lib.build_order_from_ascii_string(
+                            f'{side},999999,{price},{quantity}'
+                        )
+                    )
+
+                    assert (
+                        market_orderbook.output_sink.messages
+                        == limit_orderbook.output_sink.messages
+                    )
+                    assert np.array_equal(
+                        market_orderbook.market_by_order(),
+                        limit_orderbook.market_by_order(),
+                    )
+
+    def test_residual_is_cancelled(self):
+
+        lines = conftest.generate_testing_orders(num_orders_per_side=300)
+
+        for kwargs in [
+            {},
+            {'order_store': store_lib.OrderStore()},
+            {'feed': orderbook_lib.FEED_DELTA},
+        ]:
+            orderbook = conftest.build_orderbook(
+                lines, display_levels=5, **kwargs
+            )
+            bids = orderbook.market_by_order()
+            bids = bids[bids['side'] == order_lib.OrderSide.BID]
+            total_quantity = int(orderbook.depth()[1][1].sum())
+
+            order = lse_order_lib.build_order_from_ascii_string(
+                f'B,999999,,{total_quantity + 100}'
+            )
+            orderbook.add(order)
+
+            assert order.quantity == 100  # the unfilled residual
+            assert 999999 not in orderbook
+            assert orderbook.best_ask == orderbook_lib.INTEGER_NAN
+            assert np.array_equal(orderbook.market_by_order(), bids)
+
+            if kwargs.get('feed') == orderbook_lib.FEED_DELTA:
+                for message in orderbook.output_sink.messages:
+                    assert not message.startswith('\nN')
+
+        # An empty side cancels the whole order
+        orderbook = lse_order_lib.LSEOrderbook(is_display=False)
+        order = lse_order_lib.build_order_from_ascii_string('A,1,,100')
+        orderbook.add(order)
+        assert order.quantity == 100
+        assert 1 not in orderbook
+        assert orderbook.best_ask == orderbook_lib.INTEGER_NAN
+
+
+class TestTimeInForce:
+    @staticmethod
+    def _build_order(line, time_in_force):
+        order = lse_order_lib.build_order_from_ascii_string(line)
+        order.time_in_force = time_in_force
+        return order
+
+    @staticmethod
+    def _tick_range(lines):
+        prices = [int(line.split(',')[2]) for line in lines]
+        return min(prices), max(prices)
+
+    def _kwargs(self, lines):
+        tick_range = self._tick_range(lines)
+        return [
+            {},
+            {'tick_range': tick_range},
+            {'tick_range': tick_range, 'depth_index': True},
+            {
+                'tick_range': tick_range,
+                'depth_index': True,
+                'order_store': store_lib.OrderStore(),
+            },
+        ]
+
+    def test_immediate_or_cancel(self):
+
+        lines = conftest.generate_testing_orders(num_orders_per_side=300)
+
+        for kwargs in self._kwargs(lines):
+            day_orderbook = conftest.build_orderbook(
+                lines, feed=orderbook_lib.FEED_DELTA, **kwargs
+            )
+            ioc_orderbook = conftest.build_orderbook(
+                lines, feed=orderbook_lib.FEED_DELTA, **kwargs
+            )
+
+            price = int(day_orderbook.depth(levels=10)[1][0][-1])
+            line = f'B,999999,{price},{10**9}'
+
+            day_orderbook.add(
+                self._build_order(line, order_lib.TimeInForce.DAY)
+            )
+            order = self._build_order(line, order_lib.TimeInForce.IOC)
+            ioc_orderbook.add(order)
+
+            assert 999999 in day_orderbook
+            assert 999999 not in ioc_orderbook
+            assert 0 < order.quantity < 10**9  # the cancelled residual
+
+            snapshot = day_orderbook.market_by_order()
+            assert np.array_equal(
+                snapshot[snapshot['identity'] != 999999],
+                ioc_orderbook.market_by_order(),
+            )
+
+            # An order that does not cross the book is cancelled outright
+            ioc_orderbook.output_sink.messages.clear()
+            snapshot = ioc_orderbook.market_by_order()
+            ioc_orderbook.add(
+                self._build_order(
+                    f'B,999998,{ioc_orderbook.best_bid},100',
+                    order_lib.TimeInForce.IOC,
+                )
+            )
+            assert 999998 not in ioc_orderbook
+            assert np.array_equal(ioc_orderbook.market_by_order(), snapshot)
+
+    def test_fill_or_kill(self):
+
+        lines = conftest.generate_testing_orders(num_orders_per_side=300)
+
+        for kwargs in self._kwargs(lines):
+            for side, levels in [('B', 1), ('A', 0)]:
+                orderbook = conftest.build_orderbook(
+                    lines, feed=orderbook_lib.FEED_DELTA, **kwargs
+                )
+                prices, quantities, _ = orderbook.depth(levels=10)[levels]
+                price, quantity = int(prices[-1]), int(quantities.sum())
+
+                for line, filled in [
+                    (f'{side},999999,{price},{quantity + 1}', False),
+                    (f'{side},999999,{price},{quantity}', True),
+                    (f'{side},999999,,{quantity}', True),
+                ]:
+                    fok_orderbook = conftest.build_orderbook(
+                        lines, feed=orderbook_lib.FEED_DELTA, **kwargs
+                    )
+                    day_orderbook = conftest.build_orderbook(
+                        lines, feed=orderbook_lib.FEED_DELTA, **kwargs
+                    )
+                    snapshot = fok_orderbook.market_by_order()
+
+                    fok_orderbook.add(
+                        self._build_order(line, order_lib.TimeInForce.FOK)
+                    )
+                    day_orderbook.add(
+                        self._build_order(line, order_lib.TimeInForce.DAY)
+                    )
+
+                    if filled:
+                        assert (
+                            fok_orderbook.output_sink.messages
+                            == day_orderbook.output_sink.messages
+                        )
+                        assert np.array_equal(
+                            fok_orderbook.market_by_order(),
+                            day_orderbook.market_by_order(),
+                        )
+                    else:
+                        # Rejected without touching the book
+                        assert not fok_orderbook.output_sink.messages
+                        assert np.array_equal(
+                            fok_orderbook.market_by_order(), snapshot
+                        )
+
+                # A market order can take the whole side, but no more
+                total = int(orderbook.depth()[levels][1].sum())
+                for quantity, filled in [(total + 1, False), (total, True)]:
+                    orderbook = conftest.build_orderbook(
+                        lines, feed=orderbook_lib.FEED_DELTA, **kwargs
+                    )
+                    orderbook.add(
+                        self._build_order(
+                            f'{side},999999,,{quantity}',
+                            order_lib.TimeInForce.FOK,
+                        )
+                    )
+                    assert bool(orderbook.output_sink.messages) is filled
+
+    def test_pooled_orders_are_released(self):
+
+        pool = order_lib.OrderPool()
+
+        for time_in_force in order_lib.TimeInForce:
+            orderbook = lse_order_lib.LSEOrderbook(
+                is_display=False, order_pool=pool
+            )
+            orderbook.add(
+                lse_order_lib.build_order_from_ascii_string('A,1,100,10')
+            )
+
+            order = pool.acquire(
+                lse_order_lib.LSELimitOrder,
+                side=order_lib.OrderSide.BID,
+                identity=2,
+                price=100,
+                quantity=20,
+                time_in_force=time_in_force,
+            )
+            orderbook.add(order)
+
+            is_released = any(
+                order is other
+                for free in pool._free.values()
+                for other in free
+            )
+            if time_in_force is order_lib.TimeInForce.DAY:
+                assert 2 in orderbook and not is_released
+            else:
+                assert 2 not in orderbook and is_released
+
+            # A rejected fill-or-kill order leaves the ask untouched
+            is_rejected = time_in_force is order_lib.TimeInForce.FOK
+            assert (1 in orderbook) is is_rejected
+
+    def test_depth_index_matches_depth(self):
+
+        random.seed(11)
+
+        tick_range = (1_000, 2_000)
+        orderbook = lse_order_lib.LSEOrderbook(
+            is_display=False,
+            tick_range=tick_range,
+            tick_size=5,
+            depth_index=True,
+        )
+        depth_index = {
+            order_lib.OrderSide.BID: orderbook._bids._depth_index,
+            order_lib.OrderSide.ASK: orderbook._asks._depth_index,
+        }
+
+        resting = set()
+        for identity in range(5_000):
+            side = random.choice('BA')
+            action = random.random()
+
+            if action < 0.1 and resting:
+                orderbook.cancel(resting.pop())
+            elif action < 0.2 and resting:
+                row = orderbook.market_by_order()
+                row = row[row['identity'] == random.choice(list(resting))][0]
+                if row['peak_size'] == order_lib.LIMIT_ORDER_PEAK_SIZE:
+                    side = 'B' if row['side'] == 1 else 'A'
+                    quantity = random.randint(1, 2 * int(row['quantity']))
+                    orderbook.modify(
+                        lse_order_lib.build_order_from_ascii_string(
+                            f'{side},{row["identity"]},{row["price"]},'
+                            f'{quantity}'
+                        )
+                    )
+            elif action < 0.25:
+                orderbook.add(
+                    lse_order_lib.build_order_from_ascii_string(
+                        f'{side},{identity},,{random.randint(1, 2_000)}'
+                    )
+                )
+            else:
+                price = 1_500 + 5 * random.randint(-50, 50)
+                line = f'{side},{identity},{price},{random.randint(1, 500)}'
+                if random.random() < 0.2:
+                    line += f',{random.randint(1, 50)}'
+                    if int(line.split(',')[-1]) >= int(line.split(',')[3]):
+                        continue
+                orderbook.add(
+                    lse_order_lib.build_order_from_ascii_string(line)
+                )
+                resting.add(identity)
+
+            resting = {
+                identity for identity in resting if identity in orderbook
+            }
+
+            for side, (prices, quantities, _) in zip(
+                [order_lib.OrderSide.BID, order_lib.OrderSide.ASK],
+                orderbook.depth(),
+            ):
+                tree = depth_index[side]
+                assert tree.total() == quantities.sum()
+
+                for price, quantity in zip(prices, quantities):
+                    position = (price - tick_range[0]) // 5
+                    assert (
+                        tree.prefix_sum(position + 1)
+                        - tree.prefix_sum(position)
+                        == quantity
+                    )
+
+    def test_depth_index_requires_tick_range(self):
+
+        with pytest.raises(ValueError):
+            lse_order_lib.LSEOrderbook(is_display=False, depth_index=True)
+
+
+class TestCumulativeDepth:
+    def test_index_matches_walk(self):
+
+        lines = conftest.generate_testing_orders(num_orders_per_side=2_000)
+        prices = sorted({int(line.split(',')[2]) for line in lines})
+        tick_range = (prices[0], prices[-1])
+
+        orderbooks = [
+            lse_order_lib.LSEOrderbook(is_display=False),
+            lse_order_lib.LSEOrderbook(
+                is_display=False, tick_range=tick_range
+            ),
+            lse_order_lib.LSEOrderbook(
+                is_display=False, tick_range=tick_range, depth_index=True
+            ),
+        ]
+        for orderbook in orderbooks:
+            for line in lines:
+                orderbook.add(
+                    lse_order_lib.build_order_from_ascii_string(line)
+                )
+
+        random.seed(13)
+        sides = [order_lib.OrderSide.BID, order_lib.OrderSide.ASK]
+        for side, (book_prices, quantities, _) in zip(
+            sides, orderbooks[0].depth()
+        ):
+            cumulative = np.cumsum(quantities)
+
+            queries = random.sample(prices, 200) + [0, 10**9]
+            for price in queries:
+                expected = int(
+                    quantities[(price - book_prices) * side <= 0].sum()
+                )
+                for orderbook in orderbooks:
+                    assert (
+                        orderbook.cumulative_quantity(side, price) == expected
+                    )
+
+            queries = [1, int(cumulative[-1]), int(cumulative[-1]) + 1]
+            queries += random.sample(range(1, int(cumulative[-1])), 200)
+            for quantity in queries:
+                level = np.searchsorted(cumulative, quantity)
+                if level == len(cumulative):
+                    expected = orderbook_lib.INTEGER_NAN
+                else:
+                    expected = book_prices[level]
+
+                for orderbook in orderbooks:
+                    assert orderbook.sweep_price(side, quantity) == expected
+
+    def test_empty_book(self):
+
+        orderbook = lse_order_lib.LSEOrderbook(
+            is_display=False, tick_range=(100, 200), depth_index=True
+        )
+        for side in order_lib.OrderSide:
+            assert orderbook.cumulative_quantity(side, 150) == 0
+            assert orderbook.sweep_price(side, 1) == orderbook_lib.INTEGER_NAN
+
+
+def _build_stop(stop_price, side, identity, quantity, price=None):
+    if price is None:
+        return order_lib.StopOrder(
+            stop_price, side, identity, quantity, _private_call=False
+        )
+    return order_lib.StopLimitOrder(
+        stop_price, side, identity, price, quantity, _private_call=False
+    )
+
+
+class TestStopOrder:
+    @staticmethod
+    def _trades(orderbook) -> list:
+        messages = orderbook.output_sink.messages
+        return [
+            tuple(map(int, message.split(',')))
+            for message in messages
+            if message[1].isdigit()
+        ]
+
+    def test_stop_is_held_until_triggered(self):
+
+        lines = ['A,1,100,10', 'A,2,101,10', 'A,3,102,10', 'B,4,99,10']
+        BUY, SELL = order_lib.OrderSide.BUY, order_lib.OrderSide.SELL
+
+        for kwargs in [
+            {},
+            {'tick_range': (90, 110)},
+            {'order_store': store_lib.OrderStore()},
+            {'order_pool': order_lib.OrderPool()},
+        ]:
+            orderbook = conftest.build_orderbook(
+                lines, feed=orderbook_lib.FEED_DELTA, **kwargs
+            )
+
+            orderbook.add(_build_stop(101, BUY, 10, 5))
+            orderbook.add(_build_stop(99, SELL, 11, 8, price=98))
+            assert 10 not in orderbook and 11 not in orderbook
+            assert not orderbook.output_sink.messages
+            assert orderbook.last_trade_price == orderbook_lib.INTEGER_NAN
+
+            # A trade short of the stop price does not trigger it
+            orderbook.add(
+                lse_order_lib.build_order_from_ascii_string('B,20,100,10')
+            )
+            assert self._trades(orderbook) == [(20, 1, 100, 10)]
+            assert orderbook.last_trade_price == 100
+            assert len(orderbook._buy_stops) == 1
+
+            # A trade at the stop price triggers it, after the trade itself
+            orderbook.output_sink.messages.clear()
+            orderbook.add(
+                lse_order_lib.build_order_from_ascii_string('B,21,101,5')
+            )
+            assert self._trades(orderbook) == [
+                (21, 2, 101, 5),
+                (10, 2, 101, 5),
+            ]
+            assert list(orderbook._stops) == [11]
+            assert not len(orderbook._buy_stops)
+            assert orderbook.best_ask == 102
+
+            # The sell stop-limit rests its residual once triggered
+            orderbook.output_sink.messages.clear()
+            orderbook.add(
+                lse_order_lib.build_order_from_ascii_string('A,22,99,4')
+            )
+            assert self._trades(orderbook) == [
+                (4, 22, 99, 4),
+                (4, 11, 99, 6),
+            ]
+            assert 11 in orderbook and orderbook.best_ask == 98
+            assert orderbook.last_trade_price == 99
+
+    def test_stop_through_last_trade(self):
+
+        orderbook = conftest.build_orderbook(
+            ['A,1,100,10', 'A,2,101,10', 'B,3,100,1'],
+            feed=orderbook_lib.FEED_DELTA,
+        )
+        assert orderbook.last_trade_price == 100
+
+        # The last trade is already at the stop price: submitted at once
+        orderbook.add(_build_stop(100, order_lib.OrderSide.BUY, 10, 5))
+        assert self._trades(orderbook) == [(10, 1, 100, 5)]
+        assert not orderbook._stops
+
+    def test_cancel_stop(self):
+
+        orderbook = conftest.build_orderbook(
+            ['A,1,100,10'], feed=orderbook_lib.FEED_DELTA
+        )
+
+        stop = _build_stop(100, order_lib.OrderSide.BUY, 10, 5)
+        orderbook.add(stop)
+        assert orderbook.cancel(10) is stop
+        assert not orderbook._stops and not len(orderbook._buy_stops)
+
+        orderbook.add(lse_order_lib.build_order_from_ascii_string('B,2,100,1'))
+        assert self._trades(orderbook) == [(2, 1, 100, 1)]
+
+        with pytest.raises(errors.OrderNotFoundError):
+            orderbook.cancel(10)
+
+    def test_cascade_is_deterministic(self):
+
+        BUY, SELL = order_lib.OrderSide.BUY, order_lib.OrderSide.SELL
+        lines = ['A,1,100,10', 'A,2,101,10', 'A,3,102,10', 'B,4,99,10']
+
+        for kwargs in [{}, {'tick_range': (90, 110)}]:
+            orderbook = conftest.build_orderbook(
+                lines, feed=orderbook_lib.FEED_DELTA, **kwargs
+            )
+            for stop in [
+                _build_stop(102, BUY, 10, 1),
+                _build_stop(101, BUY, 11, 2),
+                _build_stop(100, BUY, 12, 2),
+                _build_stop(101, BUY, 13, 2),
+                _build_stop(100, SELL, 14, 1),
+                _build_stop(98, SELL, 15, 1),
+            ]:
+                orderbook.add(stop)
+
+            orderbook.add(
+                lse_order_lib.build_order_from_ascii_string('B,20,101,15')
+            )
+
+            # The trades at 100 and 101 trigger the stops they crossed:
+            # those already through the first trade (100) come first, then
+            # in the order of their stop price, ties in arrival order. The
+            # stop that they trigger in turn (102) comes last
+            assert self._trades(orderbook) == [
+                (20, 1, 100, 10),
+                (20, 2, 101, 5),
+                (12, 2, 101, 2),
+                (4, 14, 99, 1),
+                (11, 2, 101, 2),
+                (13, 2, 101, 1),
+                (13, 3, 102, 1),
+                (10, 3, 102, 1),
+            ]
+            assert orderbook.last_trade_price == 102
+            assert list(orderbook._stops) == [15]
+
+    def test_stop_limit_price_out_of_range(self):
+
+        BUY = order_lib.OrderSide.BUY
+
+        orderbook = conftest.build_orderbook(
+            ['A,1,100,10', 'A,2,101,10'],
+            feed=orderbook_lib.FEED_DELTA,
+            tick_range=(90, 110),
+        )
+
+        # Rejected on entry, like a limit order at the same price
+        with pytest.raises(errors.PriceOutOfRangeError):
+            orderbook.add(_build_stop(100, BUY, 2, 5, price=500))
+        assert not orderbook._stops and not len(orderbook._buy_stops)
+
+        orderbook.add(_build_stop(100, BUY, 3, 5))
+        orderbook.add(lse_order_lib.build_order_from_ascii_string('B,4,100,4'))
+        assert self._trades(orderbook) == [(4, 1, 100, 4), (3, 1, 100, 5)]
+        assert not orderbook._stops and not orderbook._triggered
+
+    def test_failed_stop_is_held_again(self, monkeypatch):
+
+        BUY = order_lib.OrderSide.BUY
+
+        orderbook = conftest.build_orderbook(
+            ['A,1,100,10', 'A,2,101,10'], feed=orderbook_lib.FEED_DELTA
+        )
+        orderbook.add(_build_stop(100, BUY, 3, 5, price=100))
+        orderbook.add(_build_stop(100, BUY, 4, 5))
+
+        def trigger(self, pool=None):
+            raise RuntimeError('Failed to trigger the stop. ')
+
+        monkeypatch.setattr(order_lib.StopLimitOrder, 'trigger', trigger)
+
+        # The first triggered stop fails; the stop queued behind it is held
+        # again rather than left to the cascade of a later order
+        with pytest.raises(RuntimeError):
+            orderbook.add(
+                lse_order_lib.build_order_from_ascii_string('B,5,100,4')
+            )
+        assert not orderbook._triggered
+        assert list(orderbook._stops) == [4]
+
+        stop = orderbook._stops[4]
+        assert orderbook.cancel(4) is stop
+        assert not len(orderbook._buy_stops)
+
+
+class TestAuction:
+    @staticmethod
+    def _levels(*levels):
+        prices, quantities = zip(*levels) if levels else ((), ())
+        return (
+            np.array(prices, dtype=np.int64),
+            np.array(quantities, dtype=np.int64),
+        )
+
+    def test_uncrossing_price_rules(self):
+
+        uncrossing_price = lse_orderbook_lib._uncrossing_price
+        levels = self._levels
+
+        # [1] maximum executable volume
+        assert uncrossing_price(
+            levels((102, 10), (101, 5)), levels((100, 8), (101, 10))
+        ) == (101, 15)
+
+        # [2] minimum surplus
+        assert uncrossing_price(
+            levels((101, 10)), levels((100, 10), (101, 5))
+        ) == (100, 10)
+
+        # [3] market pressure
+        assert uncrossing_price(levels((102, 20)), levels((100, 10))) == (
+            102,
+            10,
+        )
+        assert uncrossing_price(levels((102, 10)), levels((100, 20))) == (
+            100,
+            10,
+        )
+
+        # [4] reference price
+        bids, asks = levels((102, 10)), levels((100, 10))
+        assert uncrossing_price(bids, asks, reference_price=101) == (101, 10)
+        assert uncrossing_price(bids, asks, reference_price=105) == (102, 10)
+        assert uncrossing_price(bids, asks) == (100, 10)
+
+        # Market orders execute at any price
+        assert uncrossing_price(
+            levels(), levels((100, 5)), market_bid_quantity=7
+        ) == (100, 5)
+
+        # Nothing executes
+        assert uncrossing_price(levels((99, 10)), levels((100, 10))) == (
+            orderbook_lib.INTEGER_NAN,
+            0,
+        )
+        assert uncrossing_price(levels(), levels()) == (
+            orderbook_lib.INTEGER_NAN,
+            0,
+        )
+
+    def test_uncrossing_price_matches_brute_force(self):
+
+        random.seed(17)
+
+        for _ in range(200):
+            bids = sorted(
+                {
+                    random.randint(90, 110): random.randint(1, 50)
+                    for _ in range(random.randint(0, 8))
+                }.items(),
+                reverse=True,
+            )
+            asks = sorted(
+                {
+                    random.randint(90, 110): random.randint(1, 50)
+                    for _ in range(random.randint(1, 8))
+                }.items()
+            )
+            market_bid_quantity = random.choice([0, random.randint(1, 50)])
+            reference_price = random.randint(85, 115)
+
+            price, volume = lse_orderbook_lib._uncrossing_price(
+                self._levels(*bids),
+                self._levels(*asks),
+                market_bid_quantity=market_bid_quantity,
+                reference_price=reference_price,
+            )
+
+            candidates = []
+            for candidate in sorted({price for price, _ in bids + asks}):
+                demand = market_bid_quantity + sum(
+                    quantity for price, quantity in bids if price >= candidate
+                )
+                supply = sum(
+                    quantity for price, quantity in asks if price <= candidate
+                )
+                candidates.append(
+                    (min(demand, supply), demand - supply, candidate)
+                )
+
+            max_volume = max(volume for volume, _, _ in candidates)
+            if not max_volume:
+                assert (price, volume) == (orderbook_lib.INTEGER_NAN, 0)
+                continue
+
+            candidates = [c for c in candidates if c[0] == max_volume]
+            min_surplus = min(abs(surplus) for _, surplus, _ in candidates)
+            candidates = [c for c in candidates if abs(c[1]) == min_surplus]
+            prices = [candidate for _, _, candidate in candidates]
+
+            if all(surplus > 0 for _, surplus, _ in candidates):
+                expected = max(prices)
+            elif all(surplus < 0 for _, surplus, _ in candidates):
+                expected = min(prices)
+            else:
+                expected = min(max(reference_price, min(prices)), max(prices))
+
+            assert (price, volume) == (expected, max_volume)
+
+    @staticmethod
+    def _run_auction(lines, market_lines=(), **kwargs):
+        orderbook = lse_order_lib.LSEOrderbook(
+            output_sink=sink_lib.ListSink(),
+            feed=orderbook_lib.FEED_DELTA,
+            **kwargs,
+        )
+        orderbook.start_auction()
+        for line in list(lines) + list(market_lines):
+            orderbook.add(lse_order_lib.build_order_from_ascii_string(line))
+
+        assert orderbook.is_auction
+        assert not any(
+            message[1].isdigit() for message in orderbook.output_sink.messages
+        )  # no trades whilst in the auction
+
+        orderbook.output_sink.messages.clear()
+        return orderbook, orderbook.uncross()
+
+    def test_uncross(self):
+
+        lines = conftest.generate_testing_orders(num_orders_per_side=500)
+
+        # Shift the bids up, so that the book crosses
+        crossed = []
+        for line in lines:
+            fields = line.split(',')
+            if fields[0] == 'B':
+                fields[2] = str(int(fields[2]) + 500)
+            fields[1] = str(len(crossed))  # unique identities
+            crossed.append(','.join(fields))
+
+        prices = [int(line.split(',')[2]) for line in crossed]
+        tick_range = (min(prices), max(prices))
+        market_lines = ['B,100000,,500', 'A,100001,,300']
+
+        results = []
+        for kwargs in [
+            {},
+            {'tick_range': tick_range, 'depth_index': True},
+            {'order_store': store_lib.OrderStore()},
+            {'order_pool': order_lib.OrderPool()},
+        ]:
+            orderbook, (price, volume) = self._run_auction(
+                crossed, market_lines, **kwargs
+            )
+            assert volume > 0
+            assert not orderbook.is_auction
+            assert orderbook.last_trade_price == price
+            assert orderbook.best_bid < orderbook.best_ask  # uncrossed
+            assert 100000 not in orderbook and 100001 not in orderbook
+
+            trades = [
+                tuple(map(int, message.split(',')))
+                for message in orderbook.output_sink.messages
+                if message[1].isdigit()
+            ]
+            assert sum(trade[3] for trade in trades) == volume
+            assert {trade[2] for trade in trades} == {price}
+
+            # The market orders execute first
+            assert trades[0][0] == 100000 and trades[0][1] == 100001
+
+            if 'depth_index' in kwargs:
+                for side, (_, quantities, _) in zip(
+                    order_lib.OrderSide, orderbook.depth()
+                ):
+                    book = orderbook._bids if side > 0 else orderbook._asks
+                    assert book._depth_index.total() == quantities.sum()
+
+            # The outcome does not depend on how the book is held
+            results.append(
+                (price, volume, trades, orderbook.market_by_order())
+            )
+
+        for other in results[1:]:
+            assert other[:3] == results[0][:3]
+            assert np.array_equal(other[3], results[0][3])
+
+    def test_uncross_matches_continuous_book(self):
+
+        # With a single aggressive order, the auction executes the same
+        # volume as continuous matching would, in the same priority
+        lines = ['A,1,100,10', 'A,2,101,10,3', 'A,3,101,10', 'A,4,102,10']
+        orderbook, (price, volume) = self._run_auction(lines + ['B,5,101,25'])
+        assert (price, volume) == (101, 25)
+
+        continuous_orderbook = lse_order_lib.LSEOrderbook(is_display=False)
+        for line in lines + ['B,5,101,25']:
+            continuous_orderbook.add(
+                lse_order_lib.build_order_from_ascii_string(line)
+            )
+
+        assert np.array_equal(
+            orderbook.market_by_order(),
+            continuous_orderbook.market_by_order(),
+        )
+
+    def test_auction_orders(self):
+
+        orderbook = lse_order_lib.LSEOrderbook(is_display=False)
+        orderbook.start_auction()
+
+        order = lse_order_lib.build_order_from_ascii_string('B,1,100,10')
+        order.time_in_force = order_lib.TimeInForce.IOC
+        with pytest.raises(errors.InvalidAuctionOrderError):
+            orderbook.add(order)
+
+        # A held market order can be cancelled
+        order = lse_order_lib.build_order_from_ascii_string('B,2,,10')
+        orderbook.add(order)
+        assert orderbook.cancel(2) is order
+
+        # A stop is triggered by the uncrossing trade
+        orderbook.add(_build_stop(100, order_lib.OrderSide.BUY, 3, 5))
+        for line in ['A,4,100,10', 'A,5,101,10', 'B,6,100,5']:
+            orderbook.add(lse_order_lib.build_order_from_ascii_string(line))
+
+        assert orderbook.uncross() == (100, 5)
+        assert orderbook.best_ask == 101
+        assert not orderbook._stops
+
+        # Nothing to uncross
+        orderbook.start_auction()
+        assert orderbook.uncross() == (orderbook_lib.INTEGER_NAN, 0)
+        assert not orderbook.is_auction
+
+
+class TestOrderPool:
+    def test_pooled_orderbook(self):
+
+        lines = conftest.generate_testing_orders(num_orders_per_side=500)
+
+        for order_store in [None, store_lib.OrderStore()]:
+            pool = order_lib.OrderPool()
+            orderbook = lse_order_lib.LSEOrderbook()
+            pooled_orderbook = lse_order_lib.LSEOrderbook(
+                order_pool=pool, order_store=order_store
+            )
+
+            for line in lines:
+                stdouts = []
+                for book, order_pool in [
+                    (orderbook, None),
+                    (pooled_orderbook, pool),
+                ]:
+                    order = lse_order_lib.build_order_from_ascii_string(
+                        line, order_pool
+                    )
+
+                    with io.StringIO() as stream:
+                        with contextlib.redirect_stdout(stream):
+                            book.add(order)
+                        stdouts.append(stream.getvalue())
+
+                assert stdouts[0] == stdouts[1]
+
+            assert pool.hits > 0
+            assert pool.hits + pool.misses == len(lines)
+
+            # Recycled orders are never resting on the book
+            resting = {
+                id(order)
+                for book in [pooled_orderbook.bids, pooled_orderbook.asks]
+                for price in book
+                for order in book[price]
+            }
+            free = {
+                id(order) for free in pool._free.values() for order in free
+            }
+            assert not resting & free
+
+
+class TestAddArray:
+    def test_add_array_matches_add(self):
+
+        lines = conftest.generate_testing_orders(num_orders_per_side=500)
+        orders, _ = lse_order_lib.parse_setsmm_buffer(
+            '\n'.join(lines).encode('ascii')
+        )
+
+        orderbook = lse_order_lib.LSEOrderbook()
+        array_orderbook = lse_order_lib.LSEOrderbook(
+            order_pool=order_lib.OrderPool()
+        )
+
+        stdouts = []
+        with io.StringIO() as stream:
+            with contextlib.redirect_stdout(stream):
+                for line in lines:
+                    orderbook.add(
+                        lse_order_lib.build_order_from_ascii_string(line)
+                    )
+            stdouts.append(stream.getvalue())
+
+        with io.StringIO() as stream:
+            with contextlib.redirect_stdout(stream):
+                array_orderbook.add_array(orders)
+            stdouts.append(stream.getvalue())
+
+        assert stdouts[0] == stdouts[1]
+        assert array_orderbook.order_pool.hits > 0
+
+
+class TestOutputSink:
+    def test_sinks_match_stdout(self):
+
+        lines = conftest.generate_testing_orders(num_orders_per_side=200)
+
+        orderbook = lse_order_lib.LSEOrderbook()
+        with io.StringIO() as stream:
+            with contextlib.redirect_stdout(stream):
+                for line in lines:
+                    orderbook.add(
+                        lse_order_lib.build_order_from_ascii_string(line)
+                    )
+            expected = stream.getvalue()
+
+        list_sink = sink_lib.ListSink()
+        buffered_sink = sink_lib.BufferedSink(
+            sink_lib.ListSink(), max_size=4096
+        )
+
+        for output_sink in [list_sink, buffered_sink]:
+            orderbook = lse_order_lib.LSEOrderbook(output_sink=output_sink)
+            assert orderbook.output_sink is output_sink
+
+            with output_sink:
+                for line in lines:
+                    orderbook.add(
+                        lse_order_lib.build_order_from_ascii_string(line)
+                    )
+
+        assert list_sink.getvalue() == expected
+        assert buffered_sink.sink.getvalue() == expected
+        assert len(buffered_sink.sink.messages) < len(list_sink.messages)
+
+    def test_null_sink_skips_formatting(self, monkeypatch):
+        def fail(*args, **kwargs):
+            raise AssertionError('Formatted a message')
+
+        monkeypatch.setattr(display_lib, 'BookFormat', fail)
+        monkeypatch.setattr(display_lib.TradeFormat, 'from_orders', fail)
+
+        orderbook = lse_order_lib.LSEOrderbook(output_sink=sink_lib.NullSink())
+        for line in ['B,1,5103,100', 'A,2,5103,50', 'A,3,5103,100,10']:
+            orderbook.add(lse_order_lib.build_order_from_ascii_string(line))
+
+        assert orderbook.best_ask == 5103
+
+
+class TestDisplayDepth:
+    def test_bounded_book(self):
+        def quote_rows(orderbook) -> list:
+            orderbook.output_sink.messages.clear()
+            orderbook._output_quote_message()
+            body = orderbook.output_sink.getvalue()
+            return body.split('\n')[5:-1]  # drop the header and footer
+
+        lines = [
+            'B,1,100,10',
+            'B,2,100,20',
+            'B,3,99,30',
+            'B,4,98,40',
+            'A,5,101,10',
+            'A,6,102,20',
+        ]
+        empty_ask = display_lib._BOOK_FORMAT_EMPTY_ASK
+        num_bid_columns = len(display_lib._BOOK_FORMAT_EMPTY_BID)
+
+        for kwargs in [{}, {'tick_range': (90, 110)}]:
+            orderbooks = {}
+            for limits in [(None, None), (1, None), (None, 3), (2, 1)]:
+                orderbook = orderbooks[limits] = lse_order_lib.LSEOrderbook(
+                    output_sink=sink_lib.ListSink(),
+                    display_levels=limits[0],
+                    display_orders=limits[1],
+                    **kwargs,
+                )
+                for line in lines:
+                    orderbook.add(
+                        lse_order_lib.build_order_from_ascii_string(line)
+                    )
+
+            rows = quote_rows(orderbooks[None, None])
+            assert len(rows) == 4
+
+            assert quote_rows(orderbooks[1, None]) == [
+                rows[0],
+                rows[1][:num_bid_columns] + empty_ask,
+            ]
+            assert quote_rows(orderbooks[None, 3]) == rows[:3]
+            assert quote_rows(orderbooks[2, 1]) == rows[:1]
+
+            # The buffer only ever holds the displayed orders
+            assert len(orderbooks[2, 1]._display_buffer) == 2
+
+    def test_invalid_limits(self):
+
+        with pytest.raises(ValueError):
+            lse_order_lib.LSEOrderbook(display_levels=0)
+
+        with pytest.raises(ValueError):
+            lse_order_lib.LSEOrderbook(display_orders=-1)
+
+
+def _run_quotes(orderbook, lines) -> list:
+    # Returns the published quote, or None, after each order
+    quotes = []
+    for line in lines:
+        orderbook.output_sink.messages.clear()
+        orderbook.add(lse_order_lib.build_order_from_ascii_string(line))
+
+        messages = [
+            message
+            for message in orderbook.output_sink.messages
+            if message.startswith(display_lib._BOOK_FORMAT_HEADER)
+        ]
+        assert len(messages) <= 1
+        quotes.append(messages[0] if messages else None)
+    return quotes
+
+
+class TestQuoteConflation:
+    def test_quote_every(self):
+
+        lines = conftest.generate_testing_orders(num_orders_per_side=100)
+        expected = _run_quotes(
+            lse_order_lib.LSEOrderbook(output_sink=sink_lib.ListSink()), lines
+        )
+
+        orderbook = lse_order_lib.LSEOrderbook(
+            output_sink=sink_lib.ListSink(), quote_every=10
+        )
+        quotes = _run_quotes(orderbook, lines)
+
+        for index, (quote, expected_quote) in enumerate(zip(quotes, expected)):
+            if index % 10 == 9:
+                assert quote == expected_quote
+            else:
+                assert quote is None
+
+        # The tail is coalesced into a single publication of the last state
+        orderbook.output_sink.messages.clear()
+        orderbook.publish()
+        if len(lines) % 10:
+            assert orderbook.output_sink.messages == [expected[-1]]
+        else:
+            assert not orderbook.output_sink.messages
+
+        orderbook.output_sink.messages.clear()
+        orderbook.publish()
+        assert not orderbook.output_sink.messages
+
+    def test_quote_on_bbo(self):
+
+        lines = conftest.generate_testing_orders(num_orders_per_side=100)
+
+        orderbook = lse_order_lib.LSEOrderbook(output_sink=sink_lib.ListSink())
+        expected, bbos = [], []
+        for line in lines:
+            expected.extend(_run_quotes(orderbook, [line]))
+            bbos.append(orderbook.bbo)
+
+        orderbook = lse_order_lib.LSEOrderbook(
+            output_sink=sink_lib.ListSink(), quote_on_bbo=True
+        )
+        quotes = _run_quotes(orderbook, lines)
+
+        last_bbo = None
+        for quote, expected_quote, bbo in zip(quotes, expected, bbos):
+            if bbo != last_bbo:
+                assert quote == expected_quote
+                last_bbo = bbo
+            else:
+                assert quote is None
+
+    def test_quote_interval(self, monkeypatch):
+
+        clock = [0.0]
+        monkeypatch.setattr(orderbook_lib.time, 'monotonic', lambda: clock[0])
+
+        orderbook = lse_order_lib.LSEOrderbook(
+            output_sink=sink_lib.ListSink(), quote_interval=1.0
+        )
+
+        published = []
+        for identity in range(10):
+            clock[0] += 0.4
+            quotes = _run_quotes(orderbook, [f'B,{identity},100,10'])
+            published.append(quotes[0] is not None)
+
+        # 0.4s, then every 1.2s
+        assert published == [True, False, False] * 3 + [True]
+
+    def test_invalid_conflation(self):
+
+        with pytest.raises(ValueError):
+            lse_order_lib.LSEOrderbook(quote_every=0)
+
+        with pytest.raises(ValueError):
+            lse_order_lib.LSEOrderbook(quote_interval=-1.0)
+
+
+class TestDeltaFeed:
+    def test_passive_order(self):
+
+        output_sink = sink_lib.ListSink()
+        orderbook = lse_order_lib.LSEOrderbook(
+            output_sink=output_sink, feed=orderbook_lib.FEED_DELTA
+        )
+
+        for line in ['B,1,5103,100', 'A,2,5104,100,10', 'A,3,5103,30']:
+            orderbook.add(lse_order_lib.build_order_from_ascii_string(line))
+        orderbook.cancel(2)
+
+        assert output_sink.messages == [
+            '\nN,1,B,5103,100',
+            '\nN,2,A,5104,10',
+            '\n1,3,5103,30',
+            '\nU,1,B,5103,70',
+            '\nD,2,A,5104,0',
+        ]
+
+    def test_rebuild_book_from_deltas(self):
+
+        lines = conftest.generate_testing_orders(num_orders_per_side=300)
+
+        for order_store in [None, store_lib.OrderStore()]:
+            output_sink = sink_lib.ListSink()
+            orderbook = lse_order_lib.LSEOrderbook(
+                output_sink=output_sink,
+                order_store=order_store,
+                feed=orderbook_lib.FEED_DELTA,
+            )
+            delta_book = display_lib.DeltaBook()
+
+            random.seed(666)
+            for line in lines:
+                order = lse_order_lib.build_order_from_ascii_string(line)
+
+                if order.identity in orderbook and random.random() < 0.2:
+                    if random.random() < 0.5:
+                        orderbook.cancel(order.identity)
+                    else:
+                        resting = orderbook._get_order_handle(
+                            order.identity
+                        ).order
+                        order.side = resting.side
+                        orderbook.modify(order)
+                else:
+                    orderbook.add(order)
+
+                for message in output_sink.messages:
+                    message = message.lstrip('\n')
+                    if message[0].isalpha():  # not a trade
+                        delta_book.apply(message)
+                output_sink.messages.clear()
+
+                assert (
+                    delta_book.body
+                    == display_lib.BookFormat(
+                        orderbook.bids, orderbook.asks
+                    ).body
+                )
+
+    def test_invalid_feed(self):
+
+        with pytest.raises(ValueError):
+            lse_order_lib.LSEOrderbook(feed='unknown')
+
+
+class TestTickLadder:
+    def test_ladder_matches_sorted_container(self):
+
+        lines = conftest.generate_testing_orders(num_orders_per_side=2_000)
+        prices = [int(line.split(',')[2]) for line in lines]
+
+        orderbook = lse_order_lib.LSEOrderbook(is_display=False)
+        ladder_orderbook = lse_order_lib.LSEOrderbook(
+            is_display=False,
+            tick_range=(min(prices), max(prices)),
+        )
+
+        for line in lines:
+            orderbook.add(lse_order_lib.build_order_from_ascii_string(line))
+            ladder_orderbook.add(
+                lse_order_lib.build_order_from_ascii_string(line)
+            )
+
+            assert orderbook.best_bid == ladder_orderbook.best_bid
+            assert orderbook.best_ask == ladder_orderbook.best_ask
+
+        assert list(orderbook.bids) == list(ladder_orderbook.bids)
+        assert list(orderbook.asks) == list(ladder_orderbook.asks)
+        for side in ['bids', 'asks']:
+            assert (
+                getattr(orderbook, side).to_display()
+                == getattr(ladder_orderbook, side).to_display()
+            )
+
+    def test_ladder_display(self):
+
+        orderbook = lse_order_lib.LSEOrderbook(tick_range=(31000, 33000))
+
+        with open(os.devnull, 'w') as null:
+            with contextlib.redirect_stdout(null):
+                for x in [
+                    'B,1234567890,32503,1234567890',
+                    'A,1234567891,32504,1234567890',
+                    'A,6808,32505,7777',
+                    'B,1138,31502,7500',
+                ]:
+                    orderbook.add(
+                        lse_order_lib.build_order_from_ascii_string(x)
+                    )
+
+        x = 'A,42100,32507,3000'
+        sell_order_3 = lse_order_lib.build_order_from_ascii_string(x)
+
+        with io.StringIO() as stream:
+            with contextlib.redirect_stdout(stream):
+                orderbook.add(sell_order_3)
+
+            stdout = stream.getvalue()
+
+        assert stdout == _TEST_ADD_LIMIT_ORDER_STDOUT_EXPECTED_OUTPUT.rstrip()
+
+    def test_ladder_price_out_of_range(self):
+
+        orderbook = lse_order_lib.LSEOrderbook(
+            is_display=False, tick_range=(100, 200), tick_size=5
+        )
+
+        x = 'B,1,201,100'
+        with pytest.raises(errors.PriceOutOfRangeError):
+            orderbook.add(lse_order_lib.build_order_from_ascii_string(x))
+
+        x = 'B,2,102,100'
+        with pytest.raises(errors.PriceOutOfRangeError):
+            orderbook.add(lse_order_lib.build_order_from_ascii_string(x))
+
+        x = 'B,3,105,100'
+        orderbook.add(lse_order_lib.build_order_from_ascii_string(x))
+        assert orderbook.best_bid == 105
+
+    def test_crossing_price_out_of_range(self):
+
+        for kwargs in [{}, {'feed': orderbook_lib.FEED_DELTA}]:
+            orderbook = lse_order_lib.LSEOrderbook(
+                output_sink=sink_lib.ListSink(),
+                tick_range=(90, 110),
+                tick_size=5,
+                **kwargs,
+            )
+            orderbook.add(
+                lse_order_lib.build_order_from_ascii_string('A,1,100,10')
+            )
+            orderbook.output_sink.messages.clear()
+            snapshot = orderbook.market_by_order()
+
+            # The order would cross the ask, but is rejected before matching
+            for x in ['B,2,120,50', 'B,3,102,50', 'A,4,85,5']:
+                with pytest.raises(errors.PriceOutOfRangeError):
+                    orderbook.add(
+                        lse_order_lib.build_order_from_ascii_string(x)
+                    )
+
+            assert not orderbook.output_sink.messages
+            assert np.array_equal(orderbook.market_by_order(), snapshot)
+            assert orderbook.last_trade_price == orderbook_lib.INTEGER_NAN
+
+
 def test_profile_orderbook(iterations: int = 1):
 
     # read from dumped testing data file
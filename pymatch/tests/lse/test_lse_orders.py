@@ -4,10 +4,17 @@
 #
 # """ Test Orders """
 
+import gc
+import io
+import time
+import tracemalloc
+
+import numpy as np
 import pytest
 
 from pymatch import errors
 from pymatch import lse as lse_order_lib, order as order_lib
+from pymatch.tests.lse import conftest
 
 
 class TestLimitOrders:
@@ -49,5 +56,360 @@ class TestLimitOrders:
         with pytest.raises(errors.InvalidOrderFormatError):
             lse_order_lib.build_order_from_ascii_string(x)
 
+    def test_build_valid_market_order(self) -> None:
+
+        order = lse_order_lib.build_order_from_ascii_string('B,100322,,7500')
+
+        assert isinstance(order, lse_order_lib.LSEMarketOrder)
+        assert order.price == order_lib.MARKET_ORDER_PRICE
+        assert order.quantity == 7500
+        assert order.side == order_lib.OrderSide.BUY
+        assert order.type == order_lib.OrderType.MARKET
+        assert order.identity == 100322
+
+        order = lse_order_lib.LSEMarketOrder.from_ascii_string('A,1,,10')
+        assert order.type == order_lib.OrderType.MARKET
+
+    def test_build_invalid_market_order(self) -> None:
+
+        for x in ['B,100322,,7500,100', 'B,100322,-1,7500']:
+            with pytest.raises(errors.InvalidOrderFormatError):
+                lse_order_lib.build_order_from_ascii_string(x)
+
+        with pytest.raises(errors.InvalidOrderFormatError):
+            lse_order_lib.LSEMarketOrder.from_ascii_string('B,1,5103,10')
+
+    def test_orders_are_slotted(self) -> None:
+
+        limit_order = lse_order_lib.build_order_from_ascii_string(
+            'B,100322,5103,7500'
+        )
+        iceberg_order = lse_order_lib.build_order_from_ascii_string(
+            'A,100345,5103,100000,10000'
+        )
+
+        for order in (limit_order, iceberg_order):
+            assert not hasattr(order, '__dict__')
+
+            with pytest.raises(AttributeError):
+                order.unknown_attribute = 1
+
+    def test_private_call(self) -> None:
+
+        with pytest.raises(ValueError):
+            lse_order_lib.LSELimitOrder(
+                order_lib.OrderSide.BID, 100322, 5103, 7500
+            )
+
+
+class TestOrderPool:
+    def test_acquire_and_release(self) -> None:
+
+        pool = order_lib.OrderPool()
+
+        x = 'B,100322,5103,7500'
+        limit_order = lse_order_lib.build_order_from_ascii_string(x, pool)
+        assert (pool.hits, pool.misses) == (0, 1)
+
+        pool.release(limit_order)
+        assert len(pool) == 1
+
+        x = 'A,100345,5104,100000,10000'
+        iceberg_order = lse_order_lib.build_order_from_ascii_string(x, pool)
+        assert (pool.hits, pool.misses) == (0, 2)  # different type
+
+        x = 'A,100346,5105,200'
+        recycled_order = lse_order_lib.build_order_from_ascii_string(x, pool)
+        assert recycled_order is limit_order
+        assert (pool.hits, pool.misses) == (1, 2)
+        assert recycled_order.identity == 100346
+        assert recycled_order.side == order_lib.OrderSide.SELL
+        assert recycled_order.price == 5105
+        assert recycled_order.quantity == 200
+
+        pool.release(iceberg_order)
+        x = 'A,100347,5105,200,50'
+        recycled_order = lse_order_lib.build_order_from_ascii_string(x, pool)
+        assert recycled_order is iceberg_order
+        assert recycled_order.display_quantity == 50
+
+    def test_invalid_order_is_not_lost(self) -> None:
+
+        pool = order_lib.OrderPool(maxsize=1)
+
+        pool.release(
+            lse_order_lib.build_order_from_ascii_string('A,1,5103,100,10')
+        )
+        pool.release(
+            lse_order_lib.build_order_from_ascii_string('A,2,5103,100,10')
+        )
+        assert len(pool) == 1  # bounded
+
+        x = 'A,3,5103,100,100'
+        with pytest.raises(errors.OrderError):
+            lse_order_lib.build_order_from_ascii_string(x, pool)
+
+        assert len(pool) == 1
+
+
+class TestBulkParser:
+    def test_parse_matches_ascii_parser(self) -> None:
+
+        lines = conftest.generate_testing_orders(num_orders_per_side=500)
+        buffer = '\n'.join(lines).encode('ascii')
+
+        orders, malformed = lse_order_lib.parse_setsmm_buffer(buffer)
+
+        assert orders.dtype == lse_order_lib.SETSmm_DTYPE
+        assert len(orders) == len(lines)
+        assert not len(malformed)
+
+        for line, order in zip(
+            lines, lse_order_lib.build_orders_from_array(orders)
+        ):
+            expected = lse_order_lib.build_order_from_ascii_string(line)
+
+            assert order.__class__ is expected.__class__
+            assert order.side is expected.side
+            assert order.identity == expected.identity
+            assert order.price == expected.price
+            assert order.quantity == expected.quantity
+            assert order.display_quantity == expected.display_quantity
+
+    def test_malformed_rows(self) -> None:
+
+        buffer = (
+            b'B,1,5103,7500\r\n'  # 0: CRLF line ending
+            b'\n'  # 1: blank lines are skipped
+            b'S,2,5103,7500\n'  # 2: unknown side
+            b'B,,5103,7500\n'  # 3: empty field
+            b'B,4,51.3,7500\n'  # 4: not an integer
+            b'B,5,5103\n'  # 5: too few fields
+            b'B,6,5103,7500,100,1\n'  # 6: too many fields
+            b'A,7,5103,100,100\n'  # 7: peak size not below quantity
+            b'A,8,5103,100,0\n'  # 8: zero peak size
+            b'A,9999999999999999999,5103,100\n'  # 9: overflows an int64
+            b'BB,10,5103,100\n'  # 10: invalid side
+            b'B,11,,100\n'  # 11: market order
+            b'B,12,,100,10\n'  # 12: market order with a peak size
+            b'B,13,-1,100\n'  # 13: negative price
+            b'A,14,5103,100000,10000'  # 14: no trailing newline
+        )
+
+        orders, malformed = lse_order_lib.parse_setsmm_buffer(buffer)
+
+        assert list(malformed) == [2, 3, 4, 5, 6, 7, 8, 9, 10, 12, 13]
+        assert orders.tolist() == [
+            (1, 1, 5103, 7500, order_lib.LIMIT_ORDER_PEAK_SIZE),
+            (
+                1,
+                11,
+                order_lib.MARKET_ORDER_PRICE,
+                100,
+                order_lib.LIMIT_ORDER_PEAK_SIZE,
+            ),
+            (-1, 14, 5103, 100000, 10000),
+        ]
+
+        built = list(lse_order_lib.build_orders_from_array(orders))
+        assert isinstance(built[1], lse_order_lib.LSEMarketOrder)
+        assert (built[1].identity, built[1].quantity) == (11, 100)
+
+    def test_largest_integers(self) -> None:
+
+        maximum = np.iinfo(np.int64).max
+        buffer = (
+            b'B,1000000000000000000,5103,7500\n'  # 0: 19 digits
+            b'B,9223372036854775807,5103,7500\n'  # 1: largest int64
+            b'B,9223372036854775808,5103,7500\n'  # 2: overflows an int64
+            b'B,9300000000000000000,5103,7500\n'  # 3: overflows an int64
+            b'B,10000000000000000000,5103,7500\n'  # 4: 20 digits
+            b'A,5,5103,9223372036854775807,9223372036854775806\n'  # 5
+            b'A,6,5103,9223372036854775807,9223372036854775808\n'  # 6
+        )
+
+        orders, malformed = lse_order_lib.parse_setsmm_buffer(buffer)
+
+        assert list(malformed) == [2, 3, 4, 6]
+        assert orders.tolist() == [
+            (1, 10**18, 5103, 7500, order_lib.LIMIT_ORDER_PEAK_SIZE),
+            (1, maximum, 5103, 7500, order_lib.LIMIT_ORDER_PEAK_SIZE),
+            (-1, 5, 5103, maximum, maximum - 1),
+        ]
+
+    def test_parsers_accept_the_same_lines(self) -> None:
+
+        lines = [
+            'B,1,5103,7500',
+            'B,1,5103,7500\r\n',
+            'B,9223372036854775807,5103,7500',
+            'B,9223372036854775808,5103,7500',
+            'B,0000000000000000001,5103,7500',
+            'B,00000000000000000001,5103,7500',
+            'B, 5,5103,7500',
+            'B,5 ,5103,7500',
+            'B,5,5103,7500 ',
+            'B,+5,5103,7500',
+            'B,-5,5103,7500',
+            'B,5,-1,7500',
+            'B,5,,7500',
+            'B,5,,7500,10',
+            'A,5,5103,7500,0',
+            'A,5,5103,7500,10',
+            'A,5,5103,7500,7500',
+            'A,5,5103,7500,10,1',
+            'A,5,5103',
+            'A,5,5103,',
+            'A,5,5_103,7500',
+            'A,5,5103,\u0667',
+            'S,5,5103,7500',
+        ]
+
+        for line in lines:
+            orders, malformed = lse_order_lib.parse_setsmm_buffer(
+                line.encode('utf-8')
+            )
+
+            try:
+                expected = lse_order_lib.build_order_from_ascii_string(line)
+            except errors.OrderError:
+                assert list(malformed) == [0], line
+                continue
+
+            assert not len(malformed), line
+            (order,) = lse_order_lib.build_orders_from_array(orders)
+            assert order.__class__ is expected.__class__
+            assert order.side is expected.side
+            assert order.identity == expected.identity
+            assert order.price == expected.price
+            assert order.quantity == expected.quantity
+            assert order.display_quantity == expected.display_quantity
+
+    def test_parse_in_chunks(self) -> None:
+
+        lines = conftest.generate_testing_orders(num_orders_per_side=100)
+        lines[7] = 'S,7,5103,7500'
+        buffer = '\n'.join(lines).encode('ascii')
+
+        expected_orders, expected_malformed = (
+            lse_order_lib.parse_setsmm_buffer(buffer)
+        )
+        assert list(expected_malformed) == [7]
+
+        for chunk_size in [1, 10, 1_000, len(buffer)]:
+            chunks = list(lse_order_lib.iter_setsmm_buffer(buffer, chunk_size))
+            orders = np.concatenate([orders for orders, _ in chunks])
+            malformed = np.concatenate([malformed for _, malformed in chunks])
+
+            assert (orders == expected_orders).all()
+            assert (malformed == expected_malformed).all()
+
+    def test_parse_stream(self) -> None:
+
+        lines = conftest.generate_testing_orders(num_orders_per_side=100)
+        lines[7] = 'S,7,5103,7500'
+        buffer = '\n'.join(lines).encode('ascii')
+
+        expected_orders, expected_malformed = (
+            lse_order_lib.parse_setsmm_buffer(buffer)
+        )
+
+        for chunk_size in [1, 10, 1_000, len(buffer)]:
+            chunks = list(
+                lse_order_lib.iter_setsmm_stream(
+                    io.BytesIO(buffer), chunk_size
+                )
+            )
+            orders = np.concatenate([orders for orders, _ in chunks])
+            malformed = np.concatenate([malformed for _, malformed in chunks])
+
+            assert (orders == expected_orders).all()
+            assert list(malformed) == list(expected_malformed) == [7]
+
+    def test_stop_at_malformed(self) -> None:
+
+        lines = conftest.generate_testing_orders(num_orders_per_side=100)
+        lines[3] = ''
+        lines[7] = 'S,7,5103,7500'
+        lines[9] = 'S,9,5103,7500'
+        buffer = '\n'.join(lines).encode('ascii')
+
+        expected, _ = lse_order_lib.parse_setsmm_buffer(
+            '\n'.join(lines[:7]).encode('ascii')
+        )
+
+        for chunk_size in [1, 10, 1_000, len(buffer)]:
+            for chunks in [
+                lse_order_lib.iter_setsmm_buffer(
+                    buffer, chunk_size, stop_at_malformed=True
+                ),
+                lse_order_lib.iter_setsmm_stream(
+                    io.BytesIO(buffer), chunk_size, stop_at_malformed=True
+                ),
+            ]:
+                chunks = list(chunks)
+                orders = np.concatenate([orders for orders, _ in chunks])
+                malformed = np.concatenate([m for _, m in chunks])
+
+                assert orders.tolist() == expected.tolist()
+                assert list(malformed) == [7]
+                assert list(chunks[-1][1]) == [7]
+
+    def test_parse_file(self, tmp_path) -> None:
+
+        path = tmp_path / 'orders.txt'
+        path.write_bytes(b'B,1,5103,7500\nA,2,5104,100000,10000\n')
+
+        orders, malformed = lse_order_lib.parse_setsmm_file(str(path))
+
+        assert not len(malformed)
+        assert list(orders['identity']) == [1, 2]
+        assert list(orders['peak_size']) == [0, 10000]
+
+
+def test_profile_orders(num_orders: int = 100_000):
+
+    # Benchmark the bytes per resting order and the construction cost
+    print('\n--- Profling order construction ---')
+
+    for line in ['B,100322,5103,7500', 'A,100345,5103,100000,10000']:
+
+        gc.collect()
+        tracemalloc.start()
+        orders = [
+            lse_order_lib.build_order_from_ascii_string(line)
+            for _ in range(num_orders)
+        ]
+        allocated, _ = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        # discount the container holding the orders
+        allocated -= orders.__sizeof__()
+
+        start = time.perf_counter()
+        for _ in range(num_orders):
+            lse_order_lib.build_order_from_ascii_string(line)
+        elapsed = time.perf_counter() - start
+
+        print(
+            f'{orders[0].__class__.__qualname__}: '
+            f'{allocated / num_orders:.1f} bytes/order, '
+            f'{elapsed / num_orders * 1e9:.0f} ns/order'
+        )
+
+    lines = conftest.generate_testing_orders(num_orders_per_side=25_000)
+    buffer = '\n'.join(lines).encode('ascii')
+
+    start = time.perf_counter()
+    for line in lines:
+        lse_order_lib.build_order_from_ascii_string(line)
+    elapsed = time.perf_counter() - start
+    print(f'ascii parser: {elapsed / len(lines) * 1e9:.0f} ns/order')
+
+    start = time.perf_counter()
+    lse_order_lib.parse_setsmm_buffer(buffer)
+    elapsed = time.perf_counter() - start
+    print(f'bulk parser: {elapsed / len(lines) * 1e9:.0f} ns/order')
+
 
 # EOF
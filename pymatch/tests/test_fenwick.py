@@ -0,0 +1,77 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+# "Author: Nathan Matare <nathan.matare@gmail.com>"
+#
+# """ Test Fenwick Tree """
+
+import random
+
+import pytest
+
+from pymatch import fenwick as fenwick_lib
+
+
+class TestFenwickTree:
+    def test_prefix_sums_match_brute_force(self):
+
+        random.seed(7)
+
+        size = 257
+        tree = fenwick_lib.FenwickTree(size)
+        values = [0] * size
+
+        for _ in range(2_000):
+            position = random.randrange(size)
+            delta = random.randint(-100, 100)
+            tree.add(position, delta)
+            values[position] += delta
+
+            end = random.randint(-1, size + 1)
+            assert tree.prefix_sum(end) == sum(values[: max(end, 0)])
+
+        assert len(tree) == size
+        assert tree.total() == sum(values)
+        for end in range(size + 1):
+            assert tree.prefix_sum(end) == sum(values[:end])
+
+    def test_search_inverts_prefix_sum(self):
+
+        random.seed(11)
+
+        for size in [1, 2, 7, 64, 100]:
+            tree = fenwick_lib.FenwickTree(size)
+            values = [
+                random.choice([0, 0, random.randint(1, 50)])
+                for _ in range(size)
+            ]
+            for position, value in enumerate(values):
+                tree.add(position, value)
+
+            for value in range(1, sum(values) + 2):
+                expected = next(
+                    (
+                        position
+                        for position in range(size)
+                        if sum(values[: position + 1]) >= value
+                    ),
+                    size,
+                )
+                assert tree.search(value) == expected
+
+        assert fenwick_lib.FenwickTree(0).search(1) == 0
+
+    def test_invalid_position(self):
+
+        tree = fenwick_lib.FenwickTree(4)
+
+        for position in [-1, 4]:
+            with pytest.raises(IndexError):
+                tree.add(position, 1)
+
+        with pytest.raises(ValueError):
+            fenwick_lib.FenwickTree(-1)
+
+        assert fenwick_lib.FenwickTree(0).total() == 0
+
+
+# EOF
@@ -0,0 +1,241 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+# "Author: Nathan Matare <nathan.matare@gmail.com>"
+#
+# """ Test the command line interface """
+
+import io
+import sys
+import contextlib
+
+import pytest
+
+from pymatch import errors, main as main_lib, lse as lse_order_lib
+from pymatch import orderbook as orderbook_lib, display as display_lib
+from pymatch.tests.lse import conftest
+
+
+def _run(function, *args, **kwargs) -> str:
+    with io.StringIO() as stream:
+        with contextlib.redirect_stdout(stream):
+            function(*args, **kwargs)
+        # drop the leading informational message
+        return stream.getvalue().split('\n', 1)[1]
+
+
+def _run_until_error(function, *args, **kwargs) -> str:
+    with io.StringIO() as stream:
+        with contextlib.redirect_stdout(stream):
+            with pytest.raises(errors.InvalidOrderFormatError):
+                function(*args, **kwargs)
+        return stream.getvalue().split('\n', 1)[1]
+
+
+class TestFileInput:
+    def test_file_matches_stdin(self, tmp_path, monkeypatch) -> None:
+
+        lines = conftest.generate_testing_orders(num_orders_per_side=200)
+        data = '\n'.join(lines).encode('ascii')
+
+        monkeypatch.setattr(sys, 'stdin', io.TextIOWrapper(io.BytesIO(data)))
+        expected = _run(main_lib._run_lse_orderbook_from_stdin)
+
+        path = tmp_path / 'orders.txt'
+        path.write_bytes(data)
+        assert _run(main_lib._run_lse_orderbook_from_file, str(path)) == (
+            expected
+        )
+
+        orders, _ = lse_order_lib.parse_setsmm_buffer(data)
+        path = tmp_path / 'orders.bin'
+        path.write_bytes(lse_order_lib.encode_array(orders))
+        assert (
+            _run(
+                main_lib._run_lse_orderbook_from_file,
+                str(path),
+                main_lib.INPUT_FORMAT_BINARY,
+            )
+            == expected
+        )
+
+    def test_batches_match_whole_input(self, tmp_path, monkeypatch) -> None:
+
+        lines = conftest.generate_testing_orders(num_orders_per_side=200)
+        data = '\n'.join(lines).encode('ascii')
+        orders, _ = lse_order_lib.parse_setsmm_buffer(data)
+
+        path = tmp_path / 'orders.txt'
+        path.write_bytes(data)
+        expected = _run(main_lib._run_lse_orderbook_from_file, str(path))
+
+        for input_format, data in [
+            (main_lib.INPUT_FORMAT_ASCII, data),
+            (
+                main_lib.INPUT_FORMAT_BINARY,
+                lse_order_lib.encode_array(orders),
+            ),
+        ]:
+            path.write_bytes(data)
+
+            for chunk_size, prefetch in [(64, 0), (1_000, 2)]:
+                monkeypatch.setattr(
+                    sys, 'stdin', io.TextIOWrapper(io.BytesIO(data))
+                )
+                assert (
+                    _run(
+                        main_lib._run_lse_orderbook_from_stdin,
+                        input_format,
+                        chunk_size,
+                        prefetch,
+                    )
+                    == expected
+                )
+                assert (
+                    _run(
+                        main_lib._run_lse_orderbook_from_file,
+                        str(path),
+                        input_format,
+                        chunk_size,
+                        prefetch,
+                    )
+                    == expected
+                )
+
+    def test_conflated_file(self, tmp_path) -> None:
+
+        lines = conftest.generate_testing_orders(num_orders_per_side=200)
+        path = tmp_path / 'orders.txt'
+        path.write_bytes('\n'.join(lines).encode('ascii'))
+
+        expected = _run(main_lib._run_lse_orderbook_from_file, str(path))
+        last_quote = expected[
+            expected.rindex(display_lib._BOOK_FORMAT_HEADER) :
+        ]
+
+        output = _run(
+            main_lib._run_lse_orderbook_from_file,
+            str(path),
+            quote_every=len(lines) + 1,
+        )
+        assert output.count(display_lib._BOOK_FORMAT_HEADER) == 1
+        assert output.endswith(last_quote)
+
+    def test_empty_file(self, tmp_path) -> None:
+
+        path = tmp_path / 'orders.txt'
+        path.write_bytes(b'')
+        assert _run(main_lib._run_lse_orderbook_from_file, str(path)) == ''
+
+    def test_malformed_file(self, tmp_path) -> None:
+
+        path = tmp_path / 'orders.txt'
+        path.write_bytes(b'B,1,5103,7500\nS,2,5103,7500\n')
+
+        with pytest.raises(errors.InvalidOrderFormatError):
+            _run(main_lib._run_lse_orderbook_from_file, str(path))
+
+    def test_malformed_record_stops_after_prefix(
+        self, tmp_path, monkeypatch
+    ) -> None:
+
+        lines = conftest.generate_testing_orders(num_orders_per_side=100)
+        lines.insert(100, '')  # blank lines are rows, but not orders
+        prefix, suffix = lines[:300], lines[300:]
+
+        # The orders preceding the malformed line are matched, as they
+        # would be line by line, regardless of the chunk size
+        path = tmp_path / 'orders.txt'
+        path.write_bytes('\n'.join(prefix).encode('ascii'))
+        expected = _run(main_lib._run_lse_orderbook_from_file, str(path))
+
+        orders, _ = lse_order_lib.parse_setsmm_buffer(
+            '\n'.join(prefix).encode('ascii')
+        )
+        suffix_orders, _ = lse_order_lib.parse_setsmm_buffer(
+            '\n'.join(suffix).encode('ascii')
+        )
+        malformed = lse_order_lib.BINARY_RECORD.pack(0, 1, 5103, 7500, 0)
+
+        for input_format, data in [
+            (
+                main_lib.INPUT_FORMAT_ASCII,
+                '\n'.join(prefix + ['S,1,5103,7500'] + suffix).encode(),
+            ),
+            (
+                main_lib.INPUT_FORMAT_BINARY,
+                lse_order_lib.encode_array(orders)
+                + malformed
+                + lse_order_lib.encode_array(suffix_orders),
+            ),
+        ]:
+            path.write_bytes(data)
+
+            for chunk_size, prefetch in [(1, 0), (4096, 2)]:
+                monkeypatch.setattr(
+                    sys, 'stdin', io.TextIOWrapper(io.BytesIO(data))
+                )
+                assert (
+                    _run_until_error(
+                        main_lib._run_lse_orderbook_from_stdin,
+                        input_format,
+                        chunk_size,
+                        prefetch,
+                    )
+                    == expected
+                )
+                assert (
+                    _run_until_error(
+                        main_lib._run_lse_orderbook_from_file,
+                        str(path),
+                        input_format,
+                        chunk_size,
+                        prefetch,
+                    )
+                    == expected
+                )
+
+    def test_parse_args(self) -> None:
+
+        args = main_lib._parse_args(
+            ['--input', 'orders.bin', '--format', 'binary']
+        )
+        assert args.input == 'orders.bin'
+        assert args.format == main_lib.INPUT_FORMAT_BINARY
+
+        args = main_lib._parse_args([])
+        assert args.input is None
+        assert args.format == main_lib.INPUT_FORMAT_ASCII
+        assert args.chunk_size == main_lib.DEFAULT_CHUNK_SIZE
+        assert args.prefetch == main_lib.DEFAULT_PREFETCH
+
+        args = main_lib._parse_args(
+            ['--chunk-size', '4096', '--prefetch', '2']
+        )
+        assert (args.chunk_size, args.prefetch) == (4096, 2)
+
+        args = main_lib._parse_args(['--feed', 'delta'])
+        assert args.feed == orderbook_lib.FEED_DELTA
+        assert main_lib._parse_args([]).feed == orderbook_lib.FEED_BOOK
+
+        assert main_lib._parse_args([]).display_levels is None
+        args = main_lib._parse_args(['--display-levels', '5'])
+        assert args.display_levels == 5
+
+        args = main_lib._parse_args([])
+        assert (args.quote_every, args.quote_interval) == (1, None)
+        assert not args.quote_on_bbo
+
+        args = main_lib._parse_args(
+            [
+                '--quote-every',
+                '10',
+                '--quote-interval',
+                '0.5',
+                '--quote-on-bbo',
+            ]
+        )
+        assert (args.quote_every, args.quote_interval) == (10, 0.5)
+        assert args.quote_on_bbo
+
+
+# EOF
@@ -0,0 +1,79 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+# "Author: Nathan Matare <nathan.matare@gmail.com>"
+#
+# """ Test Orderbook Containers """
+
+import pytest
+
+from pymatch import orderbook as orderbook_lib, order as order_lib
+
+
+def _build_limit_order(identity: int, price: int, quantity: int):
+    return order_lib.LimitOrder(
+        order_lib.OrderSide.BID, identity, price, quantity, _private_call=False
+    )
+
+
+class TestPriceLevel:
+    def test_fifo(self):
+
+        queue = orderbook_lib._PriceLevel(100)
+        for identity in range(5):
+            queue.append(_build_limit_order(identity, 100, 10))
+
+        assert len(queue) == 5
+        assert [order.identity for order in queue] == [0, 1, 2, 3, 4]
+        assert queue[0].identity == 0
+        assert queue[-1].identity == 4
+
+        assert queue.popleft().identity == 0
+        assert queue.popleft().identity == 1
+        assert len(queue) == 3
+        assert queue.head.order.identity == 2
+
+    def test_remove_by_handle(self):
+
+        queue = orderbook_lib._PriceLevel(100)
+        nodes = [
+            queue.append(_build_limit_order(identity, 100, 10))
+            for identity in range(5)
+        ]
+
+        queue.remove(nodes[2])  # middle
+        queue.remove(nodes[0])  # head
+        queue.remove(nodes[4])  # tail
+
+        assert len(queue) == 2
+        assert [order.identity for order in queue] == [1, 3]
+        assert queue.head is nodes[1] and queue.tail is nodes[3]
+        assert nodes[2].level is None
+
+        with pytest.raises(ValueError):
+            queue.remove(nodes[2])  # already removed
+
+        queue.remove(nodes[1])
+        queue.remove(nodes[3])
+
+        assert not queue
+        assert queue.head is None and queue.tail is None
+
+        with pytest.raises(IndexError):
+            queue.popleft()
+
+    def test_remove_whilst_iterating(self):
+
+        queue = orderbook_lib._PriceLevel(100)
+        for identity in range(4):
+            queue.append(_build_limit_order(identity, 100, 10))
+
+        visited = []
+        for node in queue.nodes():
+            visited.append(node.order.identity)
+            queue.remove(node)
+
+        assert visited == [0, 1, 2, 3]
+        assert len(queue) == 0
+
+
+# EOF
@@ -0,0 +1,63 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+# "Author: Nathan Matare <nathan.matare@gmail.com>"
+#
+# """ Test the ingestion pipeline """
+
+import threading
+
+import pytest
+
+from pymatch import pipeline as pipeline_lib
+
+
+class TestPrefetch:
+    def test_items_in_order(self) -> None:
+
+        for depth in [0, 1, 4]:
+            items = list(pipeline_lib.prefetch(iter(range(100)), depth))
+            assert items == list(range(100))
+
+    def test_bounded_depth(self) -> None:
+
+        produced = []
+
+        def produce():
+            for item in range(100):
+                produced.append(item)
+                yield item
+
+        items = pipeline_lib.prefetch(produce(), depth=2)
+        assert next(items) == 0
+
+        # the producer can only run ahead by the depth of the queue (and the
+        # item it is blocked on)
+        threading.Event().wait(0.2)
+        assert len(produced) <= 4
+
+        items.close()
+
+    def test_error_is_raised_to_consumer(self) -> None:
+        def produce():
+            yield 1
+            raise KeyError('failed')
+
+        items = pipeline_lib.prefetch(produce(), depth=2)
+        assert next(items) == 1
+
+        with pytest.raises(KeyError):
+            next(items)
+
+    def test_early_stop_releases_producer(self) -> None:
+
+        items = pipeline_lib.prefetch(iter(range(1_000_000)), depth=1)
+        assert next(items) == 0
+        items.close()
+
+        assert not any(
+            thread.name == 'pymatch-prefetch' and thread.is_alive()
+            for thread in threading.enumerate()
+        )
+
+
+# EOF
@@ -0,0 +1,60 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+# "Author: Nathan Matare <nathan.matare@gmail.com>"
+#
+# """ Test Output Sinks """
+
+import io
+import contextlib
+
+import pytest
+
+from pymatch import sink as sink_lib
+
+
+class TestOutputSinks:
+    def test_stdout_sink_follows_redirection(self) -> None:
+
+        sink = sink_lib.StdoutSink()
+        with io.StringIO() as stream:
+            with contextlib.redirect_stdout(stream):
+                sink.write('message')
+            assert stream.getvalue() == 'message'
+
+    def test_buffered_sink_flushes_on_size(self) -> None:
+
+        target = sink_lib.ListSink()
+        sink = sink_lib.BufferedSink(target, max_size=10)
+
+        sink.write('12345')
+        assert target.messages == []
+
+        sink.write('67890')  # reached the maximum size
+        assert target.messages == ['1234567890']
+
+        sink.write('tail')
+        sink.close()
+        assert target.getvalue() == '1234567890tail'
+
+    def test_buffered_sink_flushes_on_delay(self) -> None:
+
+        target = sink_lib.ListSink()
+        sink = sink_lib.BufferedSink(target, max_delay=0.0)
+
+        sink.write('message')
+        assert target.messages == ['message']
+
+        with pytest.raises(ValueError):
+            sink_lib.BufferedSink(target, max_size=0)
+
+    def test_file_sink(self, tmp_path) -> None:
+
+        path = tmp_path / 'output.txt'
+        with sink_lib.FileSink(str(path)) as sink:
+            sink.write('first\n')
+            sink.write('second\n')
+
+        assert path.read_text() == 'first\nsecond\n'
+
+
+# EOF
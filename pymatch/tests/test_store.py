@@ -0,0 +1,92 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+# "Author: Nathan Matare <nathan.matare@gmail.com>"
+#
+# """ Test Order Store """
+
+import numpy as np
+
+from pymatch import store as store_lib, order as order_lib
+
+
+def _build_order(identity: int, price: int, quantity: int, peak_size=None):
+    fields = dict(
+        side=order_lib.OrderSide.BID,
+        identity=identity,
+        price=price,
+        quantity=quantity,
+        _private_call=False,
+    )
+    if peak_size is None:
+        return order_lib.LimitOrder(**fields)
+    return order_lib.IcebergOrder(peak_size, **fields)
+
+
+class TestOrderStore:
+    def test_allocate_and_release(self):
+
+        store = store_lib.OrderStore(capacity=2)
+
+        limit_order = store.allocate(_build_order(1, 100, 50))
+        iceberg_order = store.allocate(_build_order(2, 101, 500, 100))
+
+        assert len(store) == 2
+        assert (limit_order.handle, iceberg_order.handle) == (0, 1)
+
+        assert limit_order.identity == 1
+        assert limit_order.side is order_lib.OrderSide.BID
+        assert limit_order.type is order_lib.OrderType.LIMIT
+        assert limit_order.display_quantity == 50
+
+        assert iceberg_order.type is order_lib.OrderType.ICEBERG
+        assert iceberg_order.display_quantity == 100
+
+        # Updates are written through to the columns
+        iceberg_order.quantity -= 150
+        iceberg_order._update_display_quantity(150)
+        assert iceberg_order.quantity == 350
+        assert iceberg_order.peak_quantity == 50
+        assert store.columns['quantity'][1] == 350
+
+        order = iceberg_order.to_order()
+        assert isinstance(order, order_lib.IcebergOrder)
+        assert (order.quantity, order.peak_quantity) == (350, 50)
+
+        # Slots are recycled
+        store.release(limit_order)
+        assert len(store) == 1
+        assert store.allocate(_build_order(3, 102, 10)).handle == 0
+
+    def test_grow(self):
+
+        store = store_lib.OrderStore(capacity=1)
+
+        orders = [
+            store.allocate(_build_order(i, 100, i + 1)) for i in range(5)
+        ]
+
+        assert store.capacity == 8
+        assert store.nbytes == 8 * 8 * len(store_lib.OrderStore.COLUMNS)
+        assert [order.quantity for order in orders] == [1, 2, 3, 4, 5]
+        assert sorted(order.handle for order in orders) == list(range(5))
+
+    def test_vectorized_analytics(self):
+
+        store = store_lib.OrderStore()
+
+        store.allocate(_build_order(1, 100, 10))
+        store.allocate(_build_order(2, 100, 20, 5))
+        released = store.allocate(_build_order(3, 99, 30))
+        store.allocate(_build_order(4, 98, 40))
+        store.release(released)
+
+        prices, quantities, counts = store.depth(order_lib.OrderSide.BID)
+        np.testing.assert_array_equal(prices, [98, 100])
+        np.testing.assert_array_equal(quantities, [40, 30])
+        np.testing.assert_array_equal(counts, [1, 2])
+
+        assert store.exposure(order_lib.OrderSide.BID) == 98 * 40 + 100 * 30
+        assert store.exposure(order_lib.OrderSide.ASK) == 0
+
+
+# EOF